@@ -0,0 +1,251 @@
+"""HTTP API for partner apps, sharing the calculator core with the Streamlit page.
+
+A Starlette ASGI app over the same modules ``app2.py`` uses: the emission
+math, rating and ``trees_needed`` from ``carbon_engine``, recommendations
+from ``recommendations`` and the PDF from ``report`` (built in a
+``ReportPool`` and kept in the shared ``ReportCache``).
+
+    POST /v1/footprint    one profile -> footprint (+ top recommendations)
+    POST /v1/footprints   {"profiles": [...]} -> one vectorized calculate_batch
+    POST /v1/report       one profile (+ name/age) -> streamed PDF
+    GET  /health
+
+A profile is a JSON object with the ``carbon_engine.PROFILE_COLUMNS`` keys
+and an optional ``country``. Single profiles go through the per-category
+memo of ``calculate_incremental``, so repeated inputs cost microseconds.
+
+    python api.py --port 8000 --workers 4
+"""
+import argparse
+import asyncio
+import math
+import os
+import sys
+from contextlib import asynccontextmanager
+
+import numpy as np
+from starlette.applications import Starlette
+from starlette.concurrency import run_in_threadpool
+from starlette.responses import JSONResponse, StreamingResponse
+from starlette.routing import Route
+
+from carbon_engine import (CATEGORIES, DIET_TYPES, PROFILE_COLUMNS, TRANSPORT_MODES, calculate_batch,
+                           calculate_incremental)
+from factor_registry import get_factor_tables
+from recommendations import rank_actions
+
+API_MAX_BATCH = int(os.environ.get("API_MAX_BATCH", "10000"))
+CHOICE_COLUMNS = {"transport_mode": TRANSPORT_MODES, "diet_type": DIET_TYPES}
+# Batas atas per kolom: jauh di atas rentang slider halaman, tapi cukup kecil supaya
+# total tidak pernah overflow (1e308 km/hari -> inf -> 500)
+INPUT_MAXIMA = {
+    "daily_distance": 2000.0,        # km/hari
+    "flight_domestic": 1000,         # penerbangan/tahun
+    "flight_international": 1000,
+    "monthly_kwh": 100000.0,
+    "meals_per_day": 20,
+    "clothes_purchased": 10000,      # potong/tahun
+    "plastic_use": 1000.0,           # kg/minggu
+    "weekly_waste": 10000.0,         # kg/minggu
+}
+STREAM_CHUNK = 64 * 1024
+
+
+class InvalidProfile(ValueError):
+    pass
+
+
+def _profile(data, default_country="Indonesia"):
+    """Validate one JSON profile; returns (country, inputs) with numbers as floats."""
+    if not isinstance(data, dict):
+        raise InvalidProfile("A profile must be a JSON object.")
+    missing = [c for c in PROFILE_COLUMNS if c not in data]
+    if missing:
+        raise InvalidProfile(f"Missing field(s): {', '.join(missing)}")
+    inputs = {}
+    for column in PROFILE_COLUMNS:
+        value = data[column]
+        if column in CHOICE_COLUMNS:
+            if not isinstance(value, str) or value not in CHOICE_COLUMNS[column]:
+                raise InvalidProfile(f"{column} must be one of: {', '.join(CHOICE_COLUMNS[column])}")
+        else:
+            if isinstance(value, bool) or not isinstance(value, (int, float)) or not math.isfinite(value) or value < 0:
+                raise InvalidProfile(f"{column} must be a non-negative number.")
+            if value > INPUT_MAXIMA[column]:
+                raise InvalidProfile(f"{column} must be at most {INPUT_MAXIMA[column]:g}.")
+            value = float(value)
+        inputs[column] = value
+    country = data.get("country", default_country)
+    if not isinstance(country, str) or country not in get_factor_tables().region_index:
+        raise InvalidProfile(f"Unknown country: {country!r}")
+    return country, inputs
+
+
+def _footprint(country, inputs, recommendations):
+    res = calculate_incremental(country, **inputs)
+    out = {
+        "country": country,
+        "total_tonnes": res["total_tonnes"],
+        "rating": res["rating_pdf"],
+        "trees_needed": res["trees_needed"],
+        "emission_data_tonnes": res["emission_data_tonnes"],
+        "highest_emission_category": res["highest_emission_category"],
+    }
+    if recommendations:
+        out["recommendations"] = rank_actions(inputs, country, top=recommendations)
+    return out
+
+
+def _batch(profiles, recommendations):
+    # Satu calculate_batch untuk semua profil; kolom country memilih faktor per baris
+    columns = {c: [inputs[c] for _, inputs in profiles] for c in PROFILE_COLUMNS}
+    columns["country"] = [country for country, _ in profiles]
+    frame = calculate_batch({c: np.asarray(v) for c, v in columns.items()})
+    tonnes = {cat: frame[cat].to_numpy().tolist() for cat in CATEGORIES}
+    totals = frame["total_tonnes"].to_numpy().tolist()
+    trees = frame["trees_needed"].to_numpy().tolist()
+    ratings = frame["rating"].astype(str).tolist()
+    highest = frame["highest_category"].astype(str).tolist()
+
+    results = []
+    for i, (country, inputs) in enumerate(profiles):
+        out = {"country": country, "total_tonnes": totals[i], "rating": ratings[i], "trees_needed": trees[i],
+               "emission_data_tonnes": {cat: tonnes[cat][i] for cat in CATEGORIES},
+               "highest_emission_category": highest[i]}
+        if recommendations:
+            out["recommendations"] = rank_actions(inputs, country, top=recommendations)
+        results.append(out)
+    return results
+
+
+def _error(status, message):
+    return JSONResponse({"error": message}, status_code=status)
+
+
+async def _json(request):
+    try:
+        return await request.json()
+    except ValueError:
+        raise InvalidProfile("Body must be valid JSON.")
+
+
+def _count(request, name, default):
+    try:
+        return max(0, min(int(request.query_params.get(name, default)), 20))
+    except ValueError:
+        raise InvalidProfile(f"{name} must be an integer.")
+
+
+async def health(request):
+    tables = get_factor_tables()
+    return JSONResponse({"status": "ok", "regions": tables.regions, "factor_versions": tables.versions})
+
+
+async def footprint(request):
+    try:
+        country, inputs = _profile(await _json(request))
+        top = _count(request, "recommendations", 3)
+    except InvalidProfile as exc:
+        return _error(422, str(exc))
+    # Cepat (memo per kategori), jadi langsung di event loop tanpa threadpool
+    try:
+        return JSONResponse(_footprint(country, inputs, top))
+    except ValueError as exc:  # input yang lolos _profile tapi ditolak engine tetap 422, bukan 500
+        return _error(422, str(exc))
+
+
+async def footprints(request):
+    try:
+        body = await _json(request)
+        if not isinstance(body, dict) or not isinstance(body.get("profiles"), list):
+            raise InvalidProfile('Body must be {"profiles": [...]}.')
+        if len(body["profiles"]) > API_MAX_BATCH:
+            raise InvalidProfile(f"At most {API_MAX_BATCH} profiles per request.")
+        default_country = body.get("country", "Indonesia")
+        profiles = []
+        for i, data in enumerate(body["profiles"]):
+            try:
+                profiles.append(_profile(data, default_country))
+            except InvalidProfile as exc:
+                raise InvalidProfile(f"profiles[{i}]: {exc}")
+        top = _count(request, "recommendations", 0)
+    except InvalidProfile as exc:
+        return _error(422, str(exc))
+    if not profiles:
+        return JSONResponse({"results": []})
+    # Batch besar memakan CPU: jalankan di threadpool supaya event loop tetap responsif
+    try:
+        return JSONResponse({"results": await run_in_threadpool(_batch, profiles, top)})
+    except ValueError as exc:
+        return _error(422, str(exc))
+
+
+async def report(request):
+    from report_cache import report_key
+
+    try:
+        body = await _json(request)
+        country, inputs = _profile(body)
+        res = {
+            "name": str(body.get("name", "")), "age": body.get("age", ""), "country": country,
+            "photo_bytes": None, "inputs": inputs, **calculate_incremental(country, **inputs),
+        }
+    except ValueError as exc:
+        return _error(422, str(exc))
+    key = report_key(res)
+    cache = request.app.state.report_cache
+    data = cache.get(key)
+    if data is None:
+        future = request.app.state.report_pool.submit(key, res)
+        if future is None:
+            return JSONResponse({"error": "Report builders are busy, retry shortly."}, status_code=503,
+                                headers={"Retry-After": "2"})
+        data, _ = await asyncio.wrap_future(future)
+
+    async def chunks():
+        for start in range(0, len(data), STREAM_CHUNK):
+            yield data[start:start + STREAM_CHUNK]
+
+    filename = "".join(ch for ch in res["name"] if ch.isalnum() or ch in "-_") or "report"
+    return StreamingResponse(chunks(), media_type="application/pdf", headers={
+        "Content-Disposition": f'attachment; filename="carbon_report_{filename}.pdf"',
+        "Content-Length": str(len(data)),
+    })
+
+
+@asynccontextmanager
+async def lifespan(app):
+    from report_cache import ReportCache
+    from report_pool import ReportPool
+
+    # Satu cache & pool per proses worker; pool baru jalan saat laporan pertama diminta
+    app.state.report_cache = ReportCache()
+    app.state.report_pool = ReportPool(on_done=app.state.report_cache.put)
+    get_factor_tables()
+    yield
+    app.state.report_pool.shutdown()
+
+
+app = Starlette(routes=[
+    Route("/health", health),
+    Route("/v1/footprint", footprint, methods=["POST"]),
+    Route("/v1/footprints", footprints, methods=["POST"]),
+    Route("/v1/report", report, methods=["POST"]),
+], lifespan=lifespan)
+
+
+def main(argv=None):
+    import uvicorn
+
+    parser = argparse.ArgumentParser(description="Serve the carbon footprint API.")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8000)
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1, help="worker processes")
+    args = parser.parse_args(argv)
+    uvicorn.run("api:app", host=args.host, port=args.port, workers=args.workers,
+                log_level="warning", access_log=False)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,214 @@
+"""Local load test for ``api.py``.
+
+Starts the API with ``--workers`` uvicorn processes (or targets ``--url``)
+and drives it from ``--clients`` client processes, each keeping
+``--connections`` keep-alive HTTP/1.1 connections busy for ``--duration``
+seconds. Requests cycle through ``--distinct`` random profiles, so the
+per-category memo sees a realistic mix of hits and misses.
+
+    python api_loadtest.py --workers 4 --clients 2 --connections 64 --duration 10
+    python api_loadtest.py --endpoint footprints --batch-size 500
+    python api_loadtest.py --url http://10.0.0.5:8000 --endpoint report --distinct 20
+
+Reports requests/s, p50/p95/p99 latency and status counts, and writes them
+as JSON (``--out``).
+"""
+import argparse
+import asyncio
+import json
+import multiprocessing
+import os
+import random
+import socket
+import statistics
+import subprocess
+import sys
+import time
+from urllib.parse import urlsplit
+from urllib.request import urlopen
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+PATHS = {"footprint": "/v1/footprint", "footprints": "/v1/footprints", "report": "/v1/report"}
+
+
+def random_profile(rng):
+    from carbon_engine import DIET_TYPES, TRANSPORT_MODES
+
+    return {
+        "transport_mode": rng.choice(TRANSPORT_MODES), "daily_distance": round(rng.uniform(0, 100), 1),
+        "flight_domestic": rng.randint(0, 10), "flight_international": rng.randint(0, 5),
+        "monthly_kwh": round(rng.uniform(0, 2000), 1), "diet_type": rng.choice(DIET_TYPES),
+        "meals_per_day": rng.randint(1, 5), "clothes_purchased": rng.randint(0, 100),
+        "plastic_use": round(rng.uniform(0, 10), 1), "weekly_waste": round(rng.uniform(0, 50), 1),
+    }
+
+
+def build_requests(endpoint, host, distinct, batch_size, seed):
+    """Raw HTTP/1.1 requests (keep-alive) for ``endpoint``, ``distinct`` different bodies."""
+    rng = random.Random(seed)
+    requests = []
+    for i in range(distinct):
+        if endpoint == "footprints":
+            body = {"profiles": [random_profile(rng) for _ in range(batch_size)]}
+        else:
+            body = dict(random_profile(rng), name=f"Load {i}", age=30)
+        payload = json.dumps(body).encode()
+        head = (f"POST {PATHS[endpoint]} HTTP/1.1\r\nHost: {host}\r\nContent-Type: application/json\r\n"
+                f"Content-Length: {len(payload)}\r\n\r\n").encode()
+        requests.append(head + payload)
+    return requests
+
+
+async def _read_response(reader):
+    status_line = await reader.readline()
+    if not status_line:
+        raise ConnectionError("connection closed")
+    status = int(status_line.split()[1])
+    length, chunked = 0, False
+    while True:
+        line = await reader.readline()
+        if line in (b"\r\n", b""):
+            break
+        name, _, value = line.decode("latin-1").partition(":")
+        name = name.strip().lower()
+        if name == "content-length":
+            length = int(value)
+        elif name == "transfer-encoding" and "chunked" in value.lower():
+            chunked = True
+    if chunked:
+        while True:
+            size = int((await reader.readline()).strip(), 16)
+            await reader.readexactly(size + 2)
+            if size == 0:
+                break
+    else:
+        await reader.readexactly(length)
+    return status
+
+
+async def _connection(host, port, requests, deadline, offset, latencies, statuses):
+    reader, writer = await asyncio.open_connection(host, port)
+    i = offset
+    try:
+        while time.perf_counter() < deadline:
+            start = time.perf_counter()
+            writer.write(requests[i % len(requests)])
+            status = await _read_response(reader)
+            latencies.append(time.perf_counter() - start)
+            statuses[status] = statuses.get(status, 0) + 1
+            i += 1
+    except (ConnectionError, asyncio.IncompleteReadError) as exc:
+        statuses[type(exc).__name__] = statuses.get(type(exc).__name__, 0) + 1
+    finally:
+        writer.close()
+
+
+def run_client(url, endpoint, connections, duration, distinct, batch_size, seed):
+    """One client process: ``connections`` keep-alive loops until the deadline."""
+    parts = urlsplit(url)
+    requests = build_requests(endpoint, parts.netloc, distinct, batch_size, seed)
+    latencies, statuses = [], {}
+
+    async def main():
+        deadline = time.perf_counter() + duration
+        await asyncio.gather(*(_connection(parts.hostname, parts.port or 80, requests, deadline, c * 7,
+                                           latencies, statuses) for c in range(connections)))
+
+    asyncio.run(main())
+    return latencies, statuses
+
+
+def _free_port():
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def start_server(workers, port, timeout=60.0):
+    proc = subprocess.Popen([sys.executable, os.path.join(HERE, "api.py"), "--port", str(port),
+                             "--workers", str(workers)], cwd=HERE)
+    url = f"http://127.0.0.1:{port}"
+    deadline = time.perf_counter() + timeout
+    while time.perf_counter() < deadline:
+        try:
+            with urlopen(url + "/health", timeout=1):
+                return proc, url
+        except OSError:
+            if proc.poll() is not None:
+                raise RuntimeError("api.py exited during startup")
+            time.sleep(0.2)
+    proc.terminate()
+    raise TimeoutError("api.py did not become healthy in time")
+
+
+def run(url=None, workers=4, clients=2, connections=64, duration=10.0, endpoint="footprint",
+        distinct=1000, batch_size=100, seed=0, warmup=2.0):
+    proc = None
+    if url is None:
+        proc, url = start_server(workers, _free_port())
+    try:
+        context = multiprocessing.get_context("spawn")
+        with context.Pool(clients) as pool:
+            if warmup:
+                pool.starmap(run_client, [(url, endpoint, connections, warmup, distinct, batch_size, seed + c)
+                                          for c in range(clients)])
+            start = time.perf_counter()
+            outputs = pool.starmap(run_client, [(url, endpoint, connections, duration, distinct, batch_size,
+                                                 seed + c) for c in range(clients)])
+            elapsed = time.perf_counter() - start
+    finally:
+        if proc is not None:
+            proc.terminate()
+            proc.wait(timeout=30)
+
+    latencies = sorted(s for lat, _ in outputs for s in lat)
+    statuses = {}
+    for _, counts in outputs:
+        for status, n in counts.items():
+            statuses[str(status)] = statuses.get(str(status), 0) + n
+    q = statistics.quantiles(latencies, n=100, method="inclusive") if len(latencies) > 1 else [0.0] * 99
+    ok = statuses.get("200", 0)
+    return {
+        "config": {"url": url, "workers": None if proc is None and url else workers, "clients": clients,
+                   "connections": clients * connections, "duration_s": duration, "endpoint": endpoint,
+                   "distinct": distinct, "batch_size": batch_size if endpoint == "footprints" else None},
+        "requests": len(latencies),
+        "requests_per_s": len(latencies) / elapsed if elapsed else 0.0,
+        "profiles_per_s": ok * (batch_size if endpoint == "footprints" else 1) / elapsed if elapsed else 0.0,
+        "latency": {"p50_s": q[49], "p95_s": q[94], "p99_s": q[98], "max_s": latencies[-1] if latencies else None},
+        "statuses": statuses,
+        "cpus": os.cpu_count(),
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Load test the carbon footprint API.")
+    parser.add_argument("--url", help="target an already running API instead of starting one")
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1, help="API worker processes to start")
+    parser.add_argument("--clients", type=int, default=2, help="client processes")
+    parser.add_argument("--connections", type=int, default=64, help="keep-alive connections per client")
+    parser.add_argument("--duration", type=float, default=10.0, help="seconds to measure")
+    parser.add_argument("--endpoint", choices=sorted(PATHS), default="footprint")
+    parser.add_argument("--distinct", type=int, default=1000, help="different request bodies to cycle through")
+    parser.add_argument("--batch-size", type=int, default=100, help="profiles per /v1/footprints request")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--out", default="api_loadtest_results.json", help="where to write the JSON report")
+    args = parser.parse_args(argv)
+
+    sys.path.insert(0, HERE)
+    report = run(args.url, args.workers, args.clients, args.connections, args.duration, args.endpoint,
+                 args.distinct, args.batch_size, args.seed)
+    lat = report["latency"]
+    print(f"{report['requests']:,} requests in {args.duration:.0f}s: {report['requests_per_s']:,.0f} req/s "
+          f"({report['profiles_per_s']:,.0f} profiles/s)")
+    print(f"latency p50 {lat['p50_s'] * 1000:.1f} ms  p95 {lat['p95_s'] * 1000:.1f} ms  "
+          f"p99 {lat['p99_s'] * 1000:.1f} ms")
+    print("statuses:", report["statuses"])
+    with open(args.out, "w") as f:
+        json.dump(report, f, indent=2)
+    print(f"Report written to {args.out}")
+    return 0 if set(report["statuses"]) <= {"200"} else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,18 +1,61 @@
+import time
+_script_start = time.perf_counter()
+
 import streamlit as st
-import matplotlib.pyplot as plt
-import plotly.express as px
-from io import BytesIO
-import requests
 from datetime import datetime
-from fpdf import FPDF
-import base64
 import random
 import os
+from assets import prepare_background
+from carbon_engine import TRANSPORT_MODES, DIET_TYPES, PROFILE_COLUMNS, calculate_incremental
+from factor_registry import get_factor_tables
+from charts import pie_chart_png
+from report import TIPS
+from report_cache import ReportCache, report_key
+from report_pool import ReportPool
+from whatif import CHOICES, INPUT_LABELS, INPUT_RANGES, sweep, tornado, heatmap_figure, tornado_figure
+from sheet_queue import SubmissionQueue, SENT, FAILED
+from history import FootprintHistory, is_user_id, new_user_id
+from percentiles import MIN_POPULATION, PercentileStore
+from photos import prepare_photo
+from session_memory import SessionMemory
+from recommendations import rank_actions
+from uncertainty import footprint_intervals
+from electricity import LOAD_TEMPLATES, analyse, average_day, grid_intensity, load_meter_csv, template_load
+from organisation import OPTIONAL_COLUMNS, ReportZip, compute, department_summary, load_profiles
+import metrics
+import profiler
+from metrics import stage
+from warmup import record_startup, start_warmup
+# Modul berat (pandas, plotly, matplotlib) baru di-import saat bagian hasil dipakai
+_imports_done = time.perf_counter()
 
 # === Streamlit Config ===
 st.set_page_config(layout="wide", page_title="Personal Carbon Calculator")
 st.title("🧮 Personal Carbon Footprint Calculator")
 
+# Sekali per proses server: siapkan Agg, font cache & modul berat di background
+start_warmup()
+
+# === Metrik per tahap (aktif hanya dengan CARBON_METRICS=1, lihat metrics.py) ===
+metrics.begin_rerun()
+
+# === Profiler on-demand (aktif hanya dengan CARBON_PROFILER=1, lihat profiler.py) ===
+if profiler.ENABLED:
+    profiler.arm_from_query(st.session_state, st.query_params)
+    profiler.begin(st.session_state)
+
+def end_rerun():
+    if profiler.ENABLED:
+        profiler.end(st.session_state)
+    st.session_state.last_rerun_metrics = metrics.end_rerun()
+
+@st.cache_resource
+def start_metrics_exporter():
+    port = os.environ.get("CARBON_METRICS_PORT")
+    return metrics.start_exporter(int(port)) if metrics.ENABLED and port else None
+
+start_metrics_exporter()
+
 # Garis
 st.markdown("<hr style='border: 1px solid black;'>", unsafe_allow_html=True)
 
@@ -22,56 +65,211 @@ if 'calculation_done' not in st.session_state:
     st.session_state.calculation_done = False
     st.session_state.results = {}
 
-# === Definisi Class PDF (SUDAH BENAR) ===
-class PDF(FPDF):
-    def header(self):
-        self.set_font("Arial", "B", 14)
-        self.cell(0, 10, "Carbon Footprint Report", ln=True, align="C")
-        self.ln(10)
-
-    def chapter_title(self, title):
-        self.set_font("Arial", "B", 12)
-        self.cell(0, 10, title, ln=True)
-        self.ln(2)
-
-    def chapter_body(self, body):
-        self.set_font("Arial", "", 11)
-        # Mengatasi error unicode dengan FPDF
-        self.multi_cell(0, 10, body.encode('latin-1', 'replace').decode('latin-1'))
-        self.ln()
-
-# === Background & Styling (SUDAH BENAR) ===
-def get_base64_from_path(file_path):
-    try:
-        with open(file_path, "rb") as f:
-            data = f.read()
-        return base64.b64encode(data).decode()
-    except FileNotFoundError:
-        st.warning(f"File background tidak ditemukan di: {file_path}. Pastikan path file sudah benar.")
-        return None
-
-backgroundfp_base64 = get_base64_from_path("C:/Users/abror/Downloads/Test New/foto_carbon.jpg")
-
-if backgroundfp_base64:
-    st.markdown(f"""
-        <style>
-        .stApp {{
-            background-image: url("data:image/jpg;base64,{backgroundfp_base64}");
-            background-size: cover;
-            background-repeat: no-repeat;
-            background-attachment: fixed;
-            background-position: center;
-        }}
-        /* Sisanya sama */
-        h1, h2, h3, h4, h5, h6, label, p, span, div, .stTextInput > label, .stSlider > label, .stNumberInput > label, .stSelectbox > label, .stButton > button {{
-            color: black !important;
-        }}
-        button[kind="primary"] {{
-            background-color: #0E1117 !important;
-            color: white !important;
-        }}
-        </style>
-    """, unsafe_allow_html=True)
+# === Memori per sesi: hasil ringkas di RAM, blob besar (foto) ke disk (lihat session_memory.py) ===
+@st.cache_resource
+def get_session_memory():
+    memory = SessionMemory()
+    metrics.register_gauges("session_memory", memory.usage)
+    return memory
+
+if 'memory_account' not in st.session_state:
+    st.session_state.memory_account = get_session_memory().open_account()
+
+# === Antrian pengiriman ke Sheet.best (satu worker per proses server) ===
+@st.cache_resource
+def get_submission_queue():
+    return SubmissionQueue().start()
+
+# === Cache laporan PDF (memori + disk, dibagi semua sesi) ===
+@st.cache_resource
+def get_report_cache():
+    return ReportCache()
+
+# === Pool proses untuk membangun PDF (baru jalan saat user meminta laporan) ===
+@st.cache_resource
+def get_report_pool():
+    return ReportPool(on_done=get_report_cache().put)
+
+# === Riwayat jejak karbon bulanan (SQLite lokal, lihat history.py) ===
+@st.cache_resource
+def get_history():
+    return FootprintHistory()
+
+# Riwayat dikunci ke id anonim per browser (cookie), bukan ke nama yang bisa diketik siapa saja
+HISTORY_COOKIE = "carbon_history_id"
+
+def history_user():
+    if "history_user" not in st.session_state:
+        user = st.context.cookies.get(HISTORY_COOKIE)
+        if not is_user_id(user):
+            user = new_user_id()
+            # Sekali per sesi baru; berlaku setahun untuk kunjungan berikutnya dari browser ini
+            st.html(f"<script>document.cookie = '{HISTORY_COOKIE}={user}; max-age=31536000; path=/; "
+                    f"SameSite=Strict';</script>", unsafe_allow_javascript=True)
+        st.session_state.history_user = user
+    return st.session_state.history_user
+
+# === Sketch persentil populasi (satu shard per proses, lihat percentiles.py) ===
+@st.cache_resource
+def get_percentile_store():
+    return PercentileStore()
+
+@st.fragment(run_every=0.5)
+def report_progress(future):
+    # Polling hanya fragment kecil ini; saat selesai, satu rerun penuh menampilkan tombol download
+    if future.done():
+        st.rerun()
+    stats = get_report_pool().stats()
+    elapsed = time.perf_counter() - future.submitted_at
+    expected = get_report_pool().expected_seconds() or 3.0
+    st.progress(min(elapsed / expected, 0.95),
+                text=f"⏳ Building your report... ({stats['queue_depth']} waiting, {elapsed:.1f}s)")
+
+@st.fragment
+@metrics.fragment("report_download")
+def report_download(res):
+    key = report_key(res)
+    job = st.session_state.get("report_job")
+    ready = False
+
+    if job is not None and job["key"] == key:
+        future = job["future"]
+        if not future.done():
+            report_progress(future)
+            return
+        del st.session_state["report_job"]
+        if future.exception() is not None:
+            st.error("❌ Failed to build the PDF report. Please try again.")
+        else:
+            ready = True  # on_done pool sudah memasukkannya ke cache
+    if not ready and get_report_cache().get(key) is None:
+        if not st.button("📄 Prepare PDF report"):
+            return
+        if profiler.ENABLED and profiler.armed(st.session_state):
+            # Saat diprofil, PDF dibangun di thread script supaya ikut terekam (pool = proses lain)
+            with profiler.section(st.session_state):
+                from report import build_report_pdf
+                get_report_cache().put(key, build_report_pdf(get_session_memory().expand(res)))
+        else:
+            future = get_report_pool().submit(key, get_session_memory().expand(res))
+            if future is None:
+                st.warning("Server sedang sibuk membuat laporan lain. Coba lagi sebentar lagi.")
+            else:
+                st.session_state.report_job = {"key": key, "future": future}
+                report_progress(future)
+            return
+
+    # Byte PDF tidak disimpan di sesi: diambil dari cache (atau dibangun ulang) saat tombol diklik
+    def pdf_data():
+        data = get_report_cache().get(key)
+        if data is None:
+            from report import build_report_pdf
+            data = build_report_pdf(get_session_memory().expand(res))
+            get_report_cache().put(key, data)
+        return data
+
+    st.download_button(
+        label="Download Your Report (PDF)",
+        data=pdf_data,
+        file_name=f"carbon_report_{res['name']}.pdf",
+        mime="application/pdf"
+    )
+
+@st.fragment
+@metrics.fragment("what_if")
+def what_if_explorer(res):
+    # Widget di sini hanya me-rerun fragment ini; satu grid = satu kalkulasi batch (lihat whatif.py)
+    options = list(CHOICES) + list(INPUT_RANGES)
+    col_x, col_y, col_n = st.columns(3)
+    x = col_x.selectbox("X axis", options, index=options.index("daily_distance"), format_func=INPUT_LABELS.get)
+    y = col_y.selectbox("Y axis", [o for o in options if o != x], format_func=INPUT_LABELS.get)
+    points = col_n.slider("Points per numeric axis", 10, 200, 100, step=10)
+
+    # Rerun fragment tidak lewat begin/end di atas; section() merekamnya kalau profiler dipasang
+    with profiler.section(st.session_state):
+        with stage("what_if"):
+            x_values, y_values, totals = sweep(res['inputs'], x, y, points, res['country'])
+            base, rows = tornado(res['inputs'], res['country'])
+        st.plotly_chart(heatmap_figure(res['inputs'], x, y, x_values, y_values, totals), use_container_width=True)
+        st.caption(f"{totals.size:,} scenarios · lowest {totals.min():.2f} t, highest {totals.max():.2f} t CO₂/year")
+        st.plotly_chart(tornado_figure(base, rows), use_container_width=True)
+
+@st.fragment
+@metrics.fragment("hourly_electricity")
+def hourly_electricity(res):
+    # Listrik per jam: profil beban x intensitas jaringan per jam (lihat electricity.py)
+    import plotly.graph_objects as go
+
+    monthly_kwh = res['inputs']['monthly_kwh']
+    col_source, col_shift = st.columns(2)
+    source = col_source.radio("Load profile", ["Template", "Meter CSV"], horizontal=True)
+    share = col_shift.slider("Share of daily use you could shift (%)", 0, 50, 20, step=5) / 100
+    if source == "Template":
+        template = st.selectbox("Usage pattern", list(LOAD_TEMPLATES), format_func=lambda k: LOAD_TEMPLATES[k]["label"])
+        load = template_load(template, monthly_kwh)
+    else:
+        meter = st.file_uploader("Hourly (or finer) meter readings: timestamp, kWh", type="csv", key="meter_csv")
+        if meter is None:
+            return
+        try:
+            load = load_meter_csv(meter)
+        except ValueError as exc:
+            st.error(f"❌ {exc}")
+            return
+
+    with stage("hourly_electricity"):
+        intensity = grid_intensity(res['country'])
+        hourly = analyse(load, intensity, res['country'], share)
+    col_hourly, col_flat, col_saved = st.columns(3)
+    col_hourly.metric("Hourly-based (tonnes CO₂/year)", f"{hourly['hourly_kg'] / 1000:.2f}",
+                      delta=f"{(hourly['hourly_kg'] - hourly['flat_kg']) / 1000:+.2f} vs flat factor", delta_color="inverse")
+    col_flat.metric("Your electricity (kWh/year)", f"{hourly['kwh']:,.0f}")
+    col_saved.metric(f"Shifting {share:.0%} of daily use saves", f"{hourly['shift_saved_kg']:.0f} kg CO₂/year")
+    if len(hourly['per_year_kg']) > 1:
+        st.caption(f"Across {len(hourly['per_year_kg'])} years of grid data: "
+                   f"{min(hourly['per_year_kg']) / 1000:.2f}–{max(hourly['per_year_kg']) / 1000:.2f} tonnes CO₂/year")
+    st.caption(f"Cleanest hour on average: {hourly['cleanest_hour']:02d}:00 · dirtiest: {hourly['dirtiest_hour']:02d}:00")
+
+    hours = list(range(24))
+    fig = go.Figure()
+    fig.add_bar(x=hours, y=average_day(load), name="Your use (kWh)", marker_color="darkblue")
+    fig.add_bar(x=hours, y=average_day(hourly['shifted_load']), name="After shifting (kWh)", marker_color="lightgreen")
+    fig.add_scatter(x=hours, y=average_day(intensity.mean(axis=0)), name="Grid intensity (kg CO₂/kWh)", yaxis="y2",
+                    line_color="firebrick")
+    fig.update_layout(title="Average day", barmode="group", xaxis_title="Hour of day", yaxis_title="kWh",
+                      yaxis2=dict(title="kg CO₂/kWh", overlaying="y", side="right"), height=360,
+                      plot_bgcolor='rgba(0,0,0,0)', paper_bgcolor='rgba(0,0,0,0)', font_color='black',
+                      legend=dict(orientation="h", y=-0.25))
+    st.plotly_chart(fig, use_container_width=True)
+
+# === Background & Styling ===
+# Gambar background di-resize sekali per proses dan disajikan sebagai file statis
+# (lihat assets.py), jadi CSS per rerun tidak lagi berisi base64 ~5 MB.
+with stage("styling"):
+    background = prepare_background()
+
+    if background:
+        st.markdown(f"""
+            <style>
+            {background['css']}
+            .stApp {{
+                background-size: cover;
+                background-repeat: no-repeat;
+                background-attachment: fixed;
+                background-position: center;
+            }}
+            /* Sisanya sama */
+            h1, h2, h3, h4, h5, h6, label, p, span, div, .stTextInput > label, .stSlider > label, .stNumberInput > label, .stSelectbox > label, .stButton > button {{
+                color: black !important;
+            }}
+            button[kind="primary"] {{
+                background-color: #0E1117 !important;
+                color: white !important;
+            }}
+            </style>
+        """, unsafe_allow_html=True)
+    else:
+        st.warning("File background tidak ditemukan. Pastikan foto_carbon.jpg ada di folder aplikasi.")
 
 
 # === Sidebar: Language & About us (SUDAH BENAR) ===
@@ -93,109 +291,102 @@ tips_daily = {
 st.sidebar.markdown("### 🌍 Eco Tip of the Day")
 st.sidebar.success(random.choice(tips_daily[language]))
 
+# === Mode organisasi: satu CSV berisi banyak karyawan (lihat organisation.py) ===
+mode = st.sidebar.radio("👥 Mode", ["Personal", "Organisation"], horizontal=True)
+
+@st.cache_data(max_entries=4, show_spinner=False)
+def organisation_results(data):
+    from io import BytesIO
+    return compute(load_profiles(BytesIO(data)))
+
+@st.fragment(run_every=1.0)
+def organisation_zip_progress(job):
+    status = job.status()
+    if status["finished"]:
+        st.rerun()
+    st.progress(status["done"] / status["total"],
+                text=f"⏳ Building reports... {status['done']:,}/{status['total']:,} ({status['elapsed_s']:.0f}s)")
+
+def organisation_mode():
+    import plotly.express as px
+    from carbon_engine import CATEGORIES
+
+    st.subheader("🏢 Organisation Footprint")
+    st.caption(f"Upload a CSV with one row per employee. Required columns: {', '.join(PROFILE_COLUMNS)}. "
+               f"Optional: {', '.join(OPTIONAL_COLUMNS)}.")
+    upload = st.file_uploader("Employee profiles (CSV)", type="csv", key="org_csv")
+    if upload is None:
+        return
+    try:
+        with stage("org_calculation"):
+            people = organisation_results(upload.getvalue())
+    except ValueError as exc:
+        st.error(f"❌ {exc}")
+        return
+
+    summary = department_summary(people)
+    col_people, col_total, col_avg = st.columns(3)
+    col_people.metric("People", f"{len(people):,}")
+    col_total.metric("Total (tonnes CO₂/year)", f"{people['total_tonnes'].sum():,.1f}")
+    col_avg.metric("Average per person", f"{people['total_tonnes'].mean():.2f}")
+
+    st.markdown("### 🏬 By Department")
+    st.dataframe(summary, use_container_width=True)
+    totals = people.groupby("department")[CATEGORIES].sum().reset_index()
+    fig = px.bar(totals, x="department", y=CATEGORIES, title="Annual emissions by department and category",
+                 labels={"value": "Tonnes CO₂", "department": "Department", "variable": "Category"})
+    fig.update_layout(plot_bgcolor='rgba(0,0,0,0)', paper_bgcolor='rgba(0,0,0,0)', font_color='black')
+    st.plotly_chart(fig, use_container_width=True)
+    fig_hist = px.histogram(people, x="total_tonnes", color="department", nbins=40,
+                            labels={"total_tonnes": "Tonnes CO₂/year per person"}, title="Distribution per person")
+    fig_hist.update_layout(plot_bgcolor='rgba(0,0,0,0)', paper_bgcolor='rgba(0,0,0,0)', font_color='black')
+    st.plotly_chart(fig_hist, use_container_width=True)
+
+    # --- Semua laporan PDF sebagai satu ZIP, ditulis bertahap ke static/ ---
+    st.markdown("### 📦 Individual Reports")
+    upload_key = (upload.file_id, len(people))
+    job = st.session_state.get("org_zip")
+    if job is not None and job["key"] == upload_key:
+        zip_job = job["job"]
+        # status() juga menghapus ZIP yang sudah kedaluwarsa (lihat organisation.py)
+        status = zip_job.status()
+        if not status["finished"]:
+            organisation_zip_progress(zip_job)
+        elif status["error"]:
+            st.error(f"❌ Failed to build the reports: {status['error']}")
+            del st.session_state["org_zip"]
+        elif status["expired"]:
+            st.info("⌛ The ZIP link has expired. Build the reports again to download them.")
+            del st.session_state["org_zip"]
+        else:
+            st.markdown(f"✅ [Download all {zip_job.total:,} reports (ZIP)]({zip_job.url})")
+            st.caption("The link stays valid for about an hour.")
+    elif st.button(f"📄 Build {len(people):,} PDF reports"):
+        zip_job = ReportZip(people, get_report_pool()).start()
+        st.session_state.org_zip = {"key": upload_key, "job": zip_job}
+        organisation_zip_progress(zip_job)
+
+if mode == "Organisation":
+    organisation_mode()
+    end_rerun()
+    st.stop()
+
 # === UI Input Pengguna (SUDAH BENAR) ===
-country = "Indonesia"
 st.subheader("🙋 User Info")
-name = st.text_input("Your name" if language == "English" else "Nama Anda")
-age = st.number_input("Your age" if language == "English" else "Usia Anda", min_value=5, max_value=120, value=25, step=1)
-photo = st.camera_input("Take a photo (optional)" if language == "English" else "Ambil foto (opsional)")
-
-EMISSION_FACTORS = { "Indonesia": { "Transportation": {"car": 0.21, "motorcycle": 0.09, "bus": 0.105, "train": 0.045, "walk_or_bike": 0.0}, "Electricity": 0.82, "Diet": {"meat_heavy": 2.5, "omnivore": 1.5, "vegetarian": 1.0, "vegan": 0.6}, "Waste": 0.1, "Flights": {"domestic": 250, "international": 900}, "Plastic": 6.0, "Clothing": 20 } }
-
-st.header("🚗 Transportation")
-col1, col2 = st.columns(2)
-with col1:
-    transport_mode = st.selectbox("Mode of daily transport", ["car", "motorcycle", "bus", "train", "walk_or_bike"])
-    daily_distance = st.slider("Daily commute distance (km)", 0.0, 100.0, 10.0)
-with col2:
-    flight_domestic = st.number_input("Domestic flights per year", 0, step=1)
-    flight_international = st.number_input("International flights per year", 0, step=1)
-
-st.header("💡 Energy Consumption")
-monthly_kwh = st.slider("Monthly electricity usage (kWh)", 0.0, 2000.0, 400.0)
-
-st.header("🍽️ Diet & Consumption")
-col3, col4 = st.columns(2)
-with col3:
-    diet_type = st.selectbox("Your diet type", ["meat_heavy", "omnivore", "vegetarian", "vegan"])
-    meals_per_day = st.slider("Meals per day", 1, 5, 3)
-with col4:
-    clothes_purchased = st.number_input("Clothes purchased per year", 0, 100, 10)
-    plastic_use = st.slider("Plastic waste per week (kg)", 0.0, 10.0, 1.0)
-
-st.header("🗑️ Household Waste")
-weekly_waste = st.slider("General waste per week (kg)", 0.0, 50.0, 5.0)
-
-
-# === BAGIAN LOGIKA UTAMA: Kalkulasi & Penyimpanan State ===
-# Ini adalah bagian yang direvisi total.
-# Tugas blok ini hanya MENGHITUNG dan MENYIMPAN ke memori.
-if st.button("🧾 Calculate My Carbon Footprint", type="primary"):
-    # 1. Lakukan semua kalkulasi satu kali. Hapus semua duplikasi.
-    yearly_distance = daily_distance * 365
-    yearly_kwh = monthly_kwh * 12
-    yearly_meals = meals_per_day * 365
-    yearly_plastic = plastic_use * 52
-    yearly_waste = weekly_waste * 52
-
-    transport_emission = yearly_distance * EMISSION_FACTORS["Indonesia"]["Transportation"][transport_mode]
-    flight_emission = flight_domestic * EMISSION_FACTORS["Indonesia"]["Flights"]["domestic"] + flight_international * EMISSION_FACTORS["Indonesia"]["Flights"]["international"]
-    electricity_emission = yearly_kwh * EMISSION_FACTORS["Indonesia"]["Electricity"]
-    diet_emission = EMISSION_FACTORS["Indonesia"]["Diet"][diet_type] * yearly_meals
-    clothing_emission = clothes_purchased * EMISSION_FACTORS["Indonesia"]["Clothing"]
-    plastic_emission = yearly_plastic * EMISSION_FACTORS["Indonesia"]["Plastic"]
-    waste_emission = yearly_waste * EMISSION_FACTORS["Indonesia"]["Waste"]
-
-    total_emissions_kg = sum([transport_emission, flight_emission, electricity_emission, diet_emission, clothing_emission, plastic_emission, waste_emission])
-    total_tonnes = round(total_emissions_kg / 1000, 2)
-    trees_needed = int(total_emissions_kg / 21) # 1 pohon serap 21 kg CO2/tahun
-
-    emission_data_tonnes = {
-        "Transportation": transport_emission / 1000, "Flights": flight_emission / 1000,
-        "Electricity": electricity_emission / 1000, "Diet": diet_emission / 1000,
-        "Clothing": clothing_emission / 1000, "Plastic": plastic_emission / 1000,
-        "Waste": waste_emission / 1000,
-    }
-    
-    if total_tonnes < 3:
-        rating_display, rating_pdf = "🟢 Low", "Low"
-    elif total_tonnes < 7:
-        rating_display, rating_pdf = "🟡 Medium", "Medium"
-    else:
-        rating_display, rating_pdf = "🔴 High", "High"
-
-    # Cari kategori emisi tertinggi
-    highest_emission_category = max(emission_data_tonnes, key=emission_data_tonnes.get)
-
-    # 2. Simpan SEMUA hasil yang dibutuhkan nanti ke dalam 'st.session_state.results'
-    st.session_state.results = {
-        "name": name,
-        "age": age,
-        "country": country,
-        "photo_bytes": photo.getvalue() if photo else None,
-        "total_tonnes": total_tonnes,
-        "trees_needed": trees_needed,
-        "rating_display": rating_display,
-        "rating_pdf": rating_pdf,
-        "emission_data_tonnes": emission_data_tonnes,
-        "highest_emission_category": highest_emission_category,
-    }
-    
-    # 3. Tandai bahwa kalkulasi sudah selesai
-    st.session_state.calculation_done = True
-    
-    # 4. Paksa script untuk jalan ulang agar masuk ke blok penampilan hasil
-    st.rerun()
-
-
-# === BAGIAN PENAMPILAN HASIL & PEMBUATAN PDF ===
-# Ini juga bagian yang direvisi total.
-# Blok ini hanya berjalan JIKA kalkulasi sudah selesai.
-# Tugasnya hanya MEMBACA dari memori dan MENAMPILKAN.
-if st.session_state.calculation_done:
-    # Ambil semua hasil dari "memori"
-    res = st.session_state.results
-
+regions = get_factor_tables().regions
+country = st.selectbox("Country" if language == "English" else "Negara", regions,
+                       index=regions.index("Indonesia") if "Indonesia" in regions else 0, key="country")
+name = st.text_input("Your name" if language == "English" else "Nama Anda", key="name")
+age = st.number_input("Your age" if language == "English" else "Usia Anda", min_value=5, max_value=120, value=25, step=1, key="age")
+photo = st.camera_input("Take a photo (optional)" if language == "English" else "Ambil foto (opsional)", key="photo")
+
+# === BAGIAN PENAMPILAN HASIL ===
+# Dipanggil dari fragment input dengan hasil live. Hanya angka utama (total,
+# rating, rincian kategori) yang dihitung ulang tiap slider digeser; bagian berat
+# (Monte Carlo, peringkat, grafik, rekomendasi, listrik per jam, what-if) baru
+# jalan setelah toggle-nya dinyalakan. Expander tidak cukup: isinya tetap
+# dijalankan walau tertutup.
+def results_view(res):
     # --- Tampilkan Hasil di Aplikasi Streamlit ---
     st.success(f"🌍 Your estimated total carbon footprint is **{res['total_tonnes']} tonnes CO₂/year**")
 
@@ -205,40 +396,162 @@ if st.session_state.calculation_done:
     st.markdown("### 🔍 Breakdown by Category (in tonnes CO₂)")
     for category, value in res['emission_data_tonnes'].items():
         st.info(f"{category}: {round(value, 2)}")
-    
-    st.markdown("## 📊 Visualize Your Carbon Footprint")
-    col_left, col_right = st.columns(2)
-    with col_left:
-        st.markdown("### 🥧 Pie Chart")
-        fig1, ax1 = plt.subplots()
-        ax1.pie(res['emission_data_tonnes'].values(), labels=res['emission_data_tonnes'].keys(), autopct='%1.1f%%', startangle=90, textprops={'color': 'black'})
-        ax1.axis('equal')
-        fig1.patch.set_alpha(0)  # Membuat background figure transparan
-        ax1.patch.set_alpha(0)  # Membuat background axes transparan
-        st.pyplot(fig1)
-    with col_right:
-        st.markdown("### 📈 Bar Chart")
-        fig2 = px.bar(x=list(res['emission_data_tonnes'].keys()), y=list(res['emission_data_tonnes'].values()), labels={'x': 'Category', 'y': 'Tonnes CO₂'}, title="Annual Emissions by Category")
-        fig2.update_layout(plot_bgcolor='rgba(0,0,0,0)', paper_bgcolor='rgba(0,0,0,0)', font_color='black', title_font_color='black')
-        fig2.update_traces(marker_color='darkblue')
-        st.plotly_chart(fig2, use_container_width=True)
 
     st.markdown("## 🌳 Carbon Offset Suggestion")
     st.info(f"To offset your footprint, you would need to plant approximately **{res['trees_needed']} trees**.")
     st.caption("Note: One mature tree absorbs about 21 kg of CO₂ per year on average.")
-    
+
     st.markdown("## 🌱 Lifestyle Recommendations")
     highest_emission_category = res['highest_emission_category']
-    tips = {
-        "Transportation": ["Cobalah menggunakan transportasi umum atau berbagi kendaraan (carpool)."], "Flights": ["Kurangi frekuensi penerbangan, terutama penerbangan internasional."],
-        "Electricity": ["Gunakan lampu LED hemat energi dan cabut perangkat elektronik jika tidak digunakan."], "Diet": ["Kurangi konsumsi daging merah dan olahan."],
-        "Clothing": ["Kurangi pembelian pakaian baru; pilih produk second-hand atau berkualitas tinggi agar tahan lama."], "Plastic": ["Gunakan botol dan tas belanja yang dapat digunakan ulang."],
-        "Waste": ["Pisahkan sampah organik dan anorganik."]
-    }
     st.subheader(f"📌 Fokus utama kamu: **{highest_emission_category}**")
-    for tip in tips.get(highest_emission_category, []):
+    for tip in TIPS.get(highest_emission_category, []):
         st.markdown(f"- {tip}")
 
+    if st.toggle("📊 Show detailed analysis (ranges, comparison, charts, biggest wins)", key="show_details"):
+        detailed_results(res)
+
+    st.markdown("## ⏱️ When You Use Electricity")
+    if st.toggle("Hourly grid intensity and load shifting", key="show_hourly"):
+        hourly_electricity(res)
+
+    st.markdown("## 🔮 What If?")
+    if st.toggle("Explore how your footprint changes with different habits", key="show_what_if"):
+        what_if_explorer(res)
+
+
+def detailed_results(res):
+    import plotly.express as px
+
+    with stage("uncertainty"):
+        # Monte Carlo faktor emisi (seeded, di-cache per profil; lihat uncertainty.py)
+        mc = footprint_intervals(res['inputs'], res['country'])
+    st.caption(f"{mc['level']:.0%} range: {mc['total']['low']:.2f}–{mc['total']['high']:.2f} tonnes CO₂/year "
+               f"(Monte Carlo over emission factor uncertainty, {mc['draws']:,} draws)")
+    st.caption("Chance of each rating given factor uncertainty: " + " · ".join(
+        f"{rating} {p:.0%}" for rating, p in mc['rating_probability'].items()))
+    st.table({"Category": list(res['emission_data_tonnes']),
+              "Tonnes CO₂": [round(value, 2) for value in res['emission_data_tonnes'].values()],
+              f"{mc['level']:.0%} range": [f"{mc['categories'][cat]['low']:.2f}–{mc['categories'][cat]['high']:.2f}"
+                                           for cat in res['emission_data_tonnes']]})
+
+    with stage("ranking"):
+        store = get_percentile_store()
+        population = store.count()
+        ranks = store.rank(res) if population >= MIN_POPULATION else None
+    if ranks:
+        st.markdown("### 📊 How You Compare")
+        st.info(f"Your footprint is higher than **{ranks['total']:.0f}%** of {population:,} submitted footprints.")
+        st.table({"Category": list(res['emission_data_tonnes']),
+                  "Higher than (%)": [round(ranks[cat]) for cat in res['emission_data_tonnes']]})
+
+    st.markdown("## 📊 Visualize Your Carbon Footprint")
+    with stage("charts"):
+        col_left, col_right = st.columns(2)
+        with col_left:
+            st.markdown("### 🥧 Pie Chart")
+            st.image(pie_chart_png(res['emission_data_tonnes']))
+        with col_right:
+            st.markdown("### 📈 Bar Chart")
+            fig2 = px.bar(x=list(res['emission_data_tonnes'].keys()), y=list(res['emission_data_tonnes'].values()), labels={'x': 'Category', 'y': 'Tonnes CO₂'}, title="Annual Emissions by Category")
+            fig2.update_layout(plot_bgcolor='rgba(0,0,0,0)', paper_bgcolor='rgba(0,0,0,0)', font_color='black', title_font_color='black')
+            fig2.update_traces(marker_color='darkblue')
+            st.plotly_chart(fig2, use_container_width=True)
+
+    # Setiap aksi dihitung ulang lewat engine dalam satu batch, diurutkan dari penghematan terbesar
+    with stage("recommendations"):
+        actions = rank_actions(res['inputs'], res['country'], top=5)
+    if actions:
+        st.markdown("### 🏆 Your Biggest Wins")
+        st.table({
+            "Action": [a['action'] for a in actions],
+            "Category": [a['category'] for a in actions],
+            "Saves (tonnes CO₂/year)": [f"{a['saved_tonnes']:.2f}" for a in actions],
+            "Equivalent trees": [a['trees'] for a in actions],
+        })
+
+
+# Input gaya hidup + hasil ada di fragment: menggeser slider hanya me-rerun bagian ini
+# (bukan pengiriman/laporan di bawah), dan angka utama langsung ikut berubah.
+# Slider Streamlit baru mengirim nilai saat dilepas, jadi input sudah ter-debounce.
+@st.fragment
+@metrics.fragment("lifestyle_inputs")
+def lifestyle_inputs(country):
+    st.header("🚗 Transportation")
+    col1, col2 = st.columns(2)
+    with col1:
+        st.selectbox("Mode of daily transport", TRANSPORT_MODES, key="transport_mode")
+        st.slider("Daily commute distance (km)", 0.0, 100.0, 10.0, key="daily_distance")
+    with col2:
+        st.number_input("Domestic flights per year", 0, step=1, key="flight_domestic")
+        st.number_input("International flights per year", 0, step=1, key="flight_international")
+
+    st.header("💡 Energy Consumption")
+    st.slider("Monthly electricity usage (kWh)", 0.0, 2000.0, 400.0, key="monthly_kwh")
+
+    st.header("🍽️ Diet & Consumption")
+    col3, col4 = st.columns(2)
+    with col3:
+        st.selectbox("Your diet type", DIET_TYPES, key="diet_type")
+        st.slider("Meals per day", 1, 5, 3, key="meals_per_day")
+    with col4:
+        st.number_input("Clothes purchased per year", 0, 100, 10, key="clothes_purchased")
+        st.slider("Plastic waste per week (kg)", 0.0, 10.0, 1.0, key="plastic_use")
+
+    st.header("🗑️ Household Waste")
+    st.slider("General waste per week (kg)", 0.0, 50.0, 5.0, key="weekly_waste")
+
+    # Tiap kategori di-memo pada inputnya sendiri; hanya yang berubah dihitung ulang
+    inputs = {column: st.session_state[column] for column in PROFILE_COLUMNS}
+    with stage("calculation"):
+        live = calculate_incremental(country, **inputs)
+    results_view({"country": country, "inputs": inputs, **live})
+    saved = st.session_state.results if st.session_state.calculation_done else None
+    if saved and (saved['inputs'] != inputs or saved['country'] != country):
+        st.caption("Inputs changed since you saved. Press Save to update the submission and report.")
+
+
+lifestyle_inputs(country)
+
+
+# === BAGIAN LOGIKA UTAMA: Penyimpanan State ===
+# Hasil di atas sudah live; tombol hanya menyimpan hasil untuk dikirim ke Sheet,
+# laporan PDF & riwayat. Dipanggil lewat on_click, jadi berjalan SEBELUM script
+# jalan ulang, tanpa st.rerun() kedua.
+def save_results():
+    inputs = {column: st.session_state[column] for column in PROFILE_COLUMNS}
+    country = st.session_state.country
+    with stage("calculation"):
+        footprint = calculate_incremental(country, **inputs)
+    with stage("uncertainty"):
+        # Monte Carlo faktor emisi (seeded, di-cache per profil; lihat uncertainty.py)
+        intervals = footprint_intervals(inputs, country)
+    photo = st.session_state.get("photo")
+    with stage("photo"):
+        # Simpan versi kecil siap-cetak saja, bukan foto kamera mentah
+        photo_bytes = prepare_photo(photo.getvalue()) if photo else None
+    # Foto pindah ke blob store; sesi hanya menyimpan rekaman ringkas
+    st.session_state.results = get_session_memory().compact(st.session_state.memory_account, "results", {
+        "name": st.session_state.name,
+        "age": st.session_state.age,
+        "country": country,
+        "photo_bytes": photo_bytes,
+        "inputs": inputs,
+        "uncertainty": intervals,
+        **footprint,
+    })
+    st.session_state.calculation_done = True
+    st.session_state.pop("submission_key", None)  # kirim (lagi) sekali per simpan
+
+
+st.button("🧾 Save My Results (submit & PDF report)", type="primary", on_click=save_results)
+
+
+# === BAGIAN PENGIRIMAN & PEMBUATAN PDF ===
+# Blok ini hanya berjalan JIKA hasil sudah disimpan.
+# Tugasnya hanya MEMBACA dari memori dan MENAMPILKAN.
+if st.session_state.calculation_done:
+    # Ambil semua hasil dari "memori"
+    res = st.session_state.results
     # --- Kirim ke Google Sheets ---
     if res['name'] and res['age']:
         payload = {
@@ -248,13 +561,24 @@ if st.session_state.calculation_done:
             "Clothing": round(res['emission_data_tonnes']['Clothing'], 2), "Plastic": round(res['emission_data_tonnes']['Plastic'], 2),
             "Waste": round(res['emission_data_tonnes']['Waste'], 2),
         }
-        SHEET_BEST_URL = "https://api.sheetbest.com/sheets/c1663a28-e75f-4501-8341-c497b1b9867b"
-        response = requests.post(SHEET_BEST_URL, json=payload)
-        
-        if response.status_code == 200:
+        # Dikirim di background (lihat sheet_queue.py), sekali per klik Save: rerun biasa hanya
+        # membaca status, jadi baris yang gagal baru dicoba ulang kalau user menyimpan lagi
+        with stage("submission"):
+            submission_key = st.session_state.get("submission_key")
+            if submission_key is None:
+                submission_key = st.session_state.submission_key = get_submission_queue().enqueue(payload)
+            submission_status = get_submission_queue().status(submission_key)
+            # Setiap hasil yang dikirim ikut masuk sketch persentil, sekali per hasil
+            if st.session_state.get("ranked_key") != submission_key:
+                get_percentile_store().add(res)
+                st.session_state.ranked_key = submission_key
+
+        if submission_status == SENT:
             st.success("✅ Data successfully submitted to Google Sheet!")
+        elif submission_status == FAILED:
+            st.error("❌ Failed to submit data. Please check your Sheet.best link, then press Save to try again.")
         else:
-            st.error("❌ Failed to submit data. Please check your Sheet.best link.")
+            st.info("🕒 Data queued for submission to Google Sheet.")
     else:
         st.warning("Isi nama dan umur terlebih dahulu agar data bisa dikirim ke spreadsheet.")
 
@@ -262,61 +586,88 @@ if st.session_state.calculation_done:
     st.markdown("---")
     st.subheader("Download Full Report")
 
-    # Membuat PDF di dalam memori
-    pdf = PDF()
-    pdf.add_page()
-    pdf.chapter_title("User Information")
-    pdf.chapter_body(f"Name: {res['name']}\nAge: {res['age']}\nCountry: {res['country']}")
-    
-    if res['photo_bytes']:
-        photo_path = "temp_photo.jpg"
-        with open(photo_path, "wb") as f:
-            f.write(res['photo_bytes'])
-        pdf.image(photo_path, w=100)
-        pdf.ln(5)
-
-    pdf.chapter_title("Total Carbon Footprint")
-    pdf.chapter_body(f"{res['total_tonnes']} tonnes CO2 per year")
-
-    pdf.chapter_title("Carbon Footprint Rating")
-    pdf.chapter_body(f"Your impact rating is: {res['rating_pdf']}") # Versi PDF tanpa emoji
-
-    pdf.chapter_title("Emission Breakdown (tonnes CO2)")
-    for cat, val in res['emission_data_tonnes'].items():
-        pdf.chapter_body(f"- {cat}: {round(val, 2)}")
-
-    pdf.chapter_title("Trees Needed to Offset")
-    pdf.chapter_body(f"You need approximately {res['trees_needed']} trees to offset your carbon emissions.")
-
-    pdf.chapter_title(f"Recommended Focus Area: {highest_emission_category}")
-    for tip in tips.get(highest_emission_category, []):
-        pdf.chapter_body(f"- {tip}")
-
-    # Simpan grafik untuk PDF
-    pie_chart_path, bar_chart_path = "pie_chart.png", "bar_chart.png"
-    fig_pie, ax_pie = plt.subplots()
-    ax_pie.pie(res['emission_data_tonnes'].values(), labels=list(res['emission_data_tonnes'].keys()), autopct='%1.1f%%', startangle=90)
-    ax_pie.axis('equal'); fig_pie.savefig(pie_chart_path); plt.close(fig_pie)
-    
-    fig_bar, ax_bar = plt.subplots(figsize=(8, 5)); ax_bar.bar(res['emission_data_tonnes'].keys(), res['emission_data_tonnes'].values(), color='skyblue')
-    ax_bar.set_ylabel("Tonnes CO2"); plt.setp(ax_bar.get_xticklabels(), rotation=45, ha="right"); fig_bar.tight_layout(); fig_bar.savefig(bar_chart_path); plt.close(fig_bar)
-    
-    pdf.add_page(); pdf.chapter_title("Charts"); pdf.image(pie_chart_path, w=150); pdf.ln(5); pdf.image(bar_chart_path, w=150)
-
-    # Ekspor PDF ke buffer
-    pdf_output = pdf.output(dest='S').encode('latin-1')
-    pdf_buffer = BytesIO(pdf_output)
+    # PDF dibangun di pool proses hanya kalau diminta; hasilnya masuk cache
+    with stage("report"):
+        report_download(res)
 
-    st.download_button(
-        label="Download Your Report (PDF)",
-        data=pdf_buffer,
-        file_name=f"carbon_report_{res['name']}.pdf",
-        mime="application/pdf"
-    )
+    with st.sidebar.expander("📦 Report cache & builds"):
+        st.json(get_report_cache().snapshot())
+        st.json(get_report_pool().stats())
+
+    with st.sidebar.expander("🧠 Session memory"):
+        st.json(get_session_memory().usage())
 
 # === Bagian paling bawah (SUDAH BENAR) ===
 st.sidebar.markdown("---")
 track_future = st.sidebar.checkbox("📅 Track my monthly carbon footprint", value=False)
 if track_future:
-    st.sidebar.info("🔔 We'll remind you to check your carbon footprint every month! (feature coming soon)")
-st.caption("📝 Emission factors are approximations. Results may vary based on lifestyle and region.")
\ No newline at end of file
+    res = st.session_state.results
+    if st.session_state.calculation_done:
+        user = history_user()
+        # Satu entri per hasil yang disimpan, bukan per rerun
+        entry = (res['country'], tuple(sorted(res['inputs'].items())))
+        if st.session_state.get("history_entry") != entry:
+            with stage("history"):
+                get_history().record(user, res)
+            st.session_state.history_entry = entry
+        with stage("history"):
+            monthly = get_history().monthly(user)
+            yearly = get_history().yearly(user)
+        import plotly.express as px
+        fig_trend = px.line(x=[f"{m // 100}-{m % 100:02d}" for m, *_ in monthly], y=[row[2] for row in monthly],
+                            markers=True, labels={'x': 'Month', 'y': 'Tonnes CO₂/year'}, title="Your monthly trend")
+        fig_trend.update_layout(plot_bgcolor='rgba(0,0,0,0)', paper_bgcolor='rgba(0,0,0,0)', height=280)
+        st.sidebar.plotly_chart(fig_trend, use_container_width=True)
+        st.sidebar.table({"Year": [str(y) for y, *_ in yearly], "Avg tonnes": [round(row[2], 2) for row in yearly],
+                          "Entries": [row[1] for row in yearly]})
+    else:
+        st.sidebar.info("🔔 Save your results to start tracking it month by month (on this browser).")
+st.caption("📝 Emission factors are approximations. Results may vary based on lifestyle and region.")
+
+# Panel debug (?debug=1): rincian waktu rerun sebelumnya
+if metrics.ENABLED and st.query_params.get("debug") == "1":
+    with st.sidebar.expander("⏱️ Last rerun timings", expanded=True):
+        last = st.session_state.get("last_rerun_metrics")
+        if last:
+            st.metric("Total", f"{last['total_s'] * 1000:.1f} ms")
+            st.table({name: f"{seconds * 1000:.1f} ms" for name, seconds in last["stages"].items()})
+        else:
+            st.caption("No rerun recorded yet.")
+
+# Panel profiler: pasang profil untuk rerun berikutnya, ringkasan fungsi teratas
+def arm_profiler():
+    try:
+        profiler.arm(st.session_state, st.session_state.profile_reruns, st.session_state.profile_mode,
+                     st.session_state.profile_token)
+        st.session_state.profile_denied = False
+    except PermissionError:
+        st.session_state.profile_denied = True
+
+if profiler.ENABLED:
+    with st.sidebar.expander("🔬 Profiler"):
+        st.number_input("Reruns to profile", 1, profiler.MAX_RERUNS, 3, key="profile_reruns")
+        st.radio("Profiler", profiler.MODES, key="profile_mode", horizontal=True)
+        st.text_input("Admin token", type="password", key="profile_token")
+        st.button("Profile next reruns", on_click=arm_profiler)
+        if st.session_state.get("profile_denied"):
+            st.error("Wrong profiler token (CARBON_PROFILER_TOKEN).")
+        if profiler.remaining(st.session_state):
+            st.caption(f"Armed: {profiler.remaining(st.session_state)} more rerun(s).")
+        for i, result in enumerate(profiler.results(st.session_state)):
+            st.markdown(f"**{os.path.basename(result['file'])}** ({result['mode']}, {result['total_s'] * 1000:.0f} ms"
+                        f"{', partial' if result['partial'] else ''})")
+            st.dataframe({
+                "Function": [row['function'] for row in result['top']],
+                "Calls": [row['calls'] for row in result['top']],
+                "Own (ms)": [round(row['own_s'] * 1000, 1) for row in result['top']],
+                "Cumulative (ms)": [round(row['cumulative_s'] * 1000, 1) for row in result['top']],
+            }, hide_index=True)
+            if not os.path.exists(result['file']):
+                st.caption("Profile file rotated out (CARBON_PROFILE_MAX_FILES).")
+                continue
+            with open(result['file'], 'rb') as f:
+                st.download_button("Download profile", f.read(), file_name=os.path.basename(result['file']),
+                                   key=f"profile_download_{i}")
+
+record_startup(_imports_done - _script_start, time.perf_counter() - _script_start)
+end_rerun()
@@ -1,30 +1,27 @@
 import streamlit as st
-import matplotlib.pyplot as plt
-import plotly.express as px
-import pandas as pd
 from io import BytesIO
-import requests
 from datetime import datetime
-from fpdf import FPDF
-import base64
 import random
+from assets import prepare_background
+from carbon_engine import TRANSPORT_MODES, DIET_TYPES, calculate_profile
+from photos import prepare_photo
+from charts import pie_chart_png
+from report import build_report_pdf
+from sheet_queue import SubmissionQueue, SENT, FAILED
 
 # === Streamlit Config ===
 st.set_page_config(layout="wide", page_title="Personal Carbon Calculator")
 st.title("🧮 Personal Carbon Footprint Calculator")
 
 # === Background & Styling ===
-def get_base64(file_path):
-    with open(file_path, "rb") as f:
-        data = f.read()
-    return base64.b64encode(data).decode()
-
-backgroundfp_base64 = get_base64("C:/Users/abror/Downloads/Test New/foto_carbon.jpg")
+# Background disajikan sebagai file statis (lihat assets.py)
+background = prepare_background()
+background_css = background["css"] if background else ""
 
 st.markdown(f"""
     <style>
+    {background_css}
     .stApp {{
-        background-image: url("data:image/jpg;base64,{backgroundfp_base64}");
         background-size: cover;
         background-repeat: no-repeat;
         background-attachment: fixed;
@@ -96,6 +93,11 @@ tips_daily = {
 st.sidebar.markdown("### 🌍 Eco Tip of the Day")
 st.sidebar.success(random.choice(tips_daily[language]))
 
+# === Antrian pengiriman ke Sheet.best (satu worker per proses server) ===
+@st.cache_resource
+def get_submission_queue():
+    return SubmissionQueue().start()
+
 # Default country
 country = "Indonesia"
 
@@ -105,38 +107,11 @@ name = st.text_input("Your name" if language == "English" else "Nama Anda")
 age = st.number_input("Your age" if language == "English" else "Usia Anda", min_value=5, max_value=120, step=1)
 photo = st.camera_input("Take a photo (optional)" if language == "English" else "Ambil foto (opsional)")
 
-# === EMISSION FACTORS ===
-EMISSION_FACTORS = {
-    "Indonesia": {
-        "Transportation": {
-            "car": 0.21,
-            "motorcycle": 0.09,
-            "bus": 0.105,
-            "train": 0.045,
-            "walk_or_bike": 0.0
-        },
-        "Electricity": 0.82,
-        "Diet": {
-            "meat_heavy": 2.5,
-            "omnivore": 1.5,
-            "vegetarian": 1.0,
-            "vegan": 0.6
-        },
-        "Waste": 0.1,
-        "Flights": {
-            "domestic": 250,
-            "international": 900
-        },
-        "Plastic": 6.0,
-        "Clothing": 20
-    }
-}
-
 # === Section: Transportation ===
 st.header("🚗 Transportation")
 col1, col2 = st.columns(2)
 with col1:
-    transport_mode = st.selectbox("Mode of daily transport", ["car", "motorcycle", "bus", "train", "walk_or_bike"])
+    transport_mode = st.selectbox("Mode of daily transport", TRANSPORT_MODES)
     daily_distance = st.slider("Daily commute distance (km)", 0.0, 100.0, 10.0)
 with col2:
     flight_domestic = st.number_input("Domestic flights per year", 0, step=1)
@@ -150,7 +125,7 @@ monthly_kwh = st.slider("Monthly electricity usage (kWh)", 0.0, 2000.0, 400.0)
 st.header("🍽️ Diet & Consumption")
 col3, col4 = st.columns(2)
 with col3:
-    diet_type = st.selectbox("Your diet type", ["meat_heavy", "omnivore", "vegetarian", "vegan"])
+    diet_type = st.selectbox("Your diet type", DIET_TYPES)
     meals_per_day = st.slider("Meals per day", 1, 5, 3)
 with col4:
     clothes_purchased = st.number_input("Clothes purchased per year", 0, 100, 10)
@@ -160,20 +135,6 @@ with col4:
 st.header("🗑️ Household Waste")
 weekly_waste = st.slider("General waste per week (kg)", 0.0, 50.0, 5.0)
 
-# === Carbon Footprint Rating ===
-if total_tonnes < 3:
-    rating = "🟢 Low"
-elif total_tonnes < 7:
-    rating = "🟡 Medium"
-else:
-    rating = "🔴 High"
-
-st.subheader("📉 Your Carbon Footprint Level")
-st.warning(f"Your carbon footprint rating: **{rating} impact**")
-
-pdf.chapter_title("📉 Carbon Footprint Rating")
-pdf.chapter_body(f"Your impact rating is: {rating}")
-
 # === Future Tracking (Simulasi Placeholder) ===
 st.sidebar.markdown("---")
 track_future = st.sidebar.checkbox("📅 Track my monthly carbon footprint", value=False)
@@ -183,41 +144,34 @@ if track_future:
 
 # === CALCULATION ===
 if st.button("🧾 Calculate My Carbon Footprint"):
-    ef = EMISSION_FACTORS[country]
-
-    # Convert to yearly
-    yearly_distance = daily_distance * 365
-    yearly_kwh = monthly_kwh * 12
-    yearly_meals = meals_per_day * 365
-    yearly_plastic = plastic_use * 52
-    yearly_waste = weekly_waste * 52
-
-    # Calculate emissions
-    transport_emission = yearly_distance * ef["Transportation"][transport_mode]
-    flight_emission = flight_domestic * ef["Flights"]["domestic"] + flight_international * ef["Flights"]["international"]
-    electricity_emission = yearly_kwh * ef["Electricity"]
-    diet_emission = ef["Diet"][diet_type] * yearly_meals
-    clothing_emission = clothes_purchased * ef["Clothing"]
-    plastic_emission = yearly_plastic * ef["Plastic"]
-    waste_emission = yearly_waste * ef["Waste"]
-
-    # Total emissions
-    total_emissions = transport_emission + flight_emission + electricity_emission + diet_emission + clothing_emission + plastic_emission + waste_emission
-    total_tonnes = round(total_emissions / 1000, 2)
-
-    # === Carbon Offset Estimation ===
-st.markdown("## 🌳 Carbon Offset Suggestion")
-carbon_offset_per_tree = 0.021  # average 21 kg co2/year per tree 
-trees_needed = int(total_tonnes * 1000 / (carbon_offset_per_tree * 1000))  # convert tonnes to kg
-
-st.info(f"To offset your footprint, you would need to plant approximately **{trees_needed} trees**.")
-st.caption("Note: One mature tree absorbs about 21 kg of CO₂ per year on average.")
-pdf.chapter_title("🌳 Trees Needed to Offset")
-pdf.chapter_body(f"You need approximately {trees_needed} trees to offset your carbon emissions.")
+    # Library berat baru di-import saat tombol ditekan, bukan di first paint
+    import plotly.express as px
+
+    # Kalkulasi lewat engine (lihat carbon_engine.py)
+    footprint = calculate_profile(
+        transport_mode=transport_mode, daily_distance=daily_distance,
+        flight_domestic=flight_domestic, flight_international=flight_international,
+        monthly_kwh=monthly_kwh, diet_type=diet_type, meals_per_day=meals_per_day,
+        clothes_purchased=clothes_purchased, plastic_use=plastic_use, weekly_waste=weekly_waste,
+    )
+    emission_data = footprint["emission_data_tonnes"]
+    total_tonnes = footprint["total_tonnes"]
 
     # === Display Results ===
     st.success(f"🌍 Your estimated total carbon footprint is **{total_tonnes} tonnes CO₂/year**")
 
+    # === Carbon Footprint Rating ===
+    # Blok rating & offset dulu berada di luar tombol (tidak bisa di-parse); sekarang di sini
+    rating = footprint["rating_display"]
+    st.subheader("📉 Your Carbon Footprint Level")
+    st.warning(f"Your carbon footprint rating: **{rating} impact**")
+
+    # === Carbon Offset Estimation ===
+    st.markdown("## 🌳 Carbon Offset Suggestion")
+    trees_needed = footprint["trees_needed"]
+    st.info(f"To offset your footprint, you would need to plant approximately **{trees_needed} trees**.")
+    st.caption("Note: One mature tree absorbs about 21 kg of CO₂ per year on average.")
+
     # === SEND TO GOOGLE SHEETS ===
     if name and age:
         payload = {
@@ -225,38 +179,30 @@ pdf.chapter_body(f"You need approximately {trees_needed} trees to offset your ca
             "Name": name,
             "Age": age,
             "Total (Tonnes)": total_tonnes,
-            "Transport": round(transport_emission / 1000, 2),
-            "Flights": round(flight_emission / 1000, 2),
-            "Electricity": round(electricity_emission / 1000, 2),
-            "Diet": round(diet_emission / 1000, 2),
-            "Clothing": round(clothing_emission / 1000, 2),
-            "Plastic": round(plastic_emission / 1000, 2),
-            "Waste": round(waste_emission / 1000, 2),
+            "Transport": round(emission_data["Transportation"], 2),
+            "Flights": round(emission_data["Flights"], 2),
+            "Electricity": round(emission_data["Electricity"], 2),
+            "Diet": round(emission_data["Diet"], 2),
+            "Clothing": round(emission_data["Clothing"], 2),
+            "Plastic": round(emission_data["Plastic"], 2),
+            "Waste": round(emission_data["Waste"], 2),
         }
 
-        SHEET_BEST_URL = "https://api.sheetbest.com/sheets/c1663a28-e75f-4501-8341-c497b1b9867b"
-        response = requests.post(SHEET_BEST_URL, json=payload)
+        # Dikirim di background (lihat sheet_queue.py); klik ulang tidak mengirim ulang baris yang sama
+        submission_status = get_submission_queue().status(get_submission_queue().enqueue(payload))
 
-        if response.status_code == 200:
+        if submission_status == SENT:
             st.success("✅ Data successfully submitted to Google Sheet!")
-        else:
+        elif submission_status == FAILED:
             st.error("❌ Failed to submit data. Please check your Sheet.best link.")
+        else:
+            st.info("🕒 Data queued for submission to Google Sheet.")
     else:
         st.warning("Isi nama dan umur terlebih dahulu agar data bisa dikirim ke spreadsheet.")
 
 
     # === Visualization & Tips ===
     st.markdown("### 🔍 Breakdown by Category (in tonnes CO₂)")
-    emission_data = {
-        "Transportation": transport_emission / 1000,
-        "Flights": flight_emission / 1000,
-        "Electricity": electricity_emission / 1000,
-        "Diet": diet_emission / 1000,
-        "Clothing": clothing_emission / 1000,
-        "Plastic": plastic_emission / 1000,
-        "Waste": waste_emission / 1000,
-    }
-
     for category, value in emission_data.items():
         st.info(f"{category}: {round(value, 2)}")
 
@@ -304,18 +250,8 @@ pdf.chapter_body(f"You need approximately {trees_needed} trees to offset your ca
 
     with col_left:
         st.markdown("### 🥧 Pie Chart")
-        fig1, ax1 = plt.subplots()
-        ax1.pie(
-            emission_data.values(),
-            labels=emission_data.keys(),
-            autopct='%1.1f%%',
-            startangle=90,
-            textprops={'color': 'black'}
-        )
-        ax1.axis('equal')
-        fig1.patch.set_alpha(0)  # transparan
-        ax1.patch.set_alpha(0)   # transparan
-        st.pyplot(fig1)
+        # PNG di memori, di-memo per breakdown (charts.py); tidak ada file di working directory
+        st.image(pie_chart_png(emission_data))
 
     with col_right:
         st.markdown("### 📈 Bar Chart")
@@ -334,70 +270,12 @@ pdf.chapter_body(f"You need approximately {trees_needed} trees to offset your ca
         fig2.update_traces(marker_color='darkblue')
         st.plotly_chart(fig2, use_container_width=True)
 
-    # Save charts for PDF
-    plt.figure()
-    plt.pie(emission_data.values(), labels=emission_data.keys(), autopct='%1.1f%%', startangle=90)
-    plt.axis('equal')
-    plt.savefig("pie_chart.png")
-    plt.close()
-
-    plt.figure()
-    plt.bar(emission_data.keys(), emission_data.values(), color='skyblue')
-    plt.ylabel("Tonnes CO2")
-    plt.title("Emissions by Category")
-    plt.xticks(rotation=45)
-    plt.tight_layout()
-    plt.savefig("bar_chart.png")
-    plt.close()
-
-    # PDF Class Definition
-    class PDF(FPDF):
-        def header(self):
-            self.set_font("Arial", "B", 14)
-            self.cell(0, 10, "Carbon Footprint Report", ln=True, align="C")
-            self.ln(10)
-
-        def chapter_title(self, title):
-            self.set_font("Arial", "B", 12)
-            self.cell(0, 10, title, ln=True)
-            self.ln(2)
-
-        def chapter_body(self, body):
-            self.set_font("Arial", "", 11)
-            self.multi_cell(0, 10, body)
-            self.ln()
-
-    # Build PDF
-    pdf = PDF()
-    pdf.add_page()
-    pdf.chapter_title("User Information")
-    pdf.chapter_body(f"Name: {name}\nAge: {age}\nCountry: {country}")
-
-    if photo is not None:
-        # Simpan foto sementara
-        photo_path = "photo.jpg"
-        with open(photo_path, "wb") as f:
-            f.write(photo.getbuffer())
-
-        pdf.image(photo_path, w=100)
-        pdf.ln(5)
-        pdf.chapter_title("Photo User")
-    pdf.chapter_title("Total Carbon Footprint")
-    pdf.chapter_body(f"{total_tonnes} tonnes CO2 per year")
-    pdf.chapter_title("Emission Breakdown")
-    for cat, val in emission_data.items():
-        pdf.chapter_body(f"{cat}: {round(val, 2)} tonnes CO2")
-    pdf.chapter_title(f"Recommended Focus Area: {highest_emission}")
-    for tip in tips[highest_emission]:
-        pdf.chapter_body(f"- {tip}")
-    pdf.chapter_title("Pie Chart")
-    pdf.image("pie_chart.png", w=150)
-    pdf.chapter_title("Bar Chart")
-    pdf.image("bar_chart.png", w=150)
-
-
-    # Export PDF to buffer
-    pdf_output = pdf.output(dest='S').encode('latin1')
+    # Build PDF: laporan yang sama dengan app2 (report.py), grafik vektor & foto dari memori
+    pdf_output = build_report_pdf({
+        "name": name, "age": age, "country": country,
+        "photo_bytes": prepare_photo(photo.getvalue()) if photo is not None else None,
+        **footprint,
+    })
     pdf_buffer = BytesIO(pdf_output)
 
     # Download button
@@ -0,0 +1,96 @@
+"""Background image pipeline.
+
+The background photo used to be base64-encoded into the page CSS on every
+rerun (~5 MB per slider move). Here it is resized and recompressed once per
+process into a few viewport-sized WebP/progressive JPEG variants, written to
+``static/assets`` and referenced by URL, so the browser fetches and caches the
+file once and each rerun only sends a short ``<style>`` block.
+
+Requires ``server.enableStaticServing = true`` (see ``.streamlit/config.toml``).
+"""
+import hashlib
+import logging
+import os
+
+import streamlit as st
+
+logger = logging.getLogger(__name__)
+
+APP_DIR = os.path.dirname(os.path.abspath(__file__))
+BACKGROUND_SOURCE = os.path.join(APP_DIR, "foto_carbon.jpg")
+ASSET_DIR = os.path.join(APP_DIR, "static", "assets")
+ASSET_URL = "app/static/assets"
+
+# Lebar varian per viewport; tidak pernah di-upscale melebihi gambar asli
+BACKGROUND_WIDTHS = (1280, 1920, 2560)
+WEBP_QUALITY = 78
+JPEG_QUALITY = 80
+
+
+def _file_digest(path):
+    h = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(1 << 20), b""):
+            h.update(chunk)
+    return h.hexdigest()[:12]
+
+
+def _render_variants(source, digest):
+    """Write the resized variants (skipping any already on disk) and return their names."""
+    from PIL import Image
+
+    os.makedirs(ASSET_DIR, exist_ok=True)
+    variants = []
+    with Image.open(source) as original:
+        src_w, src_h = original.size
+        widths = sorted({min(w, src_w) for w in BACKGROUND_WIDTHS})
+        for width in widths:
+            height = round(src_h * width / src_w)
+            names = {fmt: f"bg-{digest}-{width}.{fmt}" for fmt in ("webp", "jpg")}
+            if not all(os.path.exists(os.path.join(ASSET_DIR, n)) for n in names.values()):
+                with Image.open(source) as im:
+                    # draft() lets the JPEG decoder downscale via DCT, far cheaper than a full decode
+                    im.draft("RGB", (width, height))
+                    im = im.convert("RGB").resize((width, height), Image.LANCZOS)
+                    im.save(os.path.join(ASSET_DIR, names["webp"]), "WEBP", quality=WEBP_QUALITY, method=6)
+                    im.save(os.path.join(ASSET_DIR, names["jpg"]), "JPEG", quality=JPEG_QUALITY,
+                            optimize=True, progressive=True)
+            variants.append({"width": width, **names})
+    return variants
+
+
+def _background_rule(variant):
+    webp = f'{ASSET_URL}/{variant["webp"]}'
+    jpg = f'{ASSET_URL}/{variant["jpg"]}'
+    return (f'background-image: url("{jpg}"); '
+            f'background-image: image-set(url("{webp}") type("image/webp"), url("{jpg}") type("image/jpeg"));')
+
+
+@st.cache_resource(show_spinner=False)
+def prepare_background(source=BACKGROUND_SOURCE):
+    """Build the background variants once per process.
+
+    Returns a dict with the ``css`` rules for ``.stApp`` and byte statistics,
+    or ``None`` when the source image is missing.
+    """
+    if not os.path.exists(source):
+        return None
+    variants = _render_variants(source, _file_digest(source))
+
+    # Varian terkecil untuk layar kecil, naik bertahap lewat media query
+    rules = [f".stApp {{ {_background_rule(variants[0])} }}"]
+    for smaller, variant in zip(variants, variants[1:]):
+        rules.append(f"@media (min-width: {smaller['width'] + 1}px) {{ .stApp {{ {_background_rule(variant)} }} }}")
+    css = "\n".join(rules)
+
+    inline_bytes = 4 * ((os.path.getsize(source) + 2) // 3)  # ukuran base64 lama per rerun
+    stats = {
+        "source_bytes": os.path.getsize(source),
+        "inline_css_bytes": inline_bytes,
+        "css_bytes": len(css.encode()),
+        "variant_bytes": {v["webp"]: os.path.getsize(os.path.join(ASSET_DIR, v["webp"])) for v in variants},
+    }
+    stats["bytes_saved_per_rerun"] = stats["inline_css_bytes"] - stats["css_bytes"]
+    logger.info("Background assets ready: %s bytes saved per rerun (%s -> %s bytes of CSS)",
+                stats["bytes_saved_per_rerun"], stats["inline_css_bytes"], stats["css_bytes"])
+    return {"css": css, "variants": variants, "stats": stats}
@@ -0,0 +1,116 @@
+"""Headless batch report generator.
+
+Reads a CSV or Parquet file of profiles, runs the same emission math
+(``carbon_engine``) and PDF layout (``report``) as the Streamlit page, and
+writes one PDF per person plus a summary table. Input is streamed in chunks
+and at most ``2 x workers`` chunks are in flight, so memory stays flat for
+large files.
+
+    python batch_report.py profiles.csv --out reports/ [--workers 8] [--chunk-size 500]
+
+Required columns are ``carbon_engine.PROFILE_COLUMNS``; ``name``, ``age`` and
+``country`` are optional.
+"""
+import argparse
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+from functools import partial
+
+import pandas as pd
+
+from carbon_engine import CATEGORIES, PROFILE_COLUMNS, calculate_batch, result_from_row
+from chunked import bounded_map, safe_name
+
+
+def iter_chunks(path, chunk_size):
+    """Yield DataFrame chunks without loading the whole file."""
+    if path.endswith((".parquet", ".pq")):
+        import pyarrow.parquet as pq
+
+        start = 0
+        for batch in pq.ParquetFile(path).iter_batches(batch_size=chunk_size):
+            chunk = batch.to_pandas()
+            chunk.index = range(start, start + len(chunk))
+            start += len(chunk)
+            yield chunk
+    else:
+        yield from pd.read_csv(path, chunksize=chunk_size)
+
+
+def process_chunk(chunk, out_dir, write_pdf=True):
+    """Calculate a chunk in one vectorized pass and write its PDFs. Returns the summary rows."""
+    from report import build_report_pdf
+
+    missing = [c for c in PROFILE_COLUMNS if c not in chunk.columns]
+    if missing:
+        raise ValueError(f"Missing column(s): {missing}")
+
+    results = calculate_batch(chunk)
+    names = chunk["name"] if "name" in chunk.columns else pd.Series(chunk.index.astype(str), index=chunk.index)
+    ages = chunk["age"] if "age" in chunk.columns else pd.Series("", index=chunk.index)
+    countries = chunk["country"] if "country" in chunk.columns else pd.Series("Indonesia", index=chunk.index)
+
+    pdf_paths = []
+    for idx, row in results.iterrows():
+        if not write_pdf:
+            pdf_paths.append("")
+            continue
+        res = {"name": names[idx], "age": ages[idx], "country": countries[idx], "photo_bytes": None,
+               "inputs": {c: chunk.at[idx, c] for c in PROFILE_COLUMNS}, **result_from_row(row)}
+        path = os.path.join(out_dir, f"{idx:07d}_{safe_name(res['name'])}.pdf")
+        with open(path, "wb") as f:
+            f.write(build_report_pdf(res))
+        pdf_paths.append(path)
+
+    summary = results[CATEGORIES + ["total_tonnes", "trees_needed", "rating", "highest_category"]].copy()
+    summary.insert(0, "age", ages)
+    summary.insert(0, "name", names)
+    summary["pdf"] = pdf_paths
+    return summary
+
+
+def run(path, out_dir, workers=None, chunk_size=500, summary_path=None, write_pdf=True):
+    workers = workers or os.cpu_count() or 1
+    os.makedirs(out_dir, exist_ok=True)
+    summary_path = summary_path or os.path.join(out_dir, "summary.csv")
+    if os.path.exists(summary_path):
+        os.remove(summary_path)
+
+    rows = 0
+    start = time.perf_counter()
+    with ProcessPoolExecutor(workers) as pool:
+        build = partial(process_chunk, out_dir=out_dir, write_pdf=write_pdf)
+        for summary in bounded_map(pool.submit, build, iter_chunks(path, chunk_size), 2 * workers):
+            # Ringkasan ditulis bertahap (urut sesuai input) supaya tidak menumpuk di memori
+            summary.to_csv(summary_path, mode="a", header=not os.path.exists(summary_path), index_label="row")
+            rows += len(summary)
+
+    elapsed = time.perf_counter() - start
+    return {"rows": rows, "seconds": elapsed, "rows_per_second": rows / elapsed if elapsed else 0.0,
+            "summary": summary_path}
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Generate carbon footprint PDF reports for a file of profiles.")
+    parser.add_argument("input", help="CSV or Parquet file of profiles")
+    parser.add_argument("--out", default="reports", help="output directory for PDFs and summary.csv")
+    parser.add_argument("--workers", type=int, default=None, help="worker processes (default: all cores)")
+    parser.add_argument("--chunk-size", type=int, default=500, help="rows per chunk")
+    parser.add_argument("--summary", default=None, help="summary CSV path (default: <out>/summary.csv)")
+    parser.add_argument("--no-pdf", action="store_true", help="only write the summary table")
+    args = parser.parse_args(argv)
+
+    try:
+        stats = run(args.input, args.out, args.workers, args.chunk_size, args.summary, not args.no_pdf)
+    except ValueError as exc:
+        print(f"Invalid input: {exc}", file=sys.stderr)
+        return 1
+    print(f"Processed {stats['rows']} profiles in {stats['seconds']:.1f}s "
+          f"({stats['rows_per_second']:.1f} profiles/s). Summary: {stats['summary']}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,290 @@
+"""Benchmark suite for the calculator.
+
+Times the emission calculation (1, 1k, 1M profiles), chart creation
+(matplotlib and plotly), the PDF chart page drawn as vectors vs. embedded
+matplotlib PNGs, the PDF build including ``output(dest='S')`` with and
+without a camera photo, and a full ``app2.py`` rerun through
+``streamlit.testing.v1.AppTest`` with Sheet.best replaced by ``sheet_stub``.
+
+    python benchmarks.py                          # run all, write benchmark_results.json
+    python benchmarks.py -k calc -k pdf           # only names containing "calc" or "pdf"
+    python benchmarks.py --baseline base.json --threshold 0.2
+
+Benchmarks that return bytes (the PDF ones) also record their size.
+With ``--baseline`` the run fails (exit code 1) when any benchmark's median is
+more than ``threshold`` slower than in the baseline file.
+"""
+import argparse
+import json
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+SAMPLE_PHOTO = os.path.join(HERE, "photo.jpg")
+
+BENCHMARKS = {}
+
+
+def benchmark(name, repeat=5, number=1):
+    def register(setup):
+        BENCHMARKS[name] = (setup, repeat, number)
+        return setup
+    return register
+
+
+def random_profiles(n, seed=0):
+    import numpy as np
+
+    from carbon_engine import DIET_TYPES, TRANSPORT_MODES
+
+    rng = np.random.default_rng(seed)
+    return {
+        "transport_mode": rng.choice(TRANSPORT_MODES, n), "daily_distance": rng.uniform(0, 100, n),
+        "flight_domestic": rng.integers(0, 5, n), "flight_international": rng.integers(0, 3, n),
+        "monthly_kwh": rng.uniform(0, 2000, n), "diet_type": rng.choice(DIET_TYPES, n),
+        "meals_per_day": rng.integers(1, 6, n), "clothes_purchased": rng.integers(0, 100, n),
+        "plastic_use": rng.uniform(0, 10, n), "weekly_waste": rng.uniform(0, 50, n),
+    }
+
+
+def sample_result(photo=False):
+    from carbon_engine import calculate_profile
+
+    res = calculate_profile(
+        transport_mode="car", daily_distance=10.0, flight_domestic=1, flight_international=1,
+        monthly_kwh=400.0, diet_type="omnivore", meals_per_day=3, clothes_purchased=10,
+        plastic_use=1.0, weekly_waste=5.0)
+    from photos import prepare_photo
+
+    photo_bytes = None
+    if photo:
+        # Sama seperti halaman: foto kamera diperkecil dulu sebelum masuk hasil
+        with open(SAMPLE_PHOTO, "rb") as f:
+            photo_bytes = prepare_photo(f.read())
+    return {"name": "Benchmark", "age": 30, "country": "Indonesia", "photo_bytes": photo_bytes, **res}
+
+
+# === Kalkulasi ===
+def _calc(n):
+    from carbon_engine import calculate_batch
+
+    profiles = random_profiles(n)
+    return lambda: calculate_batch(profiles)
+
+
+benchmark("calc_1", repeat=200)(lambda: _calc(1))
+benchmark("calc_1k", repeat=100)(lambda: _calc(1_000))
+benchmark("calc_1m", repeat=5)(lambda: _calc(1_000_000))
+
+
+# === Grafik ===
+@benchmark("chart_pie_matplotlib", repeat=10)
+def _pie():
+    import charts
+
+    data = sample_result()["emission_data_tonnes"]
+
+    def run():
+        charts._pie_png.cache_clear()
+        charts.pie_chart_png(data)
+    return run
+
+
+@benchmark("chart_bar_matplotlib", repeat=10)
+def _bar():
+    import charts
+
+    data = sample_result()["emission_data_tonnes"]
+
+    def run():
+        charts._bar_png.cache_clear()
+        charts.bar_chart_png(data)
+    return run
+
+
+@benchmark("chart_bar_plotly", repeat=20)
+def _plotly():
+    import plotly.express as px
+
+    data = sample_result()["emission_data_tonnes"]
+
+    def run():
+        # Sama dengan grafik batang di app2.py
+        fig = px.bar(x=list(data.keys()), y=list(data.values()), labels={'x': 'Category', 'y': 'Tonnes CO₂'}, title="Annual Emissions by Category")
+        fig.update_layout(plot_bgcolor='rgba(0,0,0,0)', paper_bgcolor='rgba(0,0,0,0)', font_color='black', title_font_color='black')
+        fig.update_traces(marker_color='darkblue')
+        fig.to_plotly_json()
+    return run
+
+
+# === PDF ===
+def _pdf(photo):
+    from report import build_report_pdf
+
+    res = sample_result(photo)
+    return lambda: build_report_pdf(res)
+
+
+def _chart_page(vector):
+    import charts
+    from report import PDF
+
+    data = sample_result()["emission_data_tonnes"]
+
+    def run():
+        pdf = PDF()
+        pdf.add_page()
+        if vector:
+            pdf.pie_chart(data, pdf.l_margin, pdf.get_y(), 80)
+            pdf.bar_chart(data, pdf.l_margin, pdf.get_y(), 170, 95)
+        else:
+            # Cara lama (TEMPLATE_VERSION 3): PNG matplotlib, dirender dari nol
+            charts._pie_png.cache_clear()
+            charts._bar_png.cache_clear()
+            pdf.image_bytes(charts.pie_chart_png(data), w=150); pdf.ln(5)
+            pdf.image_bytes(charts.bar_chart_png(data), w=150)
+        return pdf.output(dest='S').encode('latin-1')
+    return run
+
+
+benchmark("pdf_charts_png", repeat=5)(lambda: _chart_page(False))
+benchmark("pdf_charts_vector", repeat=50)(lambda: _chart_page(True))
+
+
+benchmark("pdf_build", repeat=5)(lambda: _pdf(False))
+benchmark("pdf_build_with_photo", repeat=5)(lambda: _pdf(True))
+
+
+# === Riwayat bulanan ===
+@benchmark("history_trend", repeat=200)
+def _history():
+    import numpy as np
+
+    from history import FootprintHistory
+
+    history = FootprintHistory(os.path.join(tempfile.mkdtemp(prefix="bench-"), "history.db"))
+    rng = np.random.default_rng(0)
+    n = 100_000
+    users = rng.integers(0, 2_000, n)
+    months = rng.integers(2015, 2027, n) * 100 + rng.integers(1, 13, n)
+    kg = rng.uniform(0, 2_000, (n, 8))
+    history.record_many((f"user{u}", int(m), k.tolist()) for u, m, k in zip(users, months, kg))
+
+    def run():
+        # Tren multi-tahun satu user: rentang di tabel rollup
+        history.monthly("user7")
+        history.yearly("user7")
+    return run
+
+
+# === Rerun penuh app2.py ===
+@benchmark("app2_rerun", repeat=10)
+def _app_rerun():
+    from sheet_stub import SheetStub
+
+    stub = SheetStub().start()
+    scratch = tempfile.mkdtemp(prefix="bench-")
+    # Harus diset sebelum app2 meng-import modulnya; semua yang ditulis app2 masuk scratch,
+    # bukan ke data asli di folder repo
+    os.environ["SHEET_BEST_URL"] = stub.url
+    os.environ["SUBMISSION_DB"] = os.path.join(scratch, "submissions.db")
+    os.environ["REPORT_CACHE_DIR"] = os.path.join(scratch, "reports")
+    os.environ["PERCENTILE_DIR"] = os.path.join(scratch, "percentiles")
+    os.environ["SESSION_BLOB_DIR"] = os.path.join(scratch, "session_blobs")
+    os.environ["HISTORY_DB"] = os.path.join(scratch, "history.db")
+
+    from streamlit.testing.v1 import AppTest
+
+    at = AppTest.from_file(os.path.join(HERE, "app2.py"), default_timeout=120).run()
+    at.text_input[0].input("Benchmark").run()
+    at.button[0].click().run()  # hitung sekali; rerun berikutnya menampilkan hasil
+
+    def run():
+        at.run()
+        if at.exception:
+            raise RuntimeError(at.exception[0].message)
+    return run
+
+
+def run_benchmarks(patterns=()):
+    results = {}
+    for name, (setup, repeat, number) in BENCHMARKS.items():
+        if patterns and not any(p in name for p in patterns):
+            continue
+        fn = setup()
+        output = fn()  # pemanasan, tidak dihitung
+        times = []
+        for _ in range(repeat):
+            start = time.perf_counter()
+            for _ in range(number):
+                fn()
+            times.append((time.perf_counter() - start) / number)
+        results[name] = {
+            "median_s": statistics.median(times), "min_s": min(times),
+            "mean_s": statistics.fmean(times), "runs": repeat,
+        }
+        size = ""
+        if isinstance(output, (bytes, bytearray)):
+            results[name]["bytes"] = len(output)
+            size = f"   {len(output) / 1024:8.1f} KB"
+        print(f"{name:<24} median {results[name]['median_s'] * 1000:10.3f} ms   min {results[name]['min_s'] * 1000:10.3f} ms{size}")
+    return results
+
+
+def compare(results, baseline, threshold):
+    """Return the benchmarks whose median regressed by more than ``threshold``."""
+    regressions = {}
+    for name, res in results.items():
+        base = baseline.get("results", {}).get(name)
+        if base is None:
+            continue
+        ratio = res["median_s"] / base["median_s"] if base["median_s"] else float("inf")
+        print(f"{name:<24} {ratio:6.2f}x baseline")
+        if ratio > 1 + threshold:
+            regressions[name] = ratio
+    return regressions
+
+
+def _git_rev():
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=HERE,
+                              capture_output=True, text=True).stdout.strip() or None
+    except OSError:
+        return None
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Run the calculator benchmark suite.")
+    parser.add_argument("-k", dest="patterns", action="append", default=[], help="only run benchmarks containing this text")
+    parser.add_argument("--out", default="benchmark_results.json", help="where to write the JSON results")
+    parser.add_argument("--baseline", help="JSON results of an earlier run to compare against")
+    parser.add_argument("--threshold", type=float, default=0.2, help="allowed slowdown vs baseline (0.2 = 20%%)")
+    args = parser.parse_args(argv)
+
+    sys.path.insert(0, HERE)
+    results = run_benchmarks(args.patterns)
+    report = {
+        "meta": {"timestamp": time.time(), "git": _git_rev(), "python": platform.python_version(),
+                 "platform": platform.platform(), "cpus": os.cpu_count()},
+        "results": results,
+    }
+    with open(args.out, "w") as f:
+        json.dump(report, f, indent=2)
+    print(f"Results written to {args.out}")
+
+    if args.baseline:
+        with open(args.baseline) as f:
+            regressions = compare(results, json.load(f), args.threshold)
+        if regressions:
+            print("Regressions: " + ", ".join(f"{k} ({v:.2f}x)" for k, v in regressions.items()))
+            return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,224 @@
+"""Vectorized carbon footprint engine.
+
+Takes a column-oriented batch of profiles (a DataFrame or a mapping of
+column name -> array) and returns per-category emissions in tonnes CO2/year,
+totals, ratings and trees needed as a pandas DataFrame. The Streamlit pages
+are just callers of a single-row batch (see ``calculate_profile``).
+
+pandas is imported on first calculation, not at module import, so the page's
+first paint (which only needs the option lists below) stays cheap.
+"""
+from functools import lru_cache
+
+import numpy as np
+
+# Faktor emisi (kg CO2 per unit) per region ada di data/emission_factors.csv,
+# dikompilasi jadi array NumPy oleh factor_registry
+from factor_registry import DIET_TYPES, TRANSPORT_MODES, get_factor_tables
+
+CATEGORIES = ["Transportation", "Flights", "Electricity", "Diet", "Clothing", "Plastic", "Waste"]
+
+# Kolom input satu profil (sama dengan nama variabel widget di app2.py)
+PROFILE_COLUMNS = [
+    "transport_mode", "daily_distance", "flight_domestic", "flight_international",
+    "monthly_kwh", "diet_type", "meals_per_day", "clothes_purchased",
+    "plastic_use", "weekly_waste",
+]
+
+# Input yang dipakai tiap kategori; calculate_incremental hanya menghitung ulang
+# kategori yang inputnya berubah
+CATEGORY_INPUTS = {
+    "Transportation": ("transport_mode", "daily_distance"),
+    "Flights": ("flight_domestic", "flight_international"),
+    "Electricity": ("monthly_kwh",),
+    "Diet": ("diet_type", "meals_per_day"),
+    "Clothing": ("clothes_purchased",),
+    "Plastic": ("plastic_use",),
+    "Waste": ("weekly_waste",),
+}
+
+RATINGS = ["Low", "Medium", "High"]
+RATING_DISPLAY = {"Low": "🟢 Low", "Medium": "🟡 Medium", "High": "🔴 High"}
+RATING_CUTOFFS = np.array([3.0, 7.0])  # tonnes CO2/year
+
+KG_CO2_PER_TREE = 21  # 1 pohon serap 21 kg CO2/tahun
+
+
+def _codes(values, categories, column):
+    """Map a column of labels to integer codes, rejecting unknown labels.
+
+    Categorical and fixed-width string arrays take a fast path; plain object
+    columns (e.g. a freshly read CSV) fall back to a hash lookup.
+    """
+    import pandas as pd
+
+    if isinstance(getattr(values, "dtype", None), pd.CategoricalDtype):
+        cat = pd.Categorical(values)
+        lookup = np.append(pd.Index(categories).get_indexer(cat.categories), -1)
+        codes = lookup[cat.codes]
+        labels = cat
+    else:
+        arr = np.asarray(values)
+        if arr.dtype.kind in "US":
+            cats = np.asarray(categories, dtype=arr.dtype.kind)
+            order = np.argsort(cats)
+            pos = np.searchsorted(cats[order], arr).clip(max=len(cats) - 1)
+            codes = np.where(cats[order][pos] == arr, order[pos], -1)
+        else:
+            codes = pd.Index(categories).get_indexer(arr.astype(object))
+        labels = arr
+    if (codes < 0).any():
+        bad = sorted(set(map(str, np.asarray(labels, dtype=object)[codes < 0])))
+        raise ValueError(f"Unknown {column} value(s): {bad}")
+    return codes
+
+
+def _numeric(profiles, column):
+    """A numeric column as float64, rejecting blank (NaN), infinite and negative values."""
+    try:
+        values = np.asarray(profiles[column], dtype=np.float64)
+    except (TypeError, ValueError) as exc:
+        raise ValueError(f"{column} must be numeric: {exc}") from exc
+    bad = ~(values >= 0) | np.isinf(values)  # NaN gagal di perbandingan >= 0
+    if bad.any():
+        # Sebut baris yang salah (label index DataFrame kalau ada, kalau tidak posisi)
+        rows = np.asarray(getattr(profiles, "index", np.arange(values.size)))[np.flatnonzero(bad)]
+        shown = ", ".join(map(str, rows[:10])) + (", ..." if len(rows) > 10 else "")
+        raise ValueError(f"{column} must be a non-negative number (blank or invalid in row(s) {shown})")
+    return values
+
+
+# Rumus per kategori dalam kg CO2/tahun. ``p`` berisi kolom numerik dan kode
+# transport_mode/diet_type, ``t`` adalah FactorTables, ``r`` kode region.
+_KERNELS = {
+    "Transportation": lambda p, t, r: p["daily_distance"] * 365 * t.transport[r, p["transport_mode"]],
+    "Flights": lambda p, t, r: (p["flight_domestic"] * t.flight_domestic[r]
+                                + p["flight_international"] * t.flight_international[r]),
+    "Electricity": lambda p, t, r: p["monthly_kwh"] * 12 * t.electricity[r],
+    "Diet": lambda p, t, r: t.diet[r, p["diet_type"]] * (p["meals_per_day"] * 365),
+    "Clothing": lambda p, t, r: p["clothes_purchased"] * t.clothing[r],
+    "Plastic": lambda p, t, r: p["plastic_use"] * 52 * t.plastic[r],
+    "Waste": lambda p, t, r: p["weekly_waste"] * 52 * t.waste[r],
+}
+
+
+def _region(tables, country):
+    if country not in tables.region_index:
+        raise ValueError(f"Unknown country: {country!r}")
+    return tables.region_index[country]
+
+
+def encode_profiles(profiles):
+    """Kernel input: numeric columns as float arrays, ``transport_mode``/``diet_type`` as codes."""
+    p = {c: _numeric(profiles, c) for c in PROFILE_COLUMNS if c not in ("transport_mode", "diet_type")}
+    p["transport_mode"] = _codes(profiles["transport_mode"], TRANSPORT_MODES, "transport_mode")
+    p["diet_type"] = _codes(profiles["diet_type"], DIET_TYPES, "diet_type")
+    return p
+
+
+def category_kg(p, tables, region):
+    """Emissions per category in kg CO2/year, stacked in ``CATEGORIES`` order."""
+    return np.stack([_KERNELS[cat](p, tables, region) for cat in CATEGORIES])
+
+
+def calculate_batch(profiles, country="Indonesia", tables=None):
+    """Calculate footprints for a batch of profiles.
+
+    Factors come from ``tables`` (default: the current registry file). A
+    ``country`` column in ``profiles`` selects the region per row; otherwise
+    every row uses ``country``.
+
+    Returns a DataFrame with one column per category (tonnes CO2/year) plus
+    ``total_kg``, ``total_tonnes``, ``trees_needed``, ``rating`` and
+    ``highest_category``.
+    """
+    import pandas as pd
+
+    tables = tables or get_factor_tables()
+    p = encode_profiles(profiles)
+    if "country" in profiles:
+        region = _codes(profiles["country"], tables.regions, "country")
+    else:
+        region = _region(tables, country)
+
+    # Emisi per kategori dalam kg CO2/tahun, urutan sama dengan CATEGORIES
+    emissions_kg = category_kg(p, tables, region)
+
+    total_kg = emissions_kg.sum(axis=0)
+    if not np.isfinite(total_kg).all():
+        rows = np.asarray(getattr(profiles, "index", np.arange(total_kg.size)))[~np.isfinite(total_kg)]
+        raise ValueError(f"Inputs too large: footprint overflows in row(s) {', '.join(map(str, rows[:10]))}")
+    # argmax per baris lebih cepat dari argmax(axis=0); seri tetap pilih kategori pertama
+    highest = np.zeros(len(total_kg), dtype=np.int8)
+    peak = emissions_kg[0].copy()
+    for i in range(1, len(CATEGORIES)):
+        higher = emissions_kg[i] > peak
+        highest[higher] = i
+        np.maximum(peak, emissions_kg[i], out=peak)
+    total_tonnes = np.round(total_kg / 1000, 2)
+
+    result = {cat: emissions_kg[i] / 1000 for i, cat in enumerate(CATEGORIES)}
+    result["total_kg"] = total_kg
+    result["total_tonnes"] = total_tonnes
+    result["trees_needed"] = np.trunc(total_kg / KG_CO2_PER_TREE).astype(np.int64)
+    result["rating"] = pd.Categorical.from_codes(
+        np.searchsorted(RATING_CUTOFFS, total_tonnes, side="right"), RATINGS)
+    result["highest_category"] = pd.Categorical.from_codes(highest, CATEGORIES)
+    return pd.DataFrame(result, index=getattr(profiles, "index", None))
+
+
+def result_from_row(row):
+    """Convert one ``calculate_batch`` row into the result fields the page and the PDF use."""
+    rating = row["rating"]
+    return {
+        "total_tonnes": float(row["total_tonnes"]),
+        "trees_needed": int(row["trees_needed"]),
+        "rating_display": RATING_DISPLAY[rating],
+        "rating_pdf": rating,
+        "emission_data_tonnes": {cat: float(row[cat]) for cat in CATEGORIES},
+        "highest_emission_category": row["highest_category"],
+    }
+
+
+def calculate_profile(country="Indonesia", **inputs):
+    """Single-profile wrapper returning the fields the Streamlit page stores in session state."""
+    return result_from_row(calculate_batch({k: [inputs[k]] for k in PROFILE_COLUMNS}, country).iloc[0])
+
+
+@lru_cache(maxsize=1024)
+def _category_kg(category, tables, region, values):
+    p = {}
+    for column, value in zip(CATEGORY_INPUTS[category], values):
+        if column == "transport_mode":
+            p[column] = _codes(np.array([value]), TRANSPORT_MODES, column)
+        elif column == "diet_type":
+            p[column] = _codes(np.array([value]), DIET_TYPES, column)
+        else:
+            p[column] = np.array([value], dtype=np.float64)
+    return float(_KERNELS[category](p, tables, region)[0])
+
+
+def calculate_incremental(country="Indonesia", tables=None, **inputs):
+    """Same result as ``calculate_profile``, with each category memoized on its own inputs.
+
+    Changing one slider only recomputes the category that uses it; the
+    others come from the cache. New factor tables (hot reload) start a fresh
+    set of cache entries.
+    """
+    tables = tables or get_factor_tables()
+    region = _region(tables, country)
+    kg = np.array([_category_kg(cat, tables, region, tuple(inputs[c] for c in CATEGORY_INPUTS[cat]))
+                   for cat in CATEGORIES])
+    total_kg = kg.sum()
+    if not np.isfinite(total_kg):
+        raise ValueError("Inputs too large: the footprint overflows.")
+    total_tonnes = float(np.round(total_kg / 1000, 2))
+    rating = RATINGS[int(np.searchsorted(RATING_CUTOFFS, total_tonnes, side="right"))]
+    return {
+        "total_tonnes": total_tonnes,
+        "trees_needed": int(np.trunc(total_kg / KG_CO2_PER_TREE)),
+        "rating_display": RATING_DISPLAY[rating],
+        "rating_pdf": rating,
+        "emission_data_tonnes": {cat: float(kg[i] / 1000) for i, cat in enumerate(CATEGORIES)},
+        "highest_emission_category": CATEGORIES[int(np.argmax(kg))],
+    }
@@ -0,0 +1,60 @@
+"""Raster (PNG) charts for the Streamlit page.
+
+Each chart is drawn once per distinct emission breakdown with the Agg canvas
+(no pyplot global state, safe across concurrent sessions) into PNG bytes and
+memoized, and nothing is written to the working directory. The PDF report
+draws its own vector charts (``report.PDF.pie_chart``/``bar_chart``).
+"""
+from functools import lru_cache
+from io import BytesIO
+
+CHART_DPI = 150
+
+
+def _chart_key(emission_data):
+    return tuple((cat, float(val)) for cat, val in emission_data.items())
+
+
+def _png(fig):
+    from matplotlib.backends.backend_agg import FigureCanvasAgg
+
+    FigureCanvasAgg(fig)
+    buf = BytesIO()
+    fig.savefig(buf, format="png", dpi=CHART_DPI, transparent=True)
+    return buf.getvalue()
+
+
+@lru_cache(maxsize=256)
+def _pie_png(items):
+    from matplotlib.figure import Figure
+
+    fig = Figure()
+    ax = fig.subplots()
+    ax.pie([v for _, v in items], labels=[c for c, _ in items], autopct='%1.1f%%', startangle=90, textprops={'color': 'black'})
+    ax.axis('equal')
+    return _png(fig)
+
+
+@lru_cache(maxsize=256)
+def _bar_png(items):
+    from matplotlib.figure import Figure
+
+    fig = Figure(figsize=(8, 5))
+    ax = fig.subplots()
+    ax.bar([c for c, _ in items], [v for _, v in items], color='skyblue')
+    ax.set_ylabel("Tonnes CO2")
+    for label in ax.get_xticklabels():
+        label.set_rotation(45)
+        label.set_ha("right")
+    fig.tight_layout()
+    return _png(fig)
+
+
+def pie_chart_png(emission_data):
+    """PNG bytes of the category pie chart (transparent background)."""
+    return _pie_png(_chart_key(emission_data))
+
+
+def bar_chart_png(emission_data):
+    """PNG bytes of the matplotlib category bar chart (the PDF's chart before vector drawing)."""
+    return _bar_png(_chart_key(emission_data))
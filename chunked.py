@@ -0,0 +1,25 @@
+"""Helpers shared by the bulk PDF jobs (``batch_report.py`` and ``organisation.py``)."""
+import re
+from collections import deque
+
+
+def safe_name(name):
+    """``name`` reduced to a short file-name-safe token."""
+    return re.sub(r"[^A-Za-z0-9_-]+", "_", str(name)).strip("_")[:40] or "report"
+
+
+def bounded_map(submit, fn, items, max_in_flight):
+    """Yield ``fn(item)`` for every item, in order, with at most ``max_in_flight`` submitted at once.
+
+    ``submit(fn, item)`` returns a Future: ``executor.submit`` or ``ReportPool.submit_task``.
+
+    Items are pulled lazily, so a large input (chunks of a file, rows of an
+    upload) never sits in the pool's queue all at once.
+    """
+    in_flight = deque()
+    for item in items:
+        if len(in_flight) >= max_in_flight:
+            yield in_flight.popleft().result()
+        in_flight.append(submit(fn, item))
+    while in_flight:
+        yield in_flight.popleft().result()
@@ -0,0 +1,226 @@
+"""Hourly electricity emissions with a time-varying grid intensity.
+
+The flat model is ``monthly_kwh * 12 * factor``. Here a year is 8760 hourly
+values (Feb 29 is dropped): a load profile in kWh, either a template shape
+scaled to the user's monthly kWh or an uploaded meter CSV, and a grid
+intensity series in kg CO2/kWh. Emissions are one dot product
+``load @ intensity``.
+
+The intensity series comes from ``GRID_INTENSITY_PATH`` when set: a ``.npy``
+(or ``.csv``, converted to ``.npy`` once) of one or more whole years of
+hourly values, opened with ``np.load(mmap_mode="r")`` so multi-year series
+are paged in instead of read into memory; every year is evaluated at once as
+a ``(years, 8760) @ (8760,)`` product. A ``{country}`` placeholder in the
+path selects one file per region (``data/grid/{country}.npy``); a path
+without it is used for every region. Regions without a file, or no path at
+all, get the registry's flat factor with a typical diurnal shape (evening
+peakers, cleaner nights) and the same annual mean.
+
+The "flat" figure ``analyse`` compares against is always the registry's
+electricity factor, i.e. the Electricity line of the headline footprint.
+
+``shift_load`` moves a flexible share of each day's use to that day's
+cleanest hour and reports the CO2 saved.
+"""
+import os
+from functools import lru_cache
+
+import numpy as np
+
+from factor_registry import get_factor_tables
+
+HOURS_PER_YEAR = 8760
+GRID_INTENSITY_PATH = os.environ.get("GRID_INTENSITY_PATH")
+
+_MONTH_DAYS = np.array([31, 28, 31, 30, 31, 30, 31, 31, 30, 31, 30, 31])
+_HOUR_OF_DAY = np.arange(HOURS_PER_YEAR) % 24
+_DAY = np.arange(HOURS_PER_YEAR) // 24
+_MONTH = np.repeat(np.arange(12), _MONTH_DAYS * 24)
+_WEEKEND = _DAY % 7 >= 5  # tahun dianggap mulai hari Senin
+
+# Bentuk beban harian relatif (jam 0..23) per template, hari kerja / akhir pekan
+LOAD_TEMPLATES = {
+    "evening_peak": {
+        "label": "Typical household (evening peak)",
+        "weekday": [.45, .4, .38, .38, .4, .55, .9, 1.1, .9, .7, .65, .65,
+                    .7, .65, .65, .7, .9, 1.3, 1.7, 1.8, 1.7, 1.4, 1.0, .65],
+        "weekend": [.5, .45, .4, .4, .4, .45, .6, .85, 1.0, 1.0, 1.0, 1.05,
+                    1.1, 1.0, .95, .95, 1.05, 1.35, 1.7, 1.8, 1.7, 1.4, 1.0, .7],
+    },
+    "daytime": {
+        "label": "Home office (daytime)",
+        "weekday": [.45, .4, .38, .38, .4, .5, .75, 1.0, 1.25, 1.35, 1.4, 1.4,
+                    1.35, 1.4, 1.4, 1.35, 1.25, 1.3, 1.45, 1.45, 1.3, 1.1, .8, .55],
+        "weekend": [.5, .45, .4, .4, .4, .45, .6, .85, 1.0, 1.05, 1.1, 1.1,
+                    1.1, 1.05, 1.0, 1.0, 1.05, 1.3, 1.5, 1.5, 1.35, 1.15, .85, .6],
+    },
+    "flat": {"label": "Flat (same every hour)", "weekday": [1.0] * 24, "weekend": [1.0] * 24},
+}
+# Pemakaian per bulan relatif (AC lebih banyak di bulan panas)
+MONTH_SHAPE = np.array([.96, .96, 1.02, 1.06, 1.08, 1.0, .96, .97, 1.02, 1.06, 1.0, .95])
+
+# Intensitas relatif jaringan per jam: pembangkit puncak di sore/malam, malam lebih bersih
+INTENSITY_SHAPE = np.array([.95, .94, .93, .93, .93, .95, .98, 1.0, 1.0, .99, .98, .97,
+                            .97, .97, .98, 1.0, 1.03, 1.08, 1.1, 1.1, 1.08, 1.04, 1.0, .97])
+
+
+@lru_cache(maxsize=8)
+def _template_shape(name):
+    template = LOAD_TEMPLATES[name]
+    daily = np.where(_WEEKEND, np.take(template["weekend"], _HOUR_OF_DAY), np.take(template["weekday"], _HOUR_OF_DAY))
+    shape = daily * MONTH_SHAPE[_MONTH]
+    shape = shape / shape.sum()
+    shape.setflags(write=False)
+    return shape
+
+
+def template_load(name, monthly_kwh):
+    """8760 hourly kWh following template ``name``, totalling ``12 * monthly_kwh``."""
+    if name not in LOAD_TEMPLATES:
+        raise ValueError(f"Unknown load template: {name!r}")
+    return _template_shape(name) * (12 * monthly_kwh)
+
+
+def _to_year(values, index):
+    """Map hourly values with a DatetimeIndex onto one 8760-hour year (mean over years, gaps interpolated)."""
+    import pandas as pd
+
+    index = pd.DatetimeIndex(index)
+    keep = ~((index.month == 2) & (index.day == 29))
+    index, values = index[keep], np.asarray(values, dtype=np.float64)[keep]
+    hour_of_year = (index.dayofyear - 1 - ((index.month > 2) & index.is_leap_year)) * 24 + index.hour
+    sums = np.bincount(hour_of_year, weights=values, minlength=HOURS_PER_YEAR)
+    counts = np.bincount(hour_of_year, minlength=HOURS_PER_YEAR)
+    year = np.full(HOURS_PER_YEAR, np.nan)
+    year[counts > 0] = sums[counts > 0] / counts[counts > 0]
+    if counts.sum() == 0:
+        raise ValueError("No usable hourly readings found.")
+    return pd.Series(year).interpolate(limit_direction="both").to_numpy()
+
+
+def load_meter_csv(source):
+    """Hourly kWh from a meter export: a timestamp column plus a kWh column (first numeric one).
+
+    Readings are summed per hour, averaged over years onto one 8760-hour
+    year, and missing hours are interpolated.
+    """
+    import pandas as pd
+
+    try:
+        frame = pd.read_csv(source)
+    except (pd.errors.ParserError, pd.errors.EmptyDataError, UnicodeDecodeError) as exc:
+        raise ValueError(f"Could not read the meter CSV: {exc}") from exc
+    if frame.shape[1] < 2:
+        raise ValueError("The meter CSV needs a timestamp column and a kWh column.")
+    time_col = next((c for c in frame.columns if str(c).strip().lower() in ("timestamp", "time", "datetime", "date")),
+                    frame.columns[0])
+    value_cols = [c for c in frame.columns if c != time_col and pd.api.types.is_numeric_dtype(frame[c])]
+    kwh_col = next((c for c in value_cols if "kwh" in str(c).lower()), value_cols[0] if value_cols else None)
+    if kwh_col is None:
+        raise ValueError("No numeric kWh column found in the meter CSV.")
+    stamps = pd.to_datetime(frame[time_col], errors="coerce")
+    if stamps.isna().all():
+        raise ValueError(f"Column {time_col!r} does not contain timestamps.")
+    hourly = frame.loc[stamps.notna(), kwh_col].clip(lower=0).groupby(stamps[stamps.notna()].dt.floor("h")).sum()
+    return _to_year(hourly.to_numpy(), hourly.index)
+
+
+def _csv_to_npy(path):
+    """Convert an hourly intensity CSV (last numeric column) to ``<path>.npy`` once, in chunks."""
+    import pandas as pd
+
+    target = path + ".npy"
+    if os.path.exists(target) and os.path.getmtime(target) >= os.path.getmtime(path):
+        return target
+    chunks = [chunk.select_dtypes("number").iloc[:, -1].to_numpy(np.float32)
+              for chunk in pd.read_csv(path, chunksize=1 << 20)]
+    tmp = target + ".tmp.npy"
+    out = np.lib.format.open_memmap(tmp, mode="w+", dtype=np.float32, shape=(sum(len(c) for c in chunks),))
+    start = 0
+    for chunk in chunks:
+        out[start:start + len(chunk)] = chunk
+        start += len(chunk)
+    out.flush()
+    del out
+    os.replace(tmp, target)
+    return target
+
+
+@lru_cache(maxsize=4)
+def _intensity_file(path, mtime):
+    if path.endswith(".csv"):
+        path = _csv_to_npy(path)
+    series = np.load(path, mmap_mode="r")
+    years = len(series) // HOURS_PER_YEAR
+    if years == 0:
+        raise ValueError(f"{path} holds fewer than {HOURS_PER_YEAR} hourly values.")
+    # Tetap memmap: hanya halaman yang dipakai dot product yang dibaca dari disk
+    return series[:years * HOURS_PER_YEAR].reshape(years, HOURS_PER_YEAR)
+
+
+def registry_factor(country):
+    """The registry's flat electricity factor (kg CO2/kWh) for ``country``."""
+    tables = get_factor_tables()
+    if country not in tables.region_index:
+        raise ValueError(f"Unknown country: {country!r}")
+    return float(tables.electricity[tables.region_index[country]])
+
+
+def grid_intensity(country="Indonesia", path=GRID_INTENSITY_PATH):
+    """Hourly kg CO2/kWh as a ``(years, 8760)`` array (memory-mapped when loaded from ``path``)."""
+    factor = registry_factor(country)
+    if path:
+        # "{country}" di path: satu file per region; tanpa placeholder satu file untuk semua region
+        path = path.replace("{country}", country)
+        if os.path.exists(path):
+            return _intensity_file(path, os.path.getmtime(path))
+    return (factor * INTENSITY_SHAPE[_HOUR_OF_DAY] / INTENSITY_SHAPE.mean())[None, :]
+
+
+def hourly_emissions_kg(load, intensity):
+    """kg CO2 per year of the series: ``intensity @ load`` (one value per intensity year)."""
+    return np.asarray(intensity @ load, dtype=np.float64)
+
+
+def shift_load(load, intensity, share):
+    """Move ``share`` of each day's use into that day's cleanest hour.
+
+    ``intensity`` is one 8760-hour year. Returns ``(shifted_load, saved_kg)``.
+    """
+    days_load = load.reshape(-1, 24)
+    days_intensity = np.asarray(intensity, dtype=np.float64).reshape(-1, 24)
+    shifted = days_load * (1 - share)
+    cleanest = days_intensity.argmin(axis=1)
+    shifted[np.arange(len(shifted)), cleanest] += share * days_load.sum(axis=1)
+    saved = float(days_load.ravel() @ days_intensity.ravel() - shifted.ravel() @ days_intensity.ravel())
+    return shifted.ravel(), saved
+
+
+def analyse(load, intensity, country="Indonesia", share=0.2):
+    """Hourly vs flat emissions and load-shifting savings (kg CO2/year).
+
+    ``flat_kg`` uses the registry factor for ``country`` (the headline's
+    Electricity figure). With a multi-year intensity series the hourly
+    figure is the mean over years (``per_year_kg`` lists each year) and
+    shifting uses the mean year.
+    """
+    per_year = hourly_emissions_kg(load, intensity)
+    mean_year = np.asarray(intensity.mean(axis=0), dtype=np.float64)
+    shifted, saved = shift_load(load, mean_year, share)
+    hour_intensity = mean_year.reshape(-1, 24).mean(axis=0)
+    return {
+        "kwh": float(load.sum()),
+        "hourly_kg": float(per_year.mean()),
+        "per_year_kg": per_year.tolist(),
+        "flat_kg": float(load.sum() * registry_factor(country)),
+        "shift_share": share,
+        "shift_saved_kg": saved,
+        "shifted_load": shifted,
+        "cleanest_hour": int(hour_intensity.argmin()),
+        "dirtiest_hour": int(hour_intensity.argmax()),
+    }
+
+
+def average_day(series):
+    """Mean value per hour of day (24 values) of an 8760-hour series."""
+    return np.asarray(series, dtype=np.float64).reshape(-1, 24).mean(axis=0)
@@ -0,0 +1,161 @@
+"""Versioned emission factor registry.
+
+Factors live in a long-format CSV (``data/emission_factors.csv``) with one row
+per ``version, valid_from, region, category, key, factor`` and an optional
+``gsd``: the factor's uncertainty as a geometric standard deviation (1 or
+empty = exact; see ``FactorTables.sample``). For a given date
+the newest factor set per region is compiled once into dense NumPy tables
+indexed by region/mode/diet codes, so batch calculations do array gathers
+instead of nested dict lookups. ``get_factor_tables`` memoizes the compiled
+tables on the file's mtime and size, so dropping in a new version is picked
+up on the next call without a restart.
+"""
+import csv
+import os
+import threading
+from datetime import date
+from types import SimpleNamespace
+
+import numpy as np
+
+FACTORS_PATH = os.environ.get(
+    "EMISSION_FACTORS_PATH",
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), "data", "emission_factors.csv"))
+
+TRANSPORT_MODES = ["car", "motorcycle", "bus", "train", "walk_or_bike"]
+DIET_TYPES = ["meat_heavy", "omnivore", "vegetarian", "vegan"]
+FLIGHT_TYPES = ["domestic", "international"]
+SCALAR_CATEGORIES = ["Electricity", "Waste", "Plastic", "Clothing"]
+
+# Semua (kategori, key) yang wajib ada untuk setiap region
+REQUIRED_KEYS = (
+    [("Transportation", m) for m in TRANSPORT_MODES]
+    + [("Diet", d) for d in DIET_TYPES]
+    + [("Flights", f) for f in FLIGHT_TYPES]
+    + [(c, "") for c in SCALAR_CATEGORIES]
+)
+
+
+class FactorTables:
+    """Dense factor arrays for every region, compiled for one ``as_of`` date."""
+
+    def __init__(self, regions, versions, factors, as_of, source=None, gsd=None):
+        self.regions = regions
+        self.region_index = {r: i for i, r in enumerate(regions)}
+        self.versions = versions  # region -> versi faktor yang dipakai
+        self.as_of = as_of
+        self.source = source
+
+        for name, values in _arrays(regions, factors).items():
+            setattr(self, name, values)
+        # Ketidakpastian per faktor, bentuk array sama dengan faktornya
+        self.gsd = _arrays(regions, gsd or {r: {} for r in regions}, default=1.0)
+
+    def sample(self, region, n, rng):
+        """``n`` lognormal draws of every factor of ``region`` (median = the factor, spread = its GSD).
+
+        Returns an object with the same factor attributes as the tables, each
+        with a trailing draw axis and ``region`` as the only region (index 0),
+        so the engine's kernels evaluate all draws in one pass.
+        """
+        i = self.region_index[region]
+        draws = {}
+        for name, gsd in self.gsd.items():
+            median = getattr(self, name)[i:i + 1]
+            sigma = np.log(gsd[i:i + 1])
+            draws[name] = median[..., None] * np.exp(sigma[..., None] * rng.standard_normal(median.shape + (n,)))
+        return SimpleNamespace(**draws)
+
+    def as_dict(self, region):
+        """Nested-dict view of one region (same shape as the old ``EMISSION_FACTORS[country]``)."""
+        i = self.region_index[region]
+        return {
+            "Transportation": dict(zip(TRANSPORT_MODES, self.transport[i].tolist())),
+            "Electricity": float(self.electricity[i]),
+            "Diet": dict(zip(DIET_TYPES, self.diet[i].tolist())),
+            "Waste": float(self.waste[i]),
+            "Flights": {"domestic": float(self.flight_domestic[i]),
+                        "international": float(self.flight_international[i])},
+            "Plastic": float(self.plastic[i]),
+            "Clothing": float(self.clothing[i]),
+        }
+
+
+def _arrays(regions, values, default=None):
+    """Dense per-region arrays, one attribute per factor group, from ``{region: {(category, key): value}}``."""
+    def column(category, key=""):
+        if default is None:
+            return np.array([values[r][(category, key)] for r in regions], dtype=np.float64)
+        return np.array([values[r].get((category, key), default) for r in regions], dtype=np.float64)
+
+    return {
+        "transport": np.stack([column("Transportation", m) for m in TRANSPORT_MODES], axis=1),
+        "diet": np.stack([column("Diet", d) for d in DIET_TYPES], axis=1),
+        "flight_domestic": column("Flights", "domestic"),
+        "flight_international": column("Flights", "international"),
+        "electricity": column("Electricity"),
+        "waste": column("Waste"),
+        "plastic": column("Plastic"),
+        "clothing": column("Clothing"),
+    }
+
+
+def compile_factors(rows, as_of=None, source=None):
+    """Compile registry rows (dicts with the CSV columns) into ``FactorTables``."""
+    as_of = as_of or date.today().isoformat()
+    # Per region: pilih versi terbaru yang sudah berlaku pada tanggal as_of
+    latest = {}
+    for row in rows:
+        if row["valid_from"] > as_of:
+            continue
+        current = latest.get(row["region"])
+        if current is None or row["valid_from"] > current:
+            latest[row["region"]] = row["valid_from"]
+
+    factors = {region: {} for region in latest}
+    gsd = {region: {} for region in latest}
+    versions = {}
+    for row in rows:
+        region = row["region"]
+        if latest.get(region) != row["valid_from"]:
+            continue
+        key = (row["category"], row["key"] or "")
+        factors[region][key] = float(row["factor"])
+        gsd[region][key] = float(row.get("gsd") or 1.0)
+        if gsd[region][key] < 1.0:
+            raise ValueError(f"GSD below 1 for {region} {key}: {gsd[region][key]}")
+        versions[region] = row["version"]
+
+    for region, values in factors.items():
+        missing = [f"{c}/{k}" if k else c for c, k in REQUIRED_KEYS if (c, k) not in values]
+        if missing:
+            raise ValueError(f"Factor set {versions[region]} for {region} is missing: {missing}")
+    if not factors:
+        raise ValueError(f"No emission factors valid on {as_of}")
+    return FactorTables(sorted(factors), versions, factors, as_of, source, gsd)
+
+
+def load_factor_tables(path=FACTORS_PATH, as_of=None):
+    with open(path, newline="", encoding="utf-8") as f:
+        rows = list(csv.DictReader(f))
+    return compile_factors(rows, as_of, source=path)
+
+
+_lock = threading.Lock()
+_cache = {}
+
+
+def get_factor_tables(path=FACTORS_PATH, as_of=None):
+    """Compiled tables for ``path``, recompiled only when the file changes (hot reload)."""
+    as_of = as_of or date.today().isoformat()
+    stat = os.stat(path)
+    key = (path, as_of)
+    stamp = (stat.st_mtime_ns, stat.st_size)
+    cached = _cache.get(key)
+    if cached is not None and cached[0] == stamp:
+        return cached[1]
+    with _lock:
+        cached = _cache.get(key)
+        if cached is None or cached[0] != stamp:
+            cached = _cache[key] = (stamp, load_factor_tables(path, as_of))
+        return cached[1]
@@ -0,0 +1,148 @@
+"""Monthly footprint history behind "Track my monthly carbon footprint".
+
+Every tracked calculation is appended to a local SQLite table keyed by an
+integer user id and the month (``YYYYMM``), with one REAL column per
+category. Triggers keep per-month and per-year rollups (sums and counts, in
+``WITHOUT ROWID`` tables clustered on ``(user_id, period)``) up to date in the
+same transaction, so a multi-year trend is a primary-key range scan over a
+few dozen rows, no matter how many entries are stored.
+
+Users are opaque ids (``new_user_id``), one per browser, not display names:
+anyone can type someone else's name, but not guess their id.
+"""
+import os
+import re
+import secrets
+import sqlite3
+import threading
+import time
+from datetime import datetime
+
+from carbon_engine import CATEGORIES
+
+HISTORY_DB = os.environ.get(
+    "HISTORY_DB", os.path.join(os.path.dirname(os.path.abspath(__file__)), "history.db"))
+
+_COLUMNS = ["total_kg"] + [c.lower() for c in CATEGORIES]
+_USER_ID = re.compile(r"[A-Za-z0-9_-]{22}")
+
+
+def new_user_id():
+    """A fresh anonymous user id (128 random bits, URL/cookie safe)."""
+    return secrets.token_urlsafe(16)
+
+
+def is_user_id(value):
+    return isinstance(value, str) and _USER_ID.fullmatch(value) is not None
+
+
+def month_key(when=None):
+    """``datetime`` -> integer month ``YYYYMM``."""
+    when = when or datetime.now()
+    return when.year * 100 + when.month
+
+
+def _rollup_trigger(table, period, expr):
+    # Rollup ikut diperbarui di transaksi yang sama dengan INSERT ke entries
+    new = ", ".join(f"NEW.{c}" for c in _COLUMNS)
+    update = ", ".join(f"{c} = {c} + excluded.{c}" for c in _COLUMNS)
+    return f"""
+        CREATE TRIGGER IF NOT EXISTS entries_{table} AFTER INSERT ON entries BEGIN
+            INSERT INTO {table} (user_id, {period}, n, {', '.join(_COLUMNS)})
+            VALUES (NEW.user_id, {expr}, 1, {new})
+            ON CONFLICT DO UPDATE SET n = n + 1, {update};
+        END"""
+
+
+class FootprintHistory:
+    def __init__(self, db_path=HISTORY_DB):
+        self._lock = threading.Lock()
+        self._users = {}
+        self._db = sqlite3.connect(db_path, check_same_thread=False, isolation_level=None)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute("PRAGMA synchronous=NORMAL")
+
+        values = ", ".join(f"{c} REAL NOT NULL" for c in _COLUMNS)
+        self._db.execute("CREATE TABLE IF NOT EXISTS users (user_id INTEGER PRIMARY KEY, name TEXT NOT NULL UNIQUE)")
+        self._db.execute(f"""
+            CREATE TABLE IF NOT EXISTS entries (
+                user_id     INTEGER NOT NULL,
+                month       INTEGER NOT NULL,
+                recorded_at INTEGER NOT NULL,
+                {values}
+            )""")
+        self._db.execute("CREATE INDEX IF NOT EXISTS entries_user_month ON entries (user_id, month)")
+        for table, period in (("monthly", "month"), ("yearly", "year")):
+            self._db.execute(f"""
+                CREATE TABLE IF NOT EXISTS {table} (
+                    user_id INTEGER NOT NULL,
+                    {period} INTEGER NOT NULL,
+                    n       INTEGER NOT NULL,
+                    {values},
+                    PRIMARY KEY (user_id, {period})
+                ) WITHOUT ROWID""")
+        self._db.execute(_rollup_trigger("monthly", "month", "NEW.month"))
+        self._db.execute(_rollup_trigger("yearly", "year", "NEW.month / 100"))
+
+    def _user_id(self, user, create=False):
+        # Kolom users.name menyimpan id anonim dari new_user_id (apa adanya, tanpa normalisasi)
+        if user in self._users:
+            return self._users[user]
+        row = self._db.execute("SELECT user_id FROM users WHERE name = ?", (user,)).fetchone()
+        if row is None:
+            if not create:
+                return None
+            row = (self._db.execute("INSERT INTO users (name) VALUES (?)", (user,)).lastrowid,)
+        self._users[user] = row[0]
+        return row[0]
+
+    # --- Tulis ---
+    def record(self, user, res, when=None):
+        """Append one calculation (a ``calculate_*`` result dict) for ``user``. Returns the month key."""
+        month = month_key(when)
+        kg = [res["total_tonnes"] * 1000] + [res["emission_data_tonnes"][c] * 1000 for c in CATEGORIES]
+        self.record_many([(user, month, kg)])
+        return month
+
+    def record_many(self, rows):
+        """Append ``(user, month, [total_kg, category_kg...])`` rows in one transaction."""
+        now = int(time.time())
+        with self._lock:
+            self._db.execute("BEGIN")
+            try:
+                values = [(self._user_id(user, create=True), month, now, *kg) for user, month, kg in rows]
+                self._db.executemany(
+                    f"INSERT INTO entries (user_id, month, recorded_at, {', '.join(_COLUMNS)}) "
+                    f"VALUES (?, ?, ?, {', '.join('?' * len(_COLUMNS))})", values)
+                self._db.execute("COMMIT")
+            except BaseException:
+                self._db.execute("ROLLBACK")
+                self._users.clear()  # user baru dari transaksi yang batal ikut hilang
+                raise
+
+    # --- Baca ---
+    def _rollup(self, table, period, user, start, end):
+        with self._lock:
+            user_id = self._user_id(user)
+            if user_id is None:
+                return []
+            means = ", ".join(f"{c} / n / 1000" for c in _COLUMNS)
+            return self._db.execute(
+                f"SELECT {period}, n, {means} FROM {table} "
+                f"WHERE user_id = ? AND {period} BETWEEN ? AND ? ORDER BY {period}",
+                (user_id, start, end)).fetchall()
+
+    def monthly(self, user, start=0, end=999999):
+        """Per-month averages in tonnes CO2/year: rows of ``(YYYYMM, entries, total, *categories)``."""
+        return self._rollup("monthly", "month", user, start, end)
+
+    def yearly(self, user, start=0, end=9999):
+        """Per-year averages in tonnes CO2/year: rows of ``(year, entries, total, *categories)``."""
+        return self._rollup("yearly", "year", user, start, end)
+
+    def count(self):
+        with self._lock:
+            return self._db.execute("SELECT COUNT(*) FROM entries").fetchone()[0]
+
+    def close(self):
+        self._db.close()
@@ -0,0 +1,204 @@
+"""Concurrent-session load test for ``app2.py``.
+
+Runs N simulated sessions through ``streamlit.testing.v1.AppTest``, up to
+``--concurrency`` at a time, each worker in its own process (``AppTest`` is
+not safe to drive from several threads at once). Each session enters
+a name, optionally uploads a camera photo, moves a few inputs, presses
+Save and requests the PDF report (polling until the download button
+appears). Sheet.best is replaced by ``sheet_stub`` and all on-disk state
+(submission queue, report cache, history, percentile shards, session
+blobs) goes to a scratch directory.
+
+    python loadtest.py --sessions 50 --concurrency 8 --photo
+
+Reports p50/p95/p99 rerun latency, PDF turnaround, throughput, the RSS a
+worker process needs for its first session (imports, caches) and its RSS
+growth per further session, and writes everything as JSON (``--out``).
+"""
+import argparse
+import json
+import multiprocessing
+import os
+import random
+import statistics
+import sys
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+APP = os.path.join(HERE, "app2.py")
+SAMPLE_PHOTO = os.path.join(HERE, "photo.jpg")
+
+
+def rss_bytes():
+    """Current resident set size of this process."""
+    try:
+        with open("/proc/self/status") as f:
+            for line in f:
+                if line.startswith("VmRSS:"):
+                    return int(line.split()[1]) * 1024
+    except OSError:
+        pass
+    import resource  # bukan Linux: pakai puncak RSS sebagai pendekatan
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak if sys.platform == "darwin" else peak * 1024
+
+
+def _percentiles(values):
+    if not values:
+        return {"p50_s": None, "p95_s": None, "p99_s": None, "max_s": None}
+    q = statistics.quantiles(values, n=100, method="inclusive") if len(values) > 1 else [values[0]] * 99
+    return {"p50_s": q[49], "p95_s": q[94], "p99_s": q[98], "max_s": max(values)}
+
+
+def run_session(index, seed=0, photo=None, timeout=120.0):
+    """One simulated user. Returns rerun latencies, PDF turnaround and RSS before/after."""
+    # AppTest memasang app2 sebagai __main__ dan tidak mengembalikannya; tanpa ini
+    # worker tidak bisa unpickle tugas berikutnya (run_session dicari di __main__)
+    main = sys.modules["__main__"]
+    try:
+        return _session(index, seed, photo, timeout)
+    finally:
+        sys.modules["__main__"] = main
+
+
+def _session(index, seed, photo, timeout):
+    from streamlit.testing.v1 import AppTest
+
+    from carbon_engine import DIET_TYPES, TRANSPORT_MODES
+
+    rng = random.Random(seed + index)
+    started = time.time()
+    rss_before = rss_bytes()
+    latencies = []
+    at = AppTest.from_file(APP, default_timeout=timeout)
+
+    def rerun(action):
+        start = time.perf_counter()
+        action()
+        latencies.append(time.perf_counter() - start)
+        if at.exception:
+            raise RuntimeError(at.exception[0].message)
+
+    def button(label):
+        return next(b for b in at.button if b.label.startswith(label))
+
+    rerun(at.run)
+    rerun(lambda: at.text_input(key="name").input(f"Load test {index}").run())
+    if photo:
+        rerun(lambda: at.camera_input(key="photo").set_value(("photo.jpg", photo, "image/jpeg")).run())
+    rerun(lambda: at.selectbox(key="transport_mode").select(rng.choice(TRANSPORT_MODES)).run())
+    rerun(lambda: at.slider(key="daily_distance").set_value(round(rng.uniform(0, 100), 1)).run())
+    rerun(lambda: at.slider(key="monthly_kwh").set_value(round(rng.uniform(0, 2000), 1)).run())
+    rerun(lambda: at.selectbox(key="diet_type").select(rng.choice(DIET_TYPES)).run())
+    rerun(lambda: button("🧾").click().run())
+
+    # Minta PDF, lalu polling seperti fragment report_progress sampai tombol download muncul
+    pdf_start = time.perf_counter()
+    rerun(lambda: button("📄").click().run())
+    while not at.get("download_button"):
+        if at.error:
+            raise RuntimeError(at.error[0].value)
+        if time.perf_counter() - pdf_start > timeout:
+            raise TimeoutError("PDF report not ready in time")
+        time.sleep(0.1)
+        at.run()
+    pdf_s = time.perf_counter() - pdf_start
+
+    return {"pid": os.getpid(), "started": started, "latencies": latencies, "pdf_s": pdf_s,
+            "rss_before": rss_before, "rss_after": rss_bytes()}
+
+
+def _rss_summary(results):
+    """Cold-start RSS per worker and steady-state growth per later session."""
+    per_pid = {}
+    for r in sorted(results, key=lambda r: r["started"]):
+        per_pid.setdefault(r["pid"], []).append(r)
+    first = [runs[0]["rss_after"] - runs[0]["rss_before"] for runs in per_pid.values()]
+    later = sum(len(runs) - 1 for runs in per_pid.values())
+    growth = sum(runs[-1]["rss_after"] - runs[0]["rss_after"] for runs in per_pid.values())
+    return {
+        "rss_peak_mb": max((r["rss_after"] for r in results), default=0) / 2**20,
+        "rss_first_session_mb": statistics.fmean(first) / 2**20 if first else None,
+        "rss_growth_per_session_kb": growth / later / 1024 if later else None,
+    }
+
+
+def run(sessions=10, concurrency=4, photo=False, seed=0, timeout=120.0):
+    from sheet_stub import SheetStub
+
+    stub = SheetStub().start()
+    scratch = tempfile.mkdtemp(prefix="loadtest-")
+    # Harus diset sebelum app2 (dan worker proses) meng-import modulnya
+    os.environ.update({
+        "SHEET_BEST_URL": stub.url,
+        "SUBMISSION_DB": os.path.join(scratch, "submissions.db"),
+        "REPORT_CACHE_DIR": os.path.join(scratch, "reports"),
+        "HISTORY_DB": os.path.join(scratch, "history.db"),
+        "PERCENTILE_DIR": os.path.join(scratch, "percentiles"),
+        "SESSION_BLOB_DIR": os.path.join(scratch, "session_blobs"),
+    })
+    photo_bytes = None
+    if photo:
+        with open(SAMPLE_PHOTO, "rb") as f:
+            photo_bytes = f.read()
+
+    results, errors = [], []
+    start = time.perf_counter()
+    with ProcessPoolExecutor(concurrency, mp_context=multiprocessing.get_context("spawn")) as pool:
+        futures = [pool.submit(run_session, i, seed, photo_bytes, timeout) for i in range(sessions)]
+        for future in as_completed(futures):
+            try:
+                results.append(future.result())
+            except Exception as exc:
+                errors.append(repr(exc))
+    elapsed = time.perf_counter() - start
+    stub.stop()
+
+    latencies = [s for r in results for s in r["latencies"]]
+    return {
+        "config": {"sessions": sessions, "concurrency": concurrency, "photo": photo},
+        "completed": len(results), "failed": len(errors), "errors": errors[:10],
+        "wall_s": elapsed,
+        "sessions_per_s": len(results) / elapsed if elapsed else 0.0,
+        "reruns_per_s": len(latencies) / elapsed if elapsed else 0.0,
+        "rerun_latency": _percentiles(latencies),
+        "pdf_turnaround": _percentiles([r["pdf_s"] for r in results]),
+        **_rss_summary(results),
+        "sheet_rows_received": len(stub.rows),
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Simulate concurrent sessions of app2.py.")
+    parser.add_argument("--sessions", type=int, default=10, help="total sessions to run")
+    parser.add_argument("--concurrency", type=int, default=4, help="worker processes (sessions at the same time)")
+    parser.add_argument("--photo", action="store_true", help="upload a camera photo in every session")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--timeout", type=float, default=120.0, help="per-rerun and PDF timeout (s)")
+    parser.add_argument("--out", default="loadtest_results.json", help="where to write the JSON report")
+    args = parser.parse_args(argv)
+
+    sys.path.insert(0, HERE)
+    report = run(args.sessions, args.concurrency, args.photo, args.seed, args.timeout)
+    lat, pdf = report["rerun_latency"], report["pdf_turnaround"]
+    print(f"{report['completed']}/{args.sessions} sessions ok in {report['wall_s']:.1f}s "
+          f"({report['sessions_per_s']:.2f} sessions/s, {report['reruns_per_s']:.1f} reruns/s)")
+    if lat["p50_s"] is not None:
+        print(f"rerun latency  p50 {lat['p50_s'] * 1000:.0f} ms  p95 {lat['p95_s'] * 1000:.0f} ms  "
+              f"p99 {lat['p99_s'] * 1000:.0f} ms")
+        print(f"PDF turnaround p50 {pdf['p50_s']:.2f} s  p95 {pdf['p95_s']:.2f} s  p99 {pdf['p99_s']:.2f} s")
+        growth = report["rss_growth_per_session_kb"]
+        print(f"RSS peak {report['rss_peak_mb']:.0f} MB, first session {report['rss_first_session_mb']:.0f} MB, "
+              f"growth {'n/a' if growth is None else f'{growth:.0f} KB'}/session")
+    for error in report["errors"]:
+        print("error:", error)
+    with open(args.out, "w") as f:
+        json.dump(report, f, indent=2)
+    print(f"Report written to {args.out}")
+    return 1 if report["failed"] else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
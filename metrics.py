@@ -0,0 +1,191 @@
+"""Lightweight per-stage latency metrics for the Streamlit page.
+
+Wrap each stage of a rerun in ``stage("name")`` (or decorate a function with
+``timed("name")``). Durations feed fixed-bucket histograms and the current
+rerun's breakdown; ``end_rerun`` appends the breakdown to a JSON-lines log.
+Fragment-only reruns skip the script's ``begin_rerun``/``end_rerun``;
+decorate fragment bodies with ``fragment("name")`` so they are timed and
+logged the same way (as stage ``fragment_<name>``).
+``start_exporter`` serves the histograms in Prometheus text format.
+
+Everything is off unless ``CARBON_METRICS=1``: ``stage`` then returns a shared
+no-op context manager and ``timed`` returns the function unchanged.
+
+    CARBON_METRICS=1 CARBON_METRICS_PORT=9464 streamlit run app2.py
+"""
+import json
+import os
+import threading
+import time
+from bisect import bisect_left
+from contextlib import contextmanager, nullcontext
+from functools import wraps
+
+ENABLED = os.environ.get("CARBON_METRICS", "") not in ("", "0")
+LOG_PATH = os.environ.get("CARBON_METRICS_LOG", "metrics.jsonl")
+BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+_NOOP = nullcontext()
+_lock = threading.Lock()
+_histograms = {}
+_gauge_sources = []  # (prefix, callable -> {nama: nilai}), dibaca saat scrape
+_local = threading.local()  # breakdown rerun yang sedang berjalan (satu thread per script run)
+
+
+class Histogram:
+    def __init__(self):
+        self.counts = [0] * (len(BUCKETS) + 1)
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, seconds):
+        self.counts[bisect_left(BUCKETS, seconds)] += 1
+        self.sum += seconds
+        self.count += 1
+
+
+def observe(name, seconds):
+    with _lock:
+        hist = _histograms.get(name)
+        if hist is None:
+            hist = _histograms[name] = Histogram()
+        hist.observe(seconds)
+    current = getattr(_local, "rerun", None)
+    if current is not None:
+        current[name] = current.get(name, 0.0) + seconds
+
+
+@contextmanager
+def _timed_stage(name):
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        observe(name, time.perf_counter() - start)
+
+
+def stage(name):
+    """Context manager timing one stage; a shared no-op when metrics are disabled."""
+    return _timed_stage(name) if ENABLED else _NOOP
+
+
+def timed(name):
+    """Decorator form of ``stage``; leaves the function untouched when disabled."""
+    def decorate(fn):
+        if not ENABLED:
+            return fn
+
+        @wraps(fn)
+        def wrapper(*args, **kwargs):
+            with _timed_stage(name):
+                return fn(*args, **kwargs)
+        return wrapper
+    return decorate
+
+
+def begin_rerun():
+    if ENABLED:
+        _local.rerun = {}
+        _local.rerun_start = time.perf_counter()
+
+
+def end_rerun(**fields):
+    """Finish the current rerun: record its total, log it, and return the breakdown (or None)."""
+    return _finish("rerun", **fields)
+
+
+def _finish(name, **fields):
+    current = getattr(_local, "rerun", None)
+    if not ENABLED or current is None:
+        return None
+    _local.rerun = None
+    total = time.perf_counter() - _local.rerun_start
+    observe(name, total)
+    record = {"ts": time.time(), "total_s": total, "stages": current, **fields}
+    try:
+        with open(LOG_PATH, "a") as f:
+            f.write(json.dumps(record) + "\n")
+    except OSError:
+        pass
+    return record
+
+
+@contextmanager
+def _fragment_rerun(name):
+    if getattr(_local, "rerun", None) is not None:
+        # Fragment jalan sebagai bagian rerun penuh: tahapnya sudah masuk breakdown rerun itu
+        yield
+        return
+    begin_rerun()
+    try:
+        yield
+    finally:
+        _finish(f"fragment_{name}", fragment=name)
+
+
+def fragment(name):
+    """Decorator for ``st.fragment`` bodies: a fragment-only rerun is timed like a full rerun.
+
+    Put it under ``@st.fragment``. Leaves the function untouched when disabled.
+    """
+    def decorate(fn):
+        if not ENABLED:
+            return fn
+
+        @wraps(fn)
+        def wrapper(*args, **kwargs):
+            with _fragment_rerun(name):
+                return fn(*args, **kwargs)
+        return wrapper
+    return decorate
+
+
+def register_gauges(prefix, source):
+    """Export ``source()`` (a flat ``{name: number}`` dict) as gauges, read at every scrape."""
+    with _lock:
+        _gauge_sources.append((prefix, source))
+
+
+def prometheus_text():
+    """Histograms and registered gauges in the Prometheus text exposition format."""
+    lines = ["# HELP carbon_stage_seconds Time spent per page stage.",
+             "# TYPE carbon_stage_seconds histogram"]
+    with _lock:
+        for name, hist in sorted(_histograms.items()):
+            cumulative = 0
+            for bound, count in zip(BUCKETS, hist.counts):
+                cumulative += count
+                lines.append(f'carbon_stage_seconds_bucket{{stage="{name}",le="{bound}"}} {cumulative}')
+            lines.append(f'carbon_stage_seconds_bucket{{stage="{name}",le="+Inf"}} {hist.count}')
+            lines.append(f'carbon_stage_seconds_sum{{stage="{name}"}} {hist.sum}')
+            lines.append(f'carbon_stage_seconds_count{{stage="{name}"}} {hist.count}')
+        sources = list(_gauge_sources)
+    for prefix, source in sources:
+        for name, value in sorted(source().items()):
+            lines.append(f"# TYPE carbon_{prefix}_{name} gauge")
+            lines.append(f"carbon_{prefix}_{name} {value}")
+    return "\n".join(lines) + "\n"
+
+
+def start_exporter(port):
+    """Serve ``/metrics`` on ``port`` from a daemon thread. Returns the server."""
+    from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+    class Handler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            if self.path != "/metrics":
+                self.send_error(404)
+                return
+            body = prometheus_text().encode()
+            self.send_response(200)
+            self.send_header("Content-Type", "text/plain; version=0.0.4")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, *args):
+            pass
+
+    server = ThreadingHTTPServer(("0.0.0.0", port), Handler)
+    threading.Thread(target=server.serve_forever, name="metrics-exporter", daemon=True).start()
+    return server
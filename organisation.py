@@ -0,0 +1,172 @@
+"""Organisation mode: footprints for a whole team from one CSV upload.
+
+``load_profiles`` validates the uploaded CSV and ``compute`` runs every row
+through ``calculate_batch`` in one vectorized pass (the ``country`` column
+picks the factors per row). ``department_summary`` aggregates per department.
+
+``ReportZip`` builds every individual PDF on the shared ``ReportPool``
+workers, a chunk of rows at a time, and appends each finished chunk to a ZIP
+under ``static/org_reports``. At most ``2 x workers`` chunks are in flight, so
+a 5k-person upload never holds all reports in memory; the ZIP is served by
+Streamlit's static file serving once it is complete. ZIPs older than
+``ORG_REPORT_TTL`` are removed whenever a job starts or reports its status.
+"""
+import logging
+import os
+import secrets
+import threading
+import time
+import zipfile
+
+from carbon_engine import CATEGORIES, PROFILE_COLUMNS, calculate_batch, result_from_row
+from chunked import bounded_map, safe_name
+
+logger = logging.getLogger(__name__)
+
+APP_DIR = os.path.dirname(os.path.abspath(__file__))
+ORG_REPORT_DIR = os.path.join(APP_DIR, "static", "org_reports")
+ORG_REPORT_URL = "app/static/org_reports"
+ORG_MAX_ROWS = int(os.environ.get("ORG_MAX_ROWS", "20000"))
+ORG_REPORT_TTL = 3600  # detik
+ORG_PRUNE_INTERVAL = 60  # detik; cek status tiap detik tidak perlu scan folder tiap kali
+
+# Kolom opsional dan nilai default-nya
+OPTIONAL_COLUMNS = {"name": "", "age": "", "country": "Indonesia", "department": "Unassigned"}
+
+
+def load_profiles(source):
+    """Read and validate an uploaded CSV (path or file-like). Raises ValueError on bad input."""
+    import pandas as pd  # baru saat ada upload: halaman personal tidak perlu pandas untuk first paint
+
+    try:
+        frame = pd.read_csv(source)
+    except (pd.errors.ParserError, pd.errors.EmptyDataError, UnicodeDecodeError) as exc:
+        raise ValueError(f"Could not read the CSV: {exc}") from exc
+    frame.columns = [str(c).strip() for c in frame.columns]
+
+    missing = [c for c in PROFILE_COLUMNS if c not in frame.columns]
+    if missing:
+        raise ValueError(f"Missing column(s): {', '.join(missing)}")
+    if frame.empty:
+        raise ValueError("The CSV has no rows.")
+    if len(frame) > ORG_MAX_ROWS:
+        raise ValueError(f"At most {ORG_MAX_ROWS:,} profiles per upload (got {len(frame):,}).")
+
+    for column, default in OPTIONAL_COLUMNS.items():
+        frame[column] = frame[column].fillna(default) if column in frame.columns else default
+    frame["department"] = frame["department"].astype(str).str.strip().replace("", "Unassigned")
+    unnamed = frame["name"].astype(str).str.strip() == ""
+    frame.loc[unnamed, "name"] = [f"Employee {i + 1}" for i in frame.index[unnamed]]
+    return frame.reset_index(drop=True)
+
+
+def compute(frame):
+    """Inputs plus ``calculate_batch`` results, one row per person."""
+    return frame.join(calculate_batch(frame))
+
+
+def department_summary(people):
+    """Per-department headcount, total and per-person average (tonnes CO2/year)."""
+    grouped = people.groupby("department")
+    summary = grouped[CATEGORIES + ["total_tonnes"]].mean().add_suffix(" (avg)")
+    summary.insert(0, "people", grouped.size())
+    summary.insert(1, "total_tonnes", grouped["total_tonnes"].sum())
+    return summary.sort_values("total_tonnes", ascending=False).round(2)
+
+
+def _build_chunk(records):
+    """Worker: PDF bytes for a list of ``(file name, result dict)``."""
+    from report import build_report_pdf
+
+    return [(filename, build_report_pdf(res)) for filename, res in records]
+
+
+_last_prune = {}  # folder -> waktu prune terakhir
+
+
+def _prune(directory, max_age=ORG_REPORT_TTL, interval=0):
+    now = time.time()
+    if now - _last_prune.get(directory, 0) < interval:
+        return
+    _last_prune[directory] = now
+    cutoff = now - max_age
+    with os.scandir(directory) as it:
+        for entry in it:
+            if entry.name.endswith((".zip", ".part")) and entry.stat().st_mtime < cutoff:
+                try:
+                    os.remove(entry.path)
+                except FileNotFoundError:
+                    pass
+
+
+class ReportZip:
+    """Background job writing every person's PDF into one ZIP, chunk by chunk."""
+
+    def __init__(self, people, pool, directory=ORG_REPORT_DIR, chunk_size=100):
+        self.people = people
+        self.pool = pool  # ReportPool bersama: batas worker berlaku juga untuk job ZIP
+        self.chunk_size = chunk_size
+        self.directory = directory
+        os.makedirs(directory, exist_ok=True)
+        _prune(directory)
+        # Nama acak: link hanya diketahui sesi yang membuatnya
+        filename = f"reports-{secrets.token_urlsafe(12)}.zip"
+        self.path = os.path.join(directory, filename)
+        self.url = f"{ORG_REPORT_URL}/{filename}"
+
+        self.total = len(people)
+        self.done = 0
+        self.error = None
+        self.finished = False
+        self.started_at = None
+        self._thread = threading.Thread(target=self._run, name="org-report-zip", daemon=True)
+
+    def start(self):
+        self.started_at = time.perf_counter()
+        self._thread.start()
+        return self
+
+    def _chunks(self):
+        inputs = self.people[PROFILE_COLUMNS].to_dict("records")
+        people = self.people[list(OPTIONAL_COLUMNS)].to_dict("records")
+        records = []
+        for i, (person, row) in enumerate(zip(people, self.people.itertuples(index=False))):
+            res = {"name": person["name"], "age": person["age"], "country": person["country"],
+                   "photo_bytes": None, "inputs": inputs[i], **result_from_row(row._asdict())}
+            records.append((f"{safe_name(person['department'])}/{i + 1:05d}_{safe_name(person['name'])}.pdf", res))
+            if len(records) == self.chunk_size:
+                yield records
+                records = []
+        if records:
+            yield records
+
+    def _write(self, zf, built):
+        for filename, data in built:
+            zf.writestr(filename, data)
+        self.done += len(built)
+
+    def _run(self):
+        part = self.path + ".part"
+        try:
+            # ZIP_STORED: isi PDF sudah terkompresi
+            with zipfile.ZipFile(part, "w", zipfile.ZIP_STORED) as zf:
+                chunks = bounded_map(self.pool.submit_task, _build_chunk, self._chunks(), 2 * self.pool.max_workers)
+                for built in chunks:
+                    self._write(zf, built)
+                zf.writestr("departments.csv", department_summary(self.people).to_csv())
+            os.replace(part, self.path)
+        except Exception as exc:
+            logger.exception("Building the organisation ZIP failed")
+            self.error = str(exc)
+            try:
+                os.remove(part)
+            except FileNotFoundError:
+                pass
+        finally:
+            self.finished = True
+
+    def status(self):
+        _prune(self.directory, interval=ORG_PRUNE_INTERVAL)
+        elapsed = time.perf_counter() - self.started_at if self.started_at else 0.0
+        return {"done": self.done, "total": self.total, "elapsed_s": elapsed, "finished": self.finished,
+                "error": self.error, "expired": self.finished and not self.error and not os.path.exists(self.path)}
@@ -0,0 +1,331 @@
+"""Population percentiles from streaming quantile sketches.
+
+Each submitted footprint updates a small t-digest per metric (the total and
+every category, in tonnes). A digest is a few hundred (mean, weight)
+centroids, so memory and lookup cost do not grow with the number of
+submissions; a percentile is one ``np.interp`` over the centroids.
+
+Every server process keeps its own shard file in ``PERCENTILE_DIR`` and
+rewrites it atomically every few seconds; a restarted process that gets the
+same shard name (same host and PID) picks up where the old one left off.
+Lookups merge the shards of all processes (re-read only when a shard
+changes, at most every few seconds).
+
+So the directory does not grow with every restart, a new store folds the
+shards of dead processes (same host, PID no longer running) and shards not
+written for ``STALE_SHARD_AGE`` (other hosts, e.g. replaced containers) into
+one ``archive.json`` and deletes them. A live process whose shard was folded
+that way starts a new shard with only what it added since.
+"""
+import atexit
+import json
+import os
+import socket
+import tempfile
+import threading
+import time
+
+import numpy as np
+
+from carbon_engine import CATEGORIES
+
+PERCENTILE_DIR = os.environ.get(
+    "PERCENTILE_DIR", os.path.join(os.path.dirname(os.path.abspath(__file__)), ".percentiles"))
+
+STALE_SHARD_AGE = 7 * 24 * 3600  # detik
+ARCHIVE = "archive.json"
+
+METRICS = ["total"] + CATEGORIES
+MIN_POPULATION = 20  # di bawah ini persentil belum bermakna
+
+
+class TDigest:
+    """Merging t-digest (k1 scale function) with a vectorized compress step."""
+
+    def __init__(self, compression=200, buffer_size=1000):
+        self.compression = compression
+        self.buffer_size = buffer_size
+        self.means = np.empty(0)
+        self.weights = np.empty(0)
+        self.min = np.inf
+        self.max = -np.inf
+        self._buffer = []
+        self._buffer_weights = []
+
+    @property
+    def count(self):
+        return float(self.weights.sum()) + float(sum(self._buffer_weights))
+
+    def add(self, value, weight=1.0):
+        self._buffer.append(float(value))
+        self._buffer_weights.append(float(weight))
+        if len(self._buffer) >= self.buffer_size:
+            self.compress()
+
+    def add_many(self, values):
+        values = np.asarray(values, dtype=np.float64).ravel()
+        self._merge(values, np.ones(len(values)))
+
+    def merge(self, other):
+        other.compress()
+        self._merge(other.means, other.weights, other.min, other.max)
+
+    def compress(self):
+        if self._buffer:
+            values, weights = np.array(self._buffer), np.array(self._buffer_weights)
+            self._buffer, self._buffer_weights = [], []
+            self._merge(values, weights)
+
+    def _merge(self, values, weights, lo=None, hi=None):
+        if not len(values):
+            return
+        self.min = min(self.min, values.min() if lo is None else lo)
+        self.max = max(self.max, values.max() if hi is None else hi)
+        means = np.concatenate([self.means, values])
+        w = np.concatenate([self.weights, weights])
+        order = np.argsort(means, kind="stable")
+        means, w = means[order], w[order]
+        # Kelompokkan per satu unit skala k1: centroid kecil di ekor, besar di tengah
+        cum = np.cumsum(w)
+        q = (cum - w / 2) / cum[-1]
+        k = self.compression / (2 * np.pi) * np.arcsin(2 * q - 1)
+        group = np.unique(np.floor(k), return_inverse=True)[1]
+        merged_w = np.bincount(group, weights=w)
+        self.means = np.bincount(group, weights=means * w) / merged_w
+        self.weights = merged_w
+
+    def cdf(self, value):
+        """Fraction of the added weight below ``value`` (0..1)."""
+        self.compress()
+        if not len(self.means):
+            return float("nan")
+        if value < self.min:
+            return 0.0
+        if value >= self.max:
+            return 1.0
+        cum = np.cumsum(self.weights)
+        first, last = np.searchsorted(self.means, value, "left"), np.searchsorted(self.means, value, "right")
+        if last > first:
+            # Nilai kembar (mis. banyak 0): titik tengah massa centroid yang tepat di nilai itu,
+            # dibobot sesuai beratnya (bukan rata-rata posisi centroid)
+            return float((cum[first] - self.weights[first] + cum[last - 1]) / 2 / cum[-1])
+        centers = (cum - self.weights / 2) / cum[-1]
+        x = np.concatenate([[self.min], self.means, [self.max]])
+        y = np.concatenate([[0.0], centers, [1.0]])
+        return float(np.interp(value, x, y))
+
+    def quantile(self, q):
+        self.compress()
+        if not len(self.means):
+            return float("nan")
+        cum = np.cumsum(self.weights)
+        centers = (cum - self.weights / 2) / cum[-1]
+        x = np.concatenate([[0.0], centers, [1.0]])
+        y = np.concatenate([[self.min], self.means, [self.max]])
+        return float(np.interp(q, x, y))
+
+    def to_dict(self):
+        self.compress()
+        return {"compression": self.compression, "min": self.min, "max": self.max,
+                "means": self.means.tolist(), "weights": self.weights.tolist()}
+
+    @classmethod
+    def from_dict(cls, data):
+        digest = cls(data["compression"])
+        digest.min, digest.max = data["min"], data["max"]
+        digest.means = np.array(data["means"], dtype=np.float64)
+        digest.weights = np.array(data["weights"], dtype=np.float64)
+        return digest
+
+
+def _pid_running(pid):
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        pass  # ada, milik user lain
+    return True
+
+
+def _shard_is_dead(entry, host, now, max_age):
+    """Shard whose process is gone: same host and PID not running, or not written for ``max_age``."""
+    if now - entry.stat().st_mtime > max_age:
+        return True
+    name, _, pid = entry.name[:-len(".json")].rpartition("-")
+    # Di Windows os.kill(pid, 0) menghentikan proses; di sana hanya umur yang dipakai
+    if os.name != "posix" or name != host or not pid.isdigit() or int(pid) == os.getpid():
+        return False
+    return not _pid_running(int(pid))
+
+
+class PercentileStore:
+    def __init__(self, directory=PERCENTILE_DIR, flush_interval=5.0, refresh_interval=5.0,
+                 stale_age=STALE_SHARD_AGE):
+        self.directory = directory
+        self.flush_interval = flush_interval
+        self.refresh_interval = refresh_interval
+        os.makedirs(directory, exist_ok=True)
+        self._shard = os.path.join(directory, f"{socket.gethostname()}-{os.getpid()}.json")
+        self.compact(stale_age)
+
+        self._lock = threading.RLock()
+        self._local = self._load_shard(self._shard)
+        self._since_flush = {m: TDigest() for m in METRICS}  # ditambahkan sejak flush terakhir
+        self._flushed = os.path.exists(self._shard)
+        self._dirty = False
+        self._last_flush = 0.0
+        self._others = None
+        self._others_stamp = None
+        self._merged = None
+        self._last_refresh = 0.0
+        atexit.register(self.flush)
+
+    @staticmethod
+    def _load_shard(path):
+        # Restart dengan PID yang sama (PID 1 di container) memakai shard lama: lanjutkan isinya
+        digests = {m: TDigest() for m in METRICS}
+        try:
+            with open(path) as f:
+                shard = json.load(f)
+        except (OSError, ValueError):
+            return digests
+        for m in METRICS:
+            if m in shard:
+                digests[m].merge(TDigest.from_dict(shard[m]))
+        return digests
+
+    def compact(self, max_age=STALE_SHARD_AGE):
+        """Fold dead processes' shards into the archive and delete them. Returns how many were folded."""
+        lock = os.path.join(self.directory, "compact.lock")
+        try:
+            fd = os.open(lock, os.O_CREAT | os.O_EXCL | os.O_WRONLY)
+        except FileExistsError:
+            try:
+                if time.time() - os.path.getmtime(lock) > 60:
+                    os.remove(lock)  # sisa proses yang mati saat compact
+            except OSError:
+                pass
+            return 0  # proses lain sedang compact
+        os.close(fd)
+        try:
+            host, now = socket.gethostname(), time.time()
+            with os.scandir(self.directory) as it:
+                dead = [e.path for e in it if e.name.endswith(".json") and e.name != ARCHIVE
+                        and e.path != self._shard and _shard_is_dead(e, host, now, max_age)]
+            if not dead:
+                return 0
+            archive_path = os.path.join(self.directory, ARCHIVE)
+            archive = self._load_shard(archive_path)
+            for path in dead:
+                shard = self._load_shard(path)
+                for m in METRICS:
+                    archive[m].merge(shard[m])
+            for digest in archive.values():
+                digest.compress()
+            self._write(archive_path, json.dumps({m: d.to_dict() for m, d in archive.items()}))
+            for path in dead:
+                try:
+                    os.remove(path)
+                except FileNotFoundError:
+                    pass
+            return len(dead)
+        finally:
+            os.remove(lock)
+
+    # --- Tulis ---
+    def add(self, res):
+        """Add one result (``total_tonnes`` + ``emission_data_tonnes``) to this process's sketches."""
+        with self._lock:
+            for digests in (self._local, self._since_flush):
+                digests["total"].add(res["total_tonnes"])
+                for cat in CATEGORIES:
+                    digests[cat].add(res["emission_data_tonnes"][cat])
+            self._dirty = True
+            self._merged = None
+        if time.monotonic() - self._last_flush >= self.flush_interval:
+            self.flush()
+
+    def add_many(self, frame):
+        """Add a ``calculate_batch`` DataFrame in one go."""
+        with self._lock:
+            for digests in (self._local, self._since_flush):
+                digests["total"].add_many(frame["total_tonnes"].to_numpy())
+                for cat in CATEGORIES:
+                    digests[cat].add_many(frame[cat].to_numpy())
+            self._dirty = True
+            self._merged = None
+        self.flush()
+
+    def flush(self):
+        with self._lock:
+            if not self._dirty:
+                return
+            if self._flushed and not os.path.exists(self._shard):
+                # Shard kita sudah masuk archive (dianggap basi): tulis hanya yang baru, jangan dobel
+                self._local = self._since_flush
+                self._merged = None
+            data = json.dumps({m: d.to_dict() for m, d in self._local.items()})
+            self._since_flush = {m: TDigest() for m in METRICS}
+            self._dirty = False
+            self._flushed = True
+            self._last_flush = time.monotonic()
+            self._write(self._shard, data)
+
+    def _write(self, path, data):
+        fd, tmp = tempfile.mkstemp(dir=self.directory, suffix=".tmp")
+        with os.fdopen(fd, "w") as f:
+            f.write(data)
+        os.replace(tmp, path)  # atomik, proses lain tidak pernah membaca file setengah jadi
+
+    # --- Baca ---
+    def _shard_stamp(self):
+        with os.scandir(self.directory) as it:
+            return tuple(sorted((e.path, e.stat().st_mtime_ns) for e in it
+                                if e.name.endswith(".json") and e.path != self._shard))
+
+    def _other_shards(self):
+        # Shard proses lain dibaca ulang hanya kalau ada yang berubah (dicek paling sering tiap refresh_interval)
+        now = time.monotonic()
+        if self._others is not None and now - self._last_refresh < self.refresh_interval:
+            return self._others
+        self._last_refresh = now
+        stamp = self._shard_stamp()
+        if self._others is not None and stamp == self._others_stamp:
+            return self._others
+
+        others = {m: TDigest() for m in METRICS}
+        for path, _ in stamp:
+            shard = self._load_shard(path)
+            for m in METRICS:
+                others[m].merge(shard[m])
+        self._others, self._others_stamp = others, stamp
+        self._merged = None
+        return others
+
+    def _merged_digests(self):
+        with self._lock:
+            others = self._other_shards()
+            if self._merged is None:
+                merged = {m: TDigest() for m in METRICS}
+                for m in METRICS:
+                    merged[m].merge(others[m])
+                    merged[m].merge(self._local[m])
+                    merged[m].compress()
+                self._merged = merged
+            return self._merged
+
+    def count(self):
+        return int(self._merged_digests()["total"].count)
+
+    def percentile(self, metric, value):
+        """Percent of submitted footprints below ``value`` for ``metric`` ("total" or a category)."""
+        return 100.0 * self._merged_digests()[metric].cdf(value)
+
+    def rank(self, res):
+        """Percentiles of one result: ``{"total": p, <category>: p, ...}``."""
+        digests = self._merged_digests()
+        ranks = {"total": 100.0 * digests["total"].cdf(res["total_tonnes"])}
+        for cat in CATEGORIES:
+            ranks[cat] = 100.0 * digests[cat].cdf(res["emission_data_tonnes"][cat])
+        return ranks
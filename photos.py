@@ -0,0 +1,46 @@
+"""Camera photo stage.
+
+The photo is only ever printed 100 mm wide in the PDF, so it is decoded,
+downscaled to that size at print resolution and re-encoded as a baseline
+JPEG once, when the result is saved. Session state keeps only these compact
+bytes (never above ``PHOTO_MAX_BYTES``) and the PDF embeds them straight from
+memory via ``PDF.image_bytes``; nothing is written to disk.
+"""
+import logging
+import os
+from io import BytesIO
+
+logger = logging.getLogger(__name__)
+
+PHOTO_WIDTH_MM = 100  # lebar foto di PDF (report.build_report_pdf)
+PHOTO_DPI = int(os.environ.get("PHOTO_DPI", "150"))
+PHOTO_MAX_BYTES = int(os.environ.get("PHOTO_MAX_BYTES", str(150 * 1024)))  # batas per sesi
+JPEG_QUALITIES = (85, 75, 65, 55, 45)
+
+
+def prepare_photo(data, width_mm=PHOTO_WIDTH_MM, dpi=PHOTO_DPI, max_bytes=PHOTO_MAX_BYTES):
+    """Downscale and re-encode photo bytes for print. Returns JPEG bytes, or None if unreadable."""
+    from PIL import Image, ImageOps, UnidentifiedImageError
+
+    try:
+        im = Image.open(BytesIO(data))
+        width = min(round(width_mm / 25.4 * dpi), im.size[0])
+        im.draft("RGB", (width, round(im.size[1] * width / im.size[0])))
+        im = ImageOps.exif_transpose(im).convert("RGB")
+    except (UnidentifiedImageError, OSError) as exc:
+        logger.warning("Ignoring unreadable photo: %s", exc)
+        return None
+
+    # Turunkan kualitas dulu, baru ukuran, sampai muat di max_bytes
+    while True:
+        height = round(im.size[1] * width / im.size[0])
+        scaled = im.resize((width, height), Image.LANCZOS) if width < im.size[0] else im
+        for quality in JPEG_QUALITIES:
+            buf = BytesIO()
+            scaled.save(buf, "JPEG", quality=quality, optimize=True)  # baseline: aman untuk DCTDecode di PDF
+            if buf.tell() <= max_bytes:
+                logger.info("Photo %d -> %d bytes (%dx%d, q%d)", len(data), buf.tell(), width, height, quality)
+                return buf.getvalue()
+        if width <= 64:
+            return None
+        width = int(width * 0.8)
@@ -0,0 +1,279 @@
+"""On-demand profiling of the Streamlit page, one session at a time.
+
+An admin arms the profiler for the next N reruns of their own session, either
+with ``?profile=N`` (``?profile=N&profiler=sampling`` for the sampler) or from
+the sidebar panel. Each armed rerun is captured from the top of ``app2.py``
+to its end:
+
+* ``cprofile``: deterministic ``cProfile``; written as a ``.prof`` pstats file
+  (``python -m pstats``, snakeviz).
+* ``sampling``: a thread reads the script thread's stack every
+  ``SAMPLE_INTERVAL`` seconds; written as a ``.speedscope.json`` file for
+  https://www.speedscope.app. Lower overhead, so timings stay closer to real.
+
+Files go to ``CARBON_PROFILE_DIR`` (only the newest ``CARBON_PROFILE_MAX_FILES``
+are kept) and the top functions of every capture are kept in the session for
+the page to show.
+
+Everything is off unless ``CARBON_PROFILER=1``: the page then never calls
+into this module, so normal sessions pay nothing. Arming also needs the admin
+secret ``CARBON_PROFILER_TOKEN`` (``&profile_token=...`` or the sidebar field);
+without a configured token nobody can arm it.
+
+    CARBON_PROFILER=1 CARBON_PROFILER_TOKEN=rahasia streamlit run app2.py
+    # lalu buka ?profile=3&profile_token=rahasia
+"""
+import json
+import os
+import secrets
+import sys
+import threading
+import time
+from collections import Counter, deque
+from contextlib import contextmanager, nullcontext
+
+ENABLED = os.environ.get("CARBON_PROFILER", "") not in ("", "0")
+PROFILE_DIR = os.environ.get("CARBON_PROFILE_DIR", ".profiles")
+MAX_FILES = int(os.environ.get("CARBON_PROFILE_MAX_FILES", "50"))  # file lama dihapus
+TOKEN = os.environ.get("CARBON_PROFILER_TOKEN", "")
+MODES = ("cprofile", "sampling")
+MAX_RERUNS = 20
+SAMPLE_INTERVAL = 0.002  # detik
+TOP_FUNCTIONS = 15
+KEEP_RESULTS = 5  # ringkasan terakhir yang disimpan per sesi
+
+_STATE_KEY = "profiler"
+_NOOP = nullcontext()
+
+
+def _label(filename, lineno, name):
+    return f"{name} ({os.path.basename(filename)}:{lineno})"
+
+
+class SamplingProfiler:
+    """Samples one thread's Python stack from a background thread."""
+
+    def __init__(self, thread_id, interval=SAMPLE_INTERVAL):
+        self.thread_id = thread_id
+        self.interval = interval
+        self.stacks = Counter()  # (frame, ...) dari root ke leaf -> detik
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="profiler-sampler", daemon=True)
+
+    def start(self):
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._stop.set()
+        self._thread.join()
+
+    def _run(self):
+        last = time.perf_counter()
+        while not self._stop.wait(self.interval):
+            frame = sys._current_frames().get(self.thread_id)
+            stack = []
+            while frame is not None:
+                code = frame.f_code
+                stack.append((code.co_filename, code.co_firstlineno, code.co_name))
+                frame = frame.f_back
+            # Bobot = waktu sejak sampel sebelumnya (interval nyata lebih panjang saat GIL dipegang)
+            now = time.perf_counter()
+            if stack:
+                self.stacks[tuple(reversed(stack))] += now - last
+            last = now
+
+    def top(self, limit=TOP_FUNCTIONS):
+        own, total = Counter(), Counter()
+        for stack, seconds in self.stacks.items():
+            own[stack[-1]] += seconds
+            for frame in set(stack):  # rekursi dihitung sekali per sampel
+                total[frame] += seconds
+        # Frame yang ada di semua sampel (runner Streamlit, <module>) tidak informatif
+        common = set.intersection(*(set(stack) for stack in self.stacks)) if self.stacks else set()
+        return [{"function": _label(*frame), "calls": None, "own_s": own[frame], "cumulative_s": seconds}
+                for frame, seconds in total.most_common() if frame not in common][:limit]
+
+    def speedscope(self, name):
+        frames, index = [], {}
+        samples, weights = [], []
+        for stack, seconds in self.stacks.items():
+            for frame in stack:
+                if frame not in index:
+                    index[frame] = len(frames)
+                    frames.append({"name": frame[2], "file": frame[0], "line": frame[1]})
+            samples.append([index[frame] for frame in stack])
+            weights.append(seconds)
+        return {
+            "$schema": "https://www.speedscope.app/file-format-schema.json",
+            "shared": {"frames": frames},
+            "profiles": [{"type": "sampled", "name": name, "unit": "seconds", "startValue": 0,
+                          "endValue": sum(weights), "samples": samples, "weights": weights}],
+            "name": name,
+            "exporter": "carbon-calculator profiler.py",
+        }
+
+
+def _cprofile_top(profile, limit=TOP_FUNCTIONS):
+    import pstats
+
+    stats = pstats.Stats(profile).stats
+    rows = sorted(stats.items(), key=lambda item: item[1][3], reverse=True)[:limit]
+    return [{"function": _label(*func), "calls": calls, "own_s": own, "cumulative_s": cumulative}
+            for func, (_, calls, own, cumulative, _) in rows]
+
+
+class Capture:
+    """One profiled rerun of the script thread."""
+
+    def __init__(self, mode):
+        self.mode = mode
+        self.started = time.perf_counter()
+        if mode == "cprofile":
+            import cProfile
+
+            self._profiler = cProfile.Profile()
+            try:
+                self._profiler.enable()
+                return
+            except ValueError:
+                # Python 3.12+: hanya satu cProfile aktif per proses; sesi lain sedang memakainya
+                self.mode = "sampling"
+        self._profiler = SamplingProfiler(threading.get_ident()).start()
+
+    def stop(self):
+        if self.mode == "cprofile":
+            self._profiler.disable()
+        else:
+            self._profiler.stop()
+        return time.perf_counter() - self.started
+
+    def write(self, directory, name):
+        os.makedirs(directory, exist_ok=True)
+        if self.mode == "cprofile":
+            path = os.path.join(directory, name + ".prof")
+            self._profiler.dump_stats(path)
+            return path, _cprofile_top(self._profiler)
+        path = os.path.join(directory, name + ".speedscope.json")
+        with open(path, "w") as f:
+            json.dump(self._profiler.speedscope(name), f)
+        return path, self._profiler.top()
+
+
+def _state(session_state):
+    if _STATE_KEY not in session_state:
+        session_state[_STATE_KEY] = {"token": secrets.token_hex(4), "remaining": 0, "mode": MODES[0],
+                                     "count": 0, "capture": None, "results": deque(maxlen=KEEP_RESULTS)}
+    return session_state[_STATE_KEY]
+
+
+def authorized(token):
+    """True if ``token`` is the admin secret; always False when none is configured."""
+    return bool(TOKEN) and secrets.compare_digest(str(token or "").encode(), TOKEN.encode())
+
+
+def arm(session_state, reruns, mode="cprofile", token=None):
+    """Profile this session's next ``reruns`` reruns (0 disarms). Raises PermissionError without the admin token."""
+    if not authorized(token):
+        raise PermissionError("Profiler token missing or wrong")
+    if mode not in MODES:
+        raise ValueError(f"Unknown profiler mode: {mode!r}")
+    state = _state(session_state)
+    state["remaining"] = max(0, min(int(reruns), MAX_RERUNS))
+    state["mode"] = mode
+
+
+def arm_from_query(session_state, query_params):
+    """Arm from ``?profile=N[&profiler=sampling]&profile_token=...`` once, then drop the parameters."""
+    if "profile" not in query_params:
+        return
+    try:
+        arm(session_state, int(query_params["profile"]), query_params.get("profiler", "cprofile"),
+            query_params.get("profile_token"))
+    except (ValueError, PermissionError):
+        pass
+    # Query param tetap ada di URL; dihapus supaya tiap rerun tidak memasang ulang (dan token tidak terlihat)
+    for key in ("profile", "profiler", "profile_token"):
+        if key in query_params:
+            del query_params[key]
+
+
+def begin(session_state):
+    """Start capturing this rerun if the session is armed. Returns the capture or None."""
+    state = _state(session_state)
+    if state["capture"] is not None:
+        # Rerun sebelumnya berhenti di tengah (st.rerun / exception): simpan sebagai profil parsial
+        _finish(state, PROFILE_DIR, partial=True)
+    if state["remaining"] <= 0:
+        return None
+    state["remaining"] -= 1
+    state["capture"] = Capture(state["mode"])
+    return state["capture"]
+
+
+def capturing(session_state):
+    state = session_state.get(_STATE_KEY)
+    return state is not None and state["capture"] is not None
+
+
+def armed(session_state):
+    state = session_state.get(_STATE_KEY)
+    return state is not None and (state["capture"] is not None or state["remaining"] > 0)
+
+
+@contextmanager
+def _fragment_capture(session_state):
+    if capturing(session_state) or begin(session_state) is None:
+        yield
+        return
+    try:
+        yield
+    finally:
+        end(session_state)
+
+
+def section(session_state):
+    """Capture a fragment rerun if armed (fragments skip the script's begin/end); no-op when disabled."""
+    return _fragment_capture(session_state) if ENABLED else _NOOP
+
+
+def _finish(state, directory, partial=False):
+    capture, state["capture"] = state["capture"], None
+    seconds = capture.stop()
+    state["count"] += 1
+    name = f"{time.strftime('%Y%m%d-%H%M%S')}-{state['token']}-{state['count']:03d}"
+    path, top = capture.write(directory, name)
+    _rotate(directory)
+    summary = {"file": path, "mode": capture.mode, "total_s": seconds, "partial": partial, "top": top}
+    state["results"].appendleft(summary)
+    return summary
+
+
+def _rotate(directory, keep=MAX_FILES):
+    # Hanya file profil yang kita tulis; yang terbaru dipertahankan
+    with os.scandir(directory) as it:
+        files = [e for e in it if e.is_file() and e.name.endswith((".prof", ".speedscope.json"))]
+    files.sort(key=lambda e: e.stat().st_mtime, reverse=True)
+    for entry in files[keep:]:
+        try:
+            os.remove(entry.path)
+        except FileNotFoundError:
+            pass
+
+
+def end(session_state, directory=PROFILE_DIR):
+    """Stop the running capture, write its file and keep its summary. Returns the summary or None."""
+    state = session_state.get(_STATE_KEY)
+    if state is None or state["capture"] is None:
+        return None
+    return _finish(state, directory)
+
+
+def results(session_state):
+    state = session_state.get(_STATE_KEY)
+    return list(state["results"]) if state else []
+
+
+def remaining(session_state):
+    state = session_state.get(_STATE_KEY)
+    return state["remaining"] if state else 0
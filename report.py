@@ -0,0 +1,248 @@
+"""PDF report layout shared by the Streamlit page and the report cache.
+
+``build_report_pdf`` turns a results dict (the same shape as
+``st.session_state.results``) into PDF bytes. Bump ``TEMPLATE_VERSION``
+whenever the layout changes so cached reports are not reused.
+
+The pie and bar charts are drawn as PDF vector paths straight from
+``emission_data_tonnes`` (``PDF.pie_chart`` / ``PDF.bar_chart``): no
+matplotlib, sharp at any print size and only a few KB per report.
+"""
+import hashlib
+import math
+import zlib
+from io import BytesIO
+
+from fpdf import FPDF
+
+from recommendations import rank_actions
+
+TEMPLATE_VERSION = 5
+
+# Warna per kategori (palet default matplotlib, sama seperti pie chart di halaman)
+CHART_COLORS = [(31, 119, 180), (255, 127, 14), (44, 160, 44), (214, 39, 40), (148, 103, 189),
+                (140, 86, 75), (227, 119, 194), (127, 127, 127), (188, 189, 34), (23, 190, 207)]
+BAR_COLOR = (135, 206, 235)  # skyblue
+
+# Tips per kategori emisi tertinggi
+TIPS = {
+    "Transportation": ["Cobalah menggunakan transportasi umum atau berbagi kendaraan (carpool)."], "Flights": ["Kurangi frekuensi penerbangan, terutama penerbangan internasional."],
+    "Electricity": ["Gunakan lampu LED hemat energi dan cabut perangkat elektronik jika tidak digunakan."], "Diet": ["Kurangi konsumsi daging merah dan olahan."],
+    "Clothing": ["Kurangi pembelian pakaian baru; pilih produk second-hand atau berkualitas tinggi agar tahan lama."], "Plastic": ["Gunakan botol dan tas belanja yang dapat digunakan ulang."],
+    "Waste": ["Pisahkan sampah organik dan anorganik."]
+}
+
+
+# === Definisi Class PDF ===
+class PDF(FPDF):
+    def header(self):
+        self.set_font("Arial", "B", 14)
+        self.cell(0, 10, "Carbon Footprint Report", ln=True, align="C")
+        self.ln(10)
+
+    def chapter_title(self, title):
+        self.set_font("Arial", "B", 12)
+        self.cell(0, 10, title, ln=True)
+        self.ln(2)
+
+    def chapter_body(self, body):
+        self.set_font("Arial", "", 11)
+        # Mengatasi error unicode dengan FPDF
+        self.multi_cell(0, 10, body.encode('latin-1', 'replace').decode('latin-1'))
+        self.ln()
+
+    def image_bytes(self, data, w=0, h=0):
+        """Like ``image()`` but from in-memory PNG/JPEG bytes instead of a file path."""
+        name = "mem:" + hashlib.sha1(data).hexdigest()
+        if name not in self.images:
+            info = _image_info(data)
+            if 'smask' in info and self.pdf_version < '1.4':
+                self.pdf_version = '1.4'
+            info['i'] = len(self.images) + 1
+            self.images[name] = info
+        self.image(name, w=w, h=h)
+
+    # --- Grafik vektor: operator path PDF langsung lewat _out ---
+    def _xy(self, x, y):
+        return f"{x * self.k:.2f} {(self.h - y) * self.k:.2f}"
+
+    def wedge(self, cx, cy, r, start, end, style="F"):
+        """Pie slice around (cx, cy) from ``start`` to ``end`` degrees, counter-clockwise from 3 o'clock."""
+        a0, a1 = math.radians(start), math.radians(end)
+        ops = [f"{self._xy(cx, cy)} m", f"{self._xy(cx + r * math.cos(a0), cy - r * math.sin(a0))} l"]
+        # Busur dipecah per <= 90 derajat, masing-masing satu kurva Bezier kubik
+        n = max(1, math.ceil((a1 - a0) / (math.pi / 2) - 1e-9))
+        step = (a1 - a0) / n
+        t = 4 / 3 * math.tan(step / 4)
+        for i in range(n):
+            b0, b1 = a0 + i * step, a0 + (i + 1) * step
+            c1 = self._xy(cx + r * (math.cos(b0) - t * math.sin(b0)), cy - r * (math.sin(b0) + t * math.cos(b0)))
+            c2 = self._xy(cx + r * (math.cos(b1) + t * math.sin(b1)), cy - r * (math.sin(b1) - t * math.cos(b1)))
+            ops.append(f"{c1} {c2} {self._xy(cx + r * math.cos(b1), cy - r * math.sin(b1))} c")
+        ops.append({"F": "f", "D": "s"}.get(style, "b"))
+        self._out(" ".join(ops))
+
+    def centered_text(self, cx, y, txt):
+        self.text(cx - self.get_string_width(txt) / 2, y, txt)
+
+    def pie_chart(self, data, x, y, size):
+        """Pie chart of ``{category: value}`` at (x, y), ``size`` mm across, legend on the right."""
+        total = sum(data.values())
+        cx, cy, r = x + size / 2, y + size / 2, size / 2
+        self.set_draw_color(255, 255, 255)
+        self.set_line_width(0.4)
+        self.set_font("Arial", "", 9)
+        angle = 90.0  # mulai dari atas seperti startangle=90
+        for i, (cat, val) in enumerate(data.items()):
+            color = CHART_COLORS[i % len(CHART_COLORS)]
+            if total > 0 and val > 0:
+                sweep = 360.0 * val / total
+                self.set_fill_color(*color)
+                self.wedge(cx, cy, r, angle, angle + sweep, "DF")
+                if val / total >= 0.04:  # label persen hanya untuk irisan yang cukup lebar
+                    mid = math.radians(angle + sweep / 2)
+                    self.centered_text(cx + 0.65 * r * math.cos(mid), cy - 0.65 * r * math.sin(mid) + 1.2,
+                                       f"{100 * val / total:.1f}%")
+                angle += sweep
+            # Legenda
+            ly = y + 6 + i * 7
+            self.set_fill_color(*color)
+            self.rect(x + size + 10, ly - 3.5, 4, 4, "F")
+            share = f"{100 * val / total:.1f}%" if total > 0 else "-"
+            self.text(x + size + 16, ly, f"{cat}: {val:.2f} t ({share})")
+        self._reset_colors()
+        self.set_y(y + size + 5)
+
+    def bar_chart(self, data, x, y, w, h, ylabel="Tonnes CO2"):
+        """Vertical bar chart of ``{category: value}`` in the box (x, y, w, h) mm."""
+        left, bottom, top = 14, 10, 8  # ruang untuk label sumbu Y, nama kategori, judul sumbu
+        px, py, pw, ph = x + left, y + top, w - left, h - top - bottom
+        vmax = max(list(data.values()) + [0])
+        tick = _nice_step(vmax / 5) if vmax > 0 else 1.0
+        ymax = tick * max(1, math.ceil(vmax / tick - 1e-9))
+
+        self.set_font("Arial", "", 8)
+        self.text(x, y + 4, ylabel)
+        self.set_draw_color(220, 220, 220)
+        self.set_line_width(0.2)
+        for k in range(int(round(ymax / tick)) + 1):
+            gy = py + ph - ph * k * tick / ymax
+            self.line(px, gy, px + pw, gy)
+            label = f"{k * tick:g}"
+            self.text(px - 2 - self.get_string_width(label), gy + 1, label)
+
+        slot = pw / max(len(data), 1)
+        self.set_fill_color(*BAR_COLOR)
+        for i, (cat, val) in enumerate(data.items()):
+            bx, bh = px + i * slot + slot * 0.15, ph * max(val, 0) / ymax
+            if bh > 0:
+                self.rect(bx, py + ph - bh, slot * 0.7, bh, "F")
+            self.set_font("Arial", "", 7)
+            self.centered_text(bx + slot * 0.35, py + ph - bh - 1.5, f"{val:.2f}")
+            size = 8
+            while size > 5 and self.get_string_width(cat) > slot - 1:  # kecilkan font sampai muat
+                size -= 0.5
+                self.set_font_size(size)
+            self.centered_text(bx + slot * 0.35, py + ph + 5, cat)
+
+        self.set_draw_color(0, 0, 0)
+        self.set_line_width(0.3)
+        self.line(px, py, px, py + ph)
+        self.line(px, py + ph, px + pw, py + ph)
+        self._reset_colors()
+        self.set_y(y + h + 5)
+
+    def _reset_colors(self):
+        self.set_draw_color(0, 0, 0)
+        self.set_fill_color(255, 255, 255)
+        self.set_text_color(0, 0, 0)
+        self.set_line_width(0.2)
+
+
+def _image_info(data):
+    """Build the FPDF image record for PNG/JPEG bytes (FPDF 1.7 only parses files)."""
+    import numpy as np
+    from PIL import Image
+
+    im = Image.open(BytesIO(data))
+    w, h = im.size
+    if im.format == "JPEG" and im.mode in ("RGB", "L", "CMYK"):
+        cs = {"RGB": "DeviceRGB", "L": "DeviceGray", "CMYK": "DeviceCMYK"}[im.mode]
+        return {'w': w, 'h': h, 'cs': cs, 'bpc': 8, 'f': 'DCTDecode', 'data': data}
+
+    # Selain JPEG: simpan piksel mentah per baris (filter PNG "None") + alpha sebagai SMask
+    has_alpha = im.mode in ("RGBA", "LA", "PA") or "transparency" in im.info
+    pixels = np.asarray(im.convert("RGBA" if has_alpha else "RGB"))
+
+    def rows(channels):
+        return np.concatenate([np.zeros((h, 1), np.uint8), channels.reshape(h, -1)], axis=1).tobytes()
+
+    dp = f'/Predictor 15 /Colors 3 /BitsPerComponent 8 /Columns {w}'
+    info = {'w': w, 'h': h, 'cs': 'DeviceRGB', 'bpc': 8, 'f': 'FlateDecode', 'dp': dp,
+            'data': zlib.compress(rows(pixels[..., :3]))}
+    if has_alpha:
+        info['smask'] = zlib.compress(rows(pixels[..., 3]))
+    return info
+
+
+def _nice_step(raw):
+    """Round a tick step up to 1, 2, 2.5 or 5 times a power of ten."""
+    base = 10 ** math.floor(math.log10(raw))
+    return next(m * base for m in (1, 2, 2.5, 5, 10) if m * base >= raw)
+
+
+def build_report_pdf(res):
+    """Build the full report for one result and return the PDF bytes."""
+    pdf = PDF()
+    pdf.add_page()
+    pdf.chapter_title("User Information")
+    pdf.chapter_body(f"Name: {res['name']}\nAge: {res['age']}\nCountry: {res['country']}")
+
+    if res['photo_bytes']:
+        # Sudah diperkecil untuk cetak (photos.py), langsung dari memori
+        pdf.image_bytes(res['photo_bytes'], w=100)
+        pdf.ln(5)
+
+    # Interval Monte Carlo hanya kalau halaman ikut menyimpannya (uncertainty.py)
+    mc = res.get('uncertainty')
+    pdf.chapter_title("Total Carbon Footprint")
+    total = f"{res['total_tonnes']} tonnes CO2 per year"
+    if mc:
+        total += (f"\n{mc['level']:.0%} range: {mc['total']['low']:.2f} - {mc['total']['high']:.2f} tonnes "
+                  f"(Monte Carlo, {mc['draws']:,} draws of the emission factors)")
+    pdf.chapter_body(total)
+
+    pdf.chapter_title("Carbon Footprint Rating")
+    pdf.chapter_body(f"Your impact rating is: {res['rating_pdf']}") # Versi PDF tanpa emoji
+    if mc:
+        pdf.chapter_body("Chance of each rating: " + ", ".join(
+            f"{rating} {p:.0%}" for rating, p in mc['rating_probability'].items()))
+
+    pdf.chapter_title("Emission Breakdown (tonnes CO2)")
+    for cat, val in res['emission_data_tonnes'].items():
+        band = f" ({mc['categories'][cat]['low']:.2f} - {mc['categories'][cat]['high']:.2f})" if mc else ""
+        pdf.chapter_body(f"- {cat}: {round(val, 2)}{band}")
+
+    pdf.chapter_title("Trees Needed to Offset")
+    pdf.chapter_body(f"You need approximately {res['trees_needed']} trees to offset your carbon emissions.")
+
+    highest_emission_category = res['highest_emission_category']
+    pdf.chapter_title(f"Recommended Focus Area: {highest_emission_category}")
+    for tip in TIPS.get(highest_emission_category, []):
+        pdf.chapter_body(f"- {tip}")
+
+    # Hanya kalau input mentah ikut disimpan (halaman & batch_report menyimpannya)
+    actions = rank_actions(res['inputs'], res['country'], top=5) if res.get('inputs') else []
+    if actions:
+        pdf.chapter_title("Your Biggest Wins (CO2 saved per year)")
+        for a in actions:
+            pdf.chapter_body(f"- {a['action']}: {a['saved_tonnes']:.2f} tonnes CO2 (= {a['trees']} trees)")
+
+    # Grafik digambar sebagai path vektor, tanpa matplotlib/PNG
+    emission_data = res['emission_data_tonnes']
+    pdf.add_page(); pdf.chapter_title("Charts")
+    pdf.pie_chart(emission_data, pdf.l_margin, pdf.get_y(), 80)
+    pdf.bar_chart(emission_data, pdf.l_margin, pdf.get_y(), 170, 95)
+
+    # Ekspor PDF ke bytes
+    return pdf.output(dest='S').encode('latin-1')
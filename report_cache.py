@@ -0,0 +1,136 @@
+"""Content-addressed cache for generated PDF reports.
+
+Reports are keyed by a hash of the result dict plus ``report.TEMPLATE_VERSION``
+and kept in two tiers: a per-process in-memory LRU and a size-bounded on-disk
+directory shared by every session and server process. Identical profiles and
+plain reruns are served without rebuilding the PDF.
+"""
+import hashlib
+import json
+import os
+import tempfile
+import threading
+from collections import OrderedDict
+
+from report import TEMPLATE_VERSION
+
+REPORT_CACHE_DIR = os.environ.get(
+    "REPORT_CACHE_DIR", os.path.join(os.path.dirname(os.path.abspath(__file__)), ".report_cache"))
+
+
+def report_key(res, template_version=TEMPLATE_VERSION):
+    """Hash of everything that ends up in the PDF."""
+    h = hashlib.sha256(f"template:{template_version}".encode())
+    for field, value in sorted(res.items()):
+        h.update(field.encode())
+        if isinstance(value, (bytes, bytearray)):
+            h.update(hashlib.sha256(value).digest())
+        else:
+            h.update(json.dumps(value, sort_keys=True, default=str).encode())
+    return h.hexdigest()
+
+
+class ReportCache:
+    def __init__(self, cache_dir=REPORT_CACHE_DIR, memory_items=64, memory_bytes=64 << 20, disk_bytes=512 << 20):
+        self.cache_dir = cache_dir
+        self.memory_items = memory_items
+        self.memory_bytes = memory_bytes
+        self.disk_bytes = disk_bytes
+        os.makedirs(cache_dir, exist_ok=True)
+
+        self._lock = threading.Lock()
+        self._memory = OrderedDict()
+        self._memory_size = 0
+        self.stats = {
+            "memory_hits": 0, "disk_hits": 0, "misses": 0,
+            "memory_evictions": 0, "disk_evictions": 0,
+        }
+
+    def _path(self, key):
+        return os.path.join(self.cache_dir, f"{key}.pdf")
+
+    # --- Tier 1: LRU di memori ---
+    def _remember(self, key, data):
+        with self._lock:
+            if key in self._memory:
+                self._memory.move_to_end(key)
+                return
+            self._memory[key] = data
+            self._memory_size += len(data)
+            while self._memory and (len(self._memory) > self.memory_items or self._memory_size > self.memory_bytes):
+                _, old = self._memory.popitem(last=False)
+                self._memory_size -= len(old)
+                self.stats["memory_evictions"] += 1
+
+    # --- Tier 2: direktori di disk, dibagi semua sesi/proses ---
+    def _store(self, key, data):
+        fd, tmp = tempfile.mkstemp(dir=self.cache_dir, suffix=".tmp")
+        with os.fdopen(fd, "wb") as f:
+            f.write(data)
+        os.replace(tmp, self._path(key))  # atomik, aman untuk proses lain yang sedang membaca
+        self._trim_disk()
+
+    def _trim_disk(self):
+        entries = []
+        total = 0
+        with os.scandir(self.cache_dir) as it:
+            for entry in it:
+                if entry.name.endswith(".pdf"):
+                    info = entry.stat()
+                    entries.append((info.st_mtime, info.st_size, entry.path))
+                    total += info.st_size
+        if total <= self.disk_bytes:
+            return
+        for _, size, path in sorted(entries):  # mtime terlama dulu (LRU)
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                continue
+            total -= size
+            with self._lock:
+                self.stats["disk_evictions"] += 1
+            if total <= self.disk_bytes:
+                break
+
+    def get(self, key):
+        with self._lock:
+            data = self._memory.get(key)
+            if data is not None:
+                self._memory.move_to_end(key)
+                self.stats["memory_hits"] += 1
+                return data
+        try:
+            with open(self._path(key), "rb") as f:
+                data = f.read()
+        except FileNotFoundError:
+            with self._lock:
+                self.stats["misses"] += 1
+            return None
+        try:
+            os.utime(self._path(key))  # tandai baru dipakai untuk LRU disk
+        except FileNotFoundError:
+            pass
+        with self._lock:
+            self.stats["disk_hits"] += 1
+        self._remember(key, data)
+        return data
+
+    def put(self, key, data):
+        self._remember(key, data)
+        self._store(key, data)
+
+    def get_or_build(self, res, build):
+        key = report_key(res)
+        data = self.get(key)
+        if data is None:
+            data = build(res)
+            self.put(key, data)
+        return data
+
+    def snapshot(self):
+        """Counters plus current tier sizes, for display/monitoring."""
+        with self._lock:
+            snap = dict(self.stats, memory_items=len(self._memory), memory_bytes=self._memory_size)
+        lookups = snap["memory_hits"] + snap["disk_hits"] + snap["misses"]
+        snap["hit_rate"] = (snap["memory_hits"] + snap["disk_hits"]) / lookups if lookups else 0.0
+        return snap
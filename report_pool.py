@@ -0,0 +1,149 @@
+"""Bounded process pool for PDF report builds.
+
+Builds run off the Streamlit script thread in a ``ProcessPoolExecutor`` that
+is only started when the first report is requested. ``max_workers`` caps the
+CPU a burst of users can take and ``max_pending`` caps the backlog; beyond it
+``submit`` refuses instead of queueing forever. Queue depth and build latency
+are kept for display. Other CPU-heavy jobs (the organisation ZIP) share the
+same workers through ``submit_task``.
+"""
+import multiprocessing
+import os
+import threading
+import time
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from multiprocessing.util import Finalize
+
+from report import build_report_pdf
+
+
+def _timed_build(res):
+    start = time.perf_counter()
+    data = build_report_pdf(res)
+    return data, time.perf_counter() - start
+
+
+def _percentile(values, q):
+    if not values:
+        return None
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(q * len(ordered)))]
+
+
+class ReportPool:
+    def __init__(self, max_workers=None, max_pending=32, on_done=None):
+        self.max_workers = max_workers or max(1, min(4, (os.cpu_count() or 2) // 2))
+        self.max_pending = max_pending
+        self.on_done = on_done  # dipanggil (key, pdf_bytes) saat build selesai, mis. untuk mengisi cache
+
+        self._executor = None
+        self._lock = threading.Lock()
+        self._pending = 0
+        self._completed = 0
+        self._failed = 0
+        self._rejected = 0
+        self._build_seconds = deque(maxlen=500)
+        self._total_seconds = deque(maxlen=500)
+
+    def _get_executor(self):
+        if self._executor is None:
+            # spawn: jangan fork proses server Streamlit yang punya banyak thread
+            self._executor = ProcessPoolExecutor(self.max_workers, mp_context=multiprocessing.get_context("spawn"))
+            # Kalau pool ini hidup di proses anak multiprocessing (mis. worker loadtest.py),
+            # atexit tidak jalan di sana; tanpa ini proses anak menunggu worker build selamanya
+            # (wait=True dan prioritas > 10: harus selesai sebelum antrian executor ditutup)
+            Finalize(self, self.shutdown, kwargs={"wait": True}, exitpriority=20)
+        return self._executor
+
+    def _discard(self, executor):
+        # Worker mati (mis. di-kill OOM): executor rusak permanen, submit berikutnya buat yang baru
+        if self._executor is executor:
+            self._executor = None
+            executor.shutdown(wait=False, cancel_futures=True)
+
+    def submit(self, key, res):
+        """Queue a build; returns a Future of the PDF bytes, or None when the backlog is full or the pool is broken."""
+        submitted = time.perf_counter()
+        with self._lock:
+            if self._pending >= self.max_pending:
+                self._rejected += 1
+                return None
+            try:
+                future, executor = self._submit_locked(_timed_build, res)
+            except BrokenProcessPool:
+                self._failed += 1
+                return None
+            self._pending += 1
+        future.submitted_at = submitted
+        future.add_done_callback(lambda f: self._finished(key, f, submitted, executor))
+        return future
+
+    def submit_task(self, fn, *args):
+        """Run ``fn(*args)`` on the same workers (e.g. a chunk of an organisation ZIP); returns its Future.
+
+        Not limited by ``max_pending``: callers bound their own in-flight tasks.
+        Raises ``BrokenProcessPool`` if no working pool can be started.
+        """
+        with self._lock:
+            future, executor = self._submit_locked(fn, *args)
+            self._pending += 1
+        future.add_done_callback(lambda f: self._task_finished(f, executor))
+        return future
+
+    def _submit_locked(self, fn, *args):
+        for attempt in range(2):  # sekali lagi dengan pool baru kalau yang lama rusak
+            executor = self._get_executor()
+            try:
+                return executor.submit(fn, *args), executor
+            except BrokenProcessPool:
+                self._discard(executor)
+                if attempt:
+                    raise
+
+    def _finished(self, key, future, submitted, executor):
+        with self._lock:
+            self._pending -= 1
+            if future.cancelled() or future.exception() is not None:
+                self._failed += 1
+                if not future.cancelled() and isinstance(future.exception(), BrokenProcessPool):
+                    self._discard(executor)
+                return
+            data, build_seconds = future.result()
+            self._completed += 1
+            self._build_seconds.append(build_seconds)
+            self._total_seconds.append(time.perf_counter() - submitted)
+        if self.on_done is not None:
+            self.on_done(key, data)
+
+    def _task_finished(self, future, executor):
+        with self._lock:
+            self._pending -= 1
+            if not future.cancelled() and isinstance(future.exception(), BrokenProcessPool):
+                self._discard(executor)
+
+    def expected_seconds(self):
+        with self._lock:
+            return _percentile(list(self._total_seconds), 0.5)
+
+    def stats(self):
+        with self._lock:
+            build, total = list(self._build_seconds), list(self._total_seconds)
+            return {
+                "workers": self.max_workers,
+                "started": self._executor is not None,
+                "in_flight": self._pending,
+                "queue_depth": max(0, self._pending - self.max_workers),
+                "completed": self._completed,
+                "failed": self._failed,
+                "rejected": self._rejected,
+                "build_p50_s": _percentile(build, 0.5),
+                "build_p95_s": _percentile(build, 0.95),
+                "latency_p50_s": _percentile(total, 0.5),
+                "latency_p95_s": _percentile(total, 0.95),
+            }
+
+    def shutdown(self, wait=False):
+        if self._executor is not None:
+            self._executor.shutdown(wait=wait, cancel_futures=True)
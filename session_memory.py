@@ -0,0 +1,189 @@
+"""Bounded per-session memory: compact records in RAM, large blobs on disk.
+
+Each Streamlit session opens an account (kept in its ``st.session_state``)
+and stores its result through ``SessionMemory.compact``: ``bytes`` values of
+``SESSION_BLOB_THRESHOLD`` or more (the print-ready photo, PDFs, chart PNGs)
+are moved to a ``BlobStore`` and replaced by a small ``BlobRef``. The blob
+store is one directory per server process under a global byte budget
+(``SESSION_BLOB_BUDGET``) and evicts the least recently used blobs first; an
+evicted blob reads back as ``None``, which the report treats as "no photo".
+
+The bytes each session holds in RAM and on disk are tracked per account and
+dropped when Streamlit discards the session state; ``usage()`` sums them up
+for the sidebar and the Prometheus exporter.
+"""
+import atexit
+import hashlib
+import itertools
+import logging
+import os
+import shutil
+import socket
+import sys
+import tempfile
+import threading
+import weakref
+from collections import OrderedDict, namedtuple
+
+logger = logging.getLogger(__name__)
+
+SESSION_BLOB_DIR = os.environ.get(
+    "SESSION_BLOB_DIR", os.path.join(os.path.dirname(os.path.abspath(__file__)), ".session_blobs"))
+SESSION_BLOB_BUDGET = int(os.environ.get("SESSION_BLOB_BUDGET", str(256 << 20)))
+SESSION_BLOB_THRESHOLD = int(os.environ.get("SESSION_BLOB_THRESHOLD", str(16 << 10)))
+
+BlobRef = namedtuple("BlobRef", "key size")
+
+
+def _sizeof(value):
+    """Approximate deep size of a record (dict/list/tuple of plain values)."""
+    size = sys.getsizeof(value)
+    if isinstance(value, dict):
+        size += sum(_sizeof(k) + _sizeof(v) for k, v in value.items())
+    elif isinstance(value, (list, tuple)):
+        size += sum(_sizeof(v) for v in value)
+    return size
+
+
+class BlobStore:
+    """Content-addressed blobs on disk under a byte budget, least recently used evicted first."""
+
+    def __init__(self, directory=SESSION_BLOB_DIR, budget_bytes=SESSION_BLOB_BUDGET):
+        self.budget_bytes = budget_bytes
+        os.makedirs(directory, exist_ok=True)
+        # Satu subdirektori per proses: indeks LRU di memori selalu cocok dengan isi disk
+        self.directory = tempfile.mkdtemp(prefix=f"{socket.gethostname()}-{os.getpid()}-", dir=directory)
+        atexit.register(shutil.rmtree, self.directory, ignore_errors=True)
+
+        self._lock = threading.Lock()
+        self._index = OrderedDict()  # key -> ukuran, urutan = terakhir dipakai
+        self._bytes = 0
+        self.stats = {"puts": 0, "hits": 0, "misses": 0, "evictions": 0}
+
+    def _path(self, key):
+        return os.path.join(self.directory, key)
+
+    def put(self, data):
+        """Store ``data`` and return its key; identical bytes are stored once."""
+        key = hashlib.sha256(data).hexdigest()
+        with self._lock:
+            self.stats["puts"] += 1
+            if key in self._index:
+                self._index.move_to_end(key)
+                return key
+        if len(data) > self.budget_bytes:
+            logger.warning("Blob of %d bytes exceeds the %d byte budget; not stored", len(data), self.budget_bytes)
+            return key
+        fd, tmp = tempfile.mkstemp(dir=self.directory, suffix=".tmp")
+        with os.fdopen(fd, "wb") as f:
+            f.write(data)
+        os.replace(tmp, self._path(key))
+
+        evicted = []
+        with self._lock:
+            if key not in self._index:
+                self._index[key] = len(data)
+                self._bytes += len(data)
+            while self._bytes > self.budget_bytes:
+                old, size = self._index.popitem(last=False)
+                self._bytes -= size
+                self.stats["evictions"] += 1
+                evicted.append(old)
+        for old in evicted:
+            try:
+                os.remove(self._path(old))
+            except FileNotFoundError:
+                pass
+        return key
+
+    def get(self, key):
+        """Bytes for ``key``, or None when it was evicted."""
+        with self._lock:
+            if key not in self._index:
+                self.stats["misses"] += 1
+                return None
+            self._index.move_to_end(key)
+        try:
+            with open(self._path(key), "rb") as f:
+                data = f.read()
+        except FileNotFoundError:
+            with self._lock:
+                size = self._index.pop(key, None)
+                if size is not None:
+                    self._bytes -= size
+                self.stats["misses"] += 1
+            return None
+        with self._lock:
+            self.stats["hits"] += 1
+        return data
+
+    def usage(self):
+        with self._lock:
+            return dict(self.stats, items=len(self._index), bytes=self._bytes, budget_bytes=self.budget_bytes)
+
+
+class SessionAccount:
+    """Handle for one session's accounting; keep it in that session's state."""
+
+    def __init__(self, account_id):
+        self.id = account_id
+
+    def __repr__(self):
+        return f"SessionAccount({self.id})"
+
+
+class SessionMemory:
+    def __init__(self, blobs=None, threshold=SESSION_BLOB_THRESHOLD):
+        self.blobs = blobs if blobs is not None else BlobStore()
+        self.threshold = threshold
+        self._lock = threading.Lock()
+        self._ids = itertools.count(1)
+        self._accounts = {}  # id akun -> {slot: (byte di RAM, byte di blob store)}
+
+    def open_account(self):
+        account = SessionAccount(next(self._ids))
+        with self._lock:
+            self._accounts[account.id] = {}
+        # Saat Streamlit membuang session state (tab ditutup), akunnya ikut hilang
+        weakref.finalize(account, self._close, account.id)
+        return account
+
+    def _close(self, account_id):
+        with self._lock:
+            self._accounts.pop(account_id, None)
+
+    def compact(self, account, slot, record):
+        """Move large ``bytes`` values of ``record`` to the blob store; returns the compact record.
+
+        The compact record replaces whatever the session kept under ``slot``
+        before, for accounting purposes.
+        """
+        compact, blob_bytes = {}, 0
+        for field, value in record.items():
+            if isinstance(value, (bytes, bytearray)) and len(value) >= self.threshold:
+                compact[field] = BlobRef(self.blobs.put(bytes(value)), len(value))
+                blob_bytes += len(value)
+            else:
+                compact[field] = value
+        with self._lock:
+            self._accounts.setdefault(account.id, {})[slot] = (_sizeof(compact), blob_bytes)
+        return compact
+
+    def expand(self, record):
+        """Copy of a compact record with its blobs read back (None where evicted)."""
+        return {field: self.blobs.get(value.key) if isinstance(value, BlobRef) else value
+                for field, value in record.items()}
+
+    def usage(self):
+        """Session and blob store totals, flat so they can be exported as gauges."""
+        with self._lock:
+            sessions = [(sum(r for r, _ in slots.values()), sum(b for _, b in slots.values()))
+                        for slots in self._accounts.values()]
+        blobs = self.blobs.usage()
+        return {
+            "sessions": len(sessions),
+            "ram_bytes": sum(r for r, _ in sessions),
+            "blob_bytes_referenced": sum(b for _, b in sessions),
+            "largest_session_bytes": max((r + b for r, b in sessions), default=0),
+            **{f"blob_store_{name}": value for name, value in blobs.items()},
+        }
@@ -0,0 +1,192 @@
+"""Background submission queue for the Sheet.best export.
+
+Payloads are spooled to a local SQLite journal (deduplicated on a hash of the
+result, so reruns never post the same row twice) and a worker thread sends
+them in bulk over a pooled ``requests.Session`` with retries and exponential
+backoff. The page only enqueues and reads the status; it never waits on the
+network.
+"""
+import hashlib
+import json
+import logging
+import os
+import random
+import sqlite3
+import threading
+import time
+
+logger = logging.getLogger(__name__)
+
+SHEET_BEST_URL = os.environ.get(
+    "SHEET_BEST_URL", "https://api.sheetbest.com/sheets/c1663a28-e75f-4501-8341-c497b1b9867b")
+SUBMISSION_DB = os.environ.get(
+    "SUBMISSION_DB", os.path.join(os.path.dirname(os.path.abspath(__file__)), "submissions.db"))
+
+QUEUED, SENT, FAILED = "queued", "sent", "failed"
+
+# Kolom yang tidak ikut di-hash (berubah tiap rerun walau hasilnya sama)
+_VOLATILE_KEYS = ("Timestamp",)
+
+
+def result_hash(payload):
+    """Stable hash of a payload, ignoring volatile fields like the timestamp."""
+    stable = {k: v for k, v in payload.items() if k not in _VOLATILE_KEYS}
+    return hashlib.sha256(json.dumps(stable, sort_keys=True, default=str).encode()).hexdigest()
+
+
+class SubmissionQueue:
+    def __init__(self, url=SHEET_BEST_URL, db_path=SUBMISSION_DB, batch_size=50,
+                 max_attempts=6, backoff=1.0, max_backoff=300.0, timeout=10.0, poll_interval=5.0):
+        self.url = url
+        self.batch_size = batch_size
+        self.max_attempts = max_attempts
+        self.backoff = backoff
+        self.max_backoff = max_backoff
+        self.timeout = timeout
+        self.poll_interval = poll_interval
+
+        self._lock = threading.Lock()
+        self._wake = threading.Event()
+        self._stop = threading.Event()
+        self._thread = None
+        self._session = None
+
+        self._db = sqlite3.connect(db_path, check_same_thread=False, isolation_level=None)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute("PRAGMA synchronous=NORMAL")
+        self._db.execute("""
+            CREATE TABLE IF NOT EXISTS submissions (
+                result_hash  TEXT PRIMARY KEY,
+                payload      TEXT NOT NULL,
+                status       TEXT NOT NULL,
+                attempts     INTEGER NOT NULL DEFAULT 0,
+                next_attempt REAL NOT NULL,
+                created      REAL NOT NULL,
+                sent_at      REAL,
+                last_error   TEXT
+            )""")
+        self._db.execute("CREATE INDEX IF NOT EXISTS submissions_due ON submissions (status, next_attempt)")
+
+    # --- API untuk halaman Streamlit ---
+    def enqueue(self, payload):
+        """Spool a payload and return its result hash.
+
+        Duplicates of a queued or sent row are ignored; a failed row is queued
+        again with a fresh attempt count (the user explicitly re-submitted).
+        """
+        key = result_hash(payload)
+        now = time.time()
+        with self._lock:
+            self._db.execute(
+                "INSERT INTO submissions (result_hash, payload, status, next_attempt, created) "
+                "VALUES (?, ?, ?, ?, ?) "
+                "ON CONFLICT (result_hash) DO UPDATE SET "
+                "payload = excluded.payload, status = excluded.status, attempts = 0, "
+                "next_attempt = excluded.next_attempt, last_error = NULL "
+                "WHERE status = ?",
+                (key, json.dumps(payload, default=str), QUEUED, now, now, FAILED))
+        self._wake.set()
+        return key
+
+    def status(self, key):
+        with self._lock:
+            row = self._db.execute("SELECT status FROM submissions WHERE result_hash = ?", (key,)).fetchone()
+        return row[0] if row else None
+
+    def counts(self):
+        with self._lock:
+            rows = self._db.execute("SELECT status, COUNT(*) FROM submissions GROUP BY status").fetchall()
+        return dict(rows)
+
+    # --- Worker ---
+    def start(self):
+        if self._thread is None or not self._thread.is_alive():
+            self._stop.clear()
+            self._thread = threading.Thread(target=self._run, name="sheet-submitter", daemon=True)
+            self._thread.start()
+        return self
+
+    def stop(self, timeout=5.0):
+        self._stop.set()
+        self._wake.set()
+        if self._thread is not None:
+            self._thread.join(timeout)
+        if self._session is not None:
+            self._session.close()
+
+    def _get_session(self):
+        if self._session is None:
+            import requests
+            from requests.adapters import HTTPAdapter
+
+            self._session = requests.Session()
+            self._session.mount("https://", HTTPAdapter(pool_connections=1, pool_maxsize=4))
+            self._session.mount("http://", HTTPAdapter(pool_connections=1, pool_maxsize=4))
+        return self._session
+
+    def _due_batch(self):
+        with self._lock:
+            return self._db.execute(
+                "SELECT result_hash, payload, attempts FROM submissions "
+                "WHERE status = ? AND next_attempt <= ? ORDER BY created LIMIT ?",
+                (QUEUED, time.time(), self.batch_size)).fetchall()
+
+    def _seconds_until_due(self):
+        with self._lock:
+            row = self._db.execute(
+                "SELECT MIN(next_attempt) FROM submissions WHERE status = ?", (QUEUED,)).fetchone()
+        if row[0] is None:
+            return self.poll_interval
+        return min(max(row[0] - time.time(), 0.0), self.poll_interval)
+
+    def flush(self):
+        """Send every due row now, one bulk request per batch. Returns rows sent."""
+        sent = 0
+        while not self._stop.is_set():
+            batch = self._due_batch()
+            if not batch:
+                break
+            if not self._send(batch):
+                break
+            sent += len(batch)
+        return sent
+
+    def _send(self, batch):
+        keys = [row[0] for row in batch]
+        error = None
+        try:
+            # Sheet.best menerima array objek untuk insert banyak baris sekaligus
+            response = self._get_session().post(
+                self.url, json=[json.loads(row[1]) for row in batch], timeout=self.timeout)
+            if 200 <= response.status_code < 300:
+                with self._lock:
+                    self._db.executemany(
+                        "UPDATE submissions SET status = ?, sent_at = ?, last_error = NULL WHERE result_hash = ?",
+                        [(SENT, time.time(), k) for k in keys])
+                return True
+            error = f"HTTP {response.status_code}"
+        except Exception as exc:  # jaringan putus, timeout, dll.
+            error = repr(exc)
+
+        logger.warning("Sheet.best submission of %d rows failed: %s", len(batch), error)
+        now = time.time()
+        updates = []
+        for key, _, attempts in batch:
+            attempts += 1
+            delay = min(self.backoff * 2 ** (attempts - 1), self.max_backoff) * random.uniform(0.5, 1.5)
+            status = FAILED if attempts >= self.max_attempts else QUEUED
+            updates.append((status, attempts, now + delay, error, key))
+        with self._lock:
+            self._db.executemany(
+                "UPDATE submissions SET status = ?, attempts = ?, next_attempt = ?, last_error = ? "
+                "WHERE result_hash = ?", updates)
+        return False
+
+    def _run(self):
+        while not self._stop.is_set():
+            self._wake.clear()
+            try:
+                self.flush()
+            except Exception:
+                logger.exception("Sheet.best submitter crashed; retrying")
+            self._wake.wait(self._seconds_until_due())
@@ -0,0 +1,84 @@
+"""Local stand-in for the Sheet.best endpoint.
+
+Accepts the same JSON POSTs (a single object or an array of objects) and keeps
+the rows in memory, so the submission queue, benchmarks and load tests can run
+without touching the real spreadsheet. Point the app at it with
+``SHEET_BEST_URL=http://127.0.0.1:<port>/sheet``.
+
+    python sheet_stub.py --port 8765 [--fail-first 3] [--latency 0.2]
+"""
+import argparse
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+
+class SheetStub:
+    def __init__(self, host="127.0.0.1", port=0, fail_first=0, latency=0.0):
+        self.rows = []
+        self.requests = 0
+        self.fail_first = fail_first
+        self.latency = latency
+        self._lock = threading.Lock()
+        self._server = ThreadingHTTPServer((host, port), self._handler())
+        self._thread = None
+
+    @property
+    def url(self):
+        host, port = self._server.server_address[:2]
+        return f"http://{host}:{port}/sheet"
+
+    def _handler(self):
+        stub = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_POST(self):
+                body = self.rfile.read(int(self.headers.get("Content-Length", 0)))
+                if stub.latency:
+                    time.sleep(stub.latency)
+                with stub._lock:
+                    stub.requests += 1
+                    failing = stub.requests <= stub.fail_first
+                    if not failing:
+                        data = json.loads(body or b"[]")
+                        stub.rows.extend(data if isinstance(data, list) else [data])
+                self.send_response(503 if failing else 200)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", "2")
+                self.end_headers()
+                self.wfile.write(b"[]" if not failing else b"{}")
+
+            def log_message(self, *args):
+                pass
+
+        return Handler
+
+    def start(self):
+        self._thread = threading.Thread(target=self._server.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._server.shutdown()
+        self._server.server_close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--fail-first", type=int, default=0, help="answer the first N requests with HTTP 503")
+    parser.add_argument("--latency", type=float, default=0.0, help="seconds to sleep per request")
+    args = parser.parse_args()
+    stub = SheetStub(port=args.port, fail_first=args.fail_first, latency=args.latency)
+    print(f"Sheet.best stub listening on {stub.url}")
+    try:
+        stub._server.serve_forever()
+    except KeyboardInterrupt:
+        stub.stop()
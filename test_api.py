@@ -0,0 +1,129 @@
+"""Input validation of the HTTP API (``api.py``), driven straight through ASGI.
+
+    python -m pytest -q test_api.py
+"""
+import asyncio
+import json
+
+import pytest
+
+import api
+from api import INPUT_MAXIMA, app
+from carbon_engine import DIET_TYPES, TRANSPORT_MODES, calculate_incremental
+
+
+def profile(**overrides):
+    data = {
+        "transport_mode": TRANSPORT_MODES[0], "daily_distance": 10.0, "flight_domestic": 1,
+        "flight_international": 0, "monthly_kwh": 300.0, "diet_type": DIET_TYPES[0], "meals_per_day": 3,
+        "clothes_purchased": 10, "plastic_use": 1.0, "weekly_waste": 5.0,
+    }
+    data.update(overrides)
+    return data
+
+
+def post(path, body, query="", raw=None):
+    """POST ``body`` as JSON (or ``raw`` bytes) through the ASGI app; returns (status, parsed JSON or raw bytes)."""
+    payload = raw if raw is not None else json.dumps(body).encode()
+    messages = []
+
+    async def receive():
+        return {"type": "http.request", "body": payload, "more_body": False}
+
+    async def send(message):
+        messages.append(message)
+
+    scope = {"type": "http", "asgi": {"version": "3.0"}, "http_version": "1.1", "method": "POST",
+             "scheme": "http", "path": path, "raw_path": path.encode(), "query_string": query.encode(), "root_path": "",
+             "headers": [(b"content-type", b"application/json"), (b"content-length", str(len(payload)).encode())],
+             "client": ("127.0.0.1", 1), "server": ("testserver", 80)}
+    asyncio.run(app(scope, receive, send))
+    status = next(m["status"] for m in messages if m["type"] == "http.response.start")
+    body = b"".join(m.get("body", b"") for m in messages if m["type"] == "http.response.body")
+    return status, json.loads(body) if body.startswith(b"{") else body
+
+
+def test_valid_profile():
+    status, body = post("/v1/footprint", profile())
+    assert status == 200
+    assert body["total_tonnes"] == calculate_incremental("Indonesia", **profile())["total_tonnes"]
+
+
+@pytest.mark.parametrize("path", ["/v1/footprint", "/v1/report"])
+@pytest.mark.parametrize("column", ["daily_distance", "monthly_kwh"])
+def test_huge_values_are_rejected(path, column):
+    status, body = post(path, profile(**{column: 1e308}))
+    assert status == 422
+    assert column in body["error"]
+
+
+def test_huge_values_in_batch_name_the_profile():
+    status, body = post("/v1/footprints", {"profiles": [profile(), profile(monthly_kwh=1e308)]})
+    assert status == 422
+    assert body["error"].startswith("profiles[1]: monthly_kwh")
+
+
+def test_maximum_is_accepted():
+    status, _ = post("/v1/footprint", profile(**INPUT_MAXIMA))
+    assert status == 200
+
+
+@pytest.mark.parametrize("overrides, field", [
+    ({"diet_type": "bogus"}, "diet_type"),
+    ({"transport_mode": 3}, "transport_mode"),
+    ({"country": ["x"]}, "country"),
+    ({"weekly_waste": -1}, "weekly_waste"),
+    ({"plastic_use": True}, "plastic_use"),
+])
+def test_invalid_fields(overrides, field):
+    for path in ("/v1/footprint", "/v1/report"):
+        status, body = post(path, profile(**overrides))
+        assert status == 422
+        assert field in body["error"]
+
+
+def test_missing_fields():
+    data = profile()
+    del data["monthly_kwh"]
+    status, body = post("/v1/footprint", data)
+    assert status == 422
+    assert "monthly_kwh" in body["error"]
+
+
+def test_engine_rejects_non_finite_total():
+    with pytest.raises(ValueError, match="overflow"):
+        calculate_incremental("Indonesia", **profile(daily_distance=1e308))
+
+
+@pytest.mark.parametrize("path", ["/v1/footprint", "/v1/footprints", "/v1/report"])
+def test_body_must_be_json(path):
+    status, body = post(path, None, raw=b"{not json")
+    assert status == 422
+    assert body["error"] == "Body must be valid JSON."
+
+
+@pytest.mark.parametrize("body", [[], "profile", 3])
+def test_profile_must_be_an_object(body):
+    status, body = post("/v1/footprint", body)
+    assert status == 422
+    assert body["error"] == "A profile must be a JSON object."
+
+
+@pytest.mark.parametrize("body", [[profile()], {"profiles": profile()}, {}])
+def test_batch_body_shape(body):
+    status, body = post("/v1/footprints", body)
+    assert status == 422
+    assert body["error"].startswith("Body must be")
+
+
+def test_batch_size_limit(monkeypatch):
+    monkeypatch.setattr(api, "API_MAX_BATCH", 2)
+    status, body = post("/v1/footprints", {"profiles": [profile()] * 3})
+    assert status == 422
+    assert body["error"] == "At most 2 profiles per request."
+
+
+def test_recommendations_must_be_an_integer():
+    status, body = post("/v1/footprint", profile(), query="recommendations=many")
+    assert status == 422
+    assert "recommendations" in body["error"]
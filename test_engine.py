@@ -0,0 +1,119 @@
+"""Vectorized engine (``carbon_engine.py``) against the original per-profile formulas.
+
+    python -m pytest -q test_engine.py
+"""
+import numpy as np
+import pandas as pd
+import pytest
+
+from carbon_engine import (CATEGORIES, DIET_TYPES, TRANSPORT_MODES, calculate_batch, calculate_incremental,
+                           calculate_profile)
+
+# Faktor & rumus app2.py sebelum engine ada (baseline)
+EMISSION_FACTORS = {"Indonesia": {
+    "Transportation": {"car": 0.21, "motorcycle": 0.09, "bus": 0.105, "train": 0.045, "walk_or_bike": 0.0},
+    "Electricity": 0.82, "Diet": {"meat_heavy": 2.5, "omnivore": 1.5, "vegetarian": 1.0, "vegan": 0.6},
+    "Waste": 0.1, "Flights": {"domestic": 250, "international": 900}, "Plastic": 6.0, "Clothing": 20}}
+
+
+def baseline(transport_mode, daily_distance, flight_domestic, flight_international, monthly_kwh, diet_type,
+             meals_per_day, clothes_purchased, plastic_use, weekly_waste):
+    f = EMISSION_FACTORS["Indonesia"]
+    emissions = {
+        "Transportation": daily_distance * 365 * f["Transportation"][transport_mode],
+        "Flights": flight_domestic * f["Flights"]["domestic"] + flight_international * f["Flights"]["international"],
+        "Electricity": monthly_kwh * 12 * f["Electricity"],
+        "Diet": f["Diet"][diet_type] * (meals_per_day * 365),
+        "Clothing": clothes_purchased * f["Clothing"],
+        "Plastic": plastic_use * 52 * f["Plastic"],
+        "Waste": weekly_waste * 52 * f["Waste"],
+    }
+    total_kg = sum(emissions.values())
+    total_tonnes = round(total_kg / 1000, 2)
+    rating = "Low" if total_tonnes < 3 else "Medium" if total_tonnes < 7 else "High"
+    return {
+        "total_tonnes": total_tonnes,
+        "trees_needed": int(total_kg / 21),
+        "rating_pdf": rating,
+        "emission_data_tonnes": {cat: kg / 1000 for cat, kg in emissions.items()},
+        "highest_emission_category": max(emissions, key=emissions.get),
+    }
+
+
+def random_profiles(n, seed=0):
+    rng = np.random.default_rng(seed)
+    return pd.DataFrame({
+        "transport_mode": rng.choice(TRANSPORT_MODES, n), "daily_distance": rng.uniform(0, 100, n).round(1),
+        "flight_domestic": rng.integers(0, 10, n), "flight_international": rng.integers(0, 5, n),
+        "monthly_kwh": rng.uniform(0, 2000, n).round(1), "diet_type": rng.choice(DIET_TYPES, n),
+        "meals_per_day": rng.integers(1, 6, n), "clothes_purchased": rng.integers(0, 100, n),
+        "plastic_use": rng.uniform(0, 10, n).round(2), "weekly_waste": rng.uniform(0, 50, n).round(1),
+    })
+
+
+def assert_matches(result, expected):
+    assert result["total_tonnes"] == pytest.approx(expected["total_tonnes"], abs=0.01)
+    assert result["trees_needed"] == pytest.approx(expected["trees_needed"], abs=1)
+    assert result["rating_pdf"] == expected["rating_pdf"]
+    assert result["highest_emission_category"] == expected["highest_emission_category"]
+    for cat in CATEGORIES:
+        assert result["emission_data_tonnes"][cat] == pytest.approx(expected["emission_data_tonnes"][cat])
+
+
+def test_batch_matches_baseline():
+    profiles = random_profiles(500)
+    batch = calculate_batch(profiles, "Indonesia")
+    for i, row in enumerate(profiles.to_dict("records")):
+        expected = baseline(**row)
+        got = batch.iloc[i]
+        assert got["total_tonnes"] == pytest.approx(expected["total_tonnes"], abs=0.01)
+        assert got["rating"] == expected["rating_pdf"]
+        assert got["highest_category"] == expected["highest_emission_category"]
+        np.testing.assert_allclose(got[CATEGORIES].to_numpy(float),
+                                   [expected["emission_data_tonnes"][c] for c in CATEGORIES])
+
+
+@pytest.mark.parametrize("seed", range(5))
+def test_single_profile_paths_match_baseline(seed):
+    inputs = random_profiles(1, seed).to_dict("records")[0]
+    expected = baseline(**inputs)
+    assert_matches(calculate_profile("Indonesia", **inputs), expected)
+    assert_matches(calculate_incremental("Indonesia", **inputs), expected)
+
+
+def test_rating_cutoffs():
+    zero = dict(transport_mode="walk_or_bike", daily_distance=0, flight_domestic=0, flight_international=0,
+                monthly_kwh=0, diet_type="vegan", meals_per_day=1, clothes_purchased=0, plastic_use=0, weekly_waste=0)
+    # Diet vegan 1x sehari = 0.219 t; ditambah listrik sampai tepat di batas
+    for kwh, rating in [(0, "Low"), (282.6, "Medium"), (689.1, "High")]:
+        res = calculate_incremental("Indonesia", **{**zero, "monthly_kwh": kwh})
+        assert res["rating_pdf"] == baseline(**{**zero, "monthly_kwh": kwh})["rating_pdf"] == rating
+
+
+@pytest.mark.parametrize("column, value, message", [
+    ("transport_mode", "rocket", "Unknown transport_mode"),
+    ("diet_type", "carnivore", "Unknown diet_type"),
+    ("daily_distance", -1.0, "daily_distance must be a non-negative number"),
+    ("monthly_kwh", np.nan, "monthly_kwh must be a non-negative number"),
+    ("weekly_waste", np.inf, "weekly_waste must be a non-negative number"),
+    ("plastic_use", "lots", "plastic_use must be numeric"),
+])
+def test_invalid_batch_input_names_column(column, value, message):
+    profiles = random_profiles(3)
+    profiles[column] = profiles[column].astype(object)
+    profiles.loc[1, column] = value
+    with pytest.raises(ValueError, match=message):
+        calculate_batch(profiles)
+
+
+def test_unknown_country():
+    with pytest.raises(ValueError, match="Unknown country"):
+        calculate_batch(random_profiles(2), "Atlantis")
+
+
+def test_overflow_is_rejected():
+    profiles = random_profiles(3)
+    profiles.loc[2, "daily_distance"] = 1e308
+    with np.errstate(over="ignore"), pytest.raises(ValueError, match=r"overflows in row\(s\) 2"):
+        calculate_batch(profiles)
+
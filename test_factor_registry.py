@@ -0,0 +1,106 @@
+"""Factor registry (``factor_registry.py``): validation and hot reload.
+
+    python -m pytest -q test_factor_registry.py
+"""
+import csv
+import os
+
+import pytest
+
+from carbon_engine import calculate_incremental
+from factor_registry import FACTORS_PATH, compile_factors, get_factor_tables
+
+FIELDS = ["version", "valid_from", "region", "category", "key", "factor", "unit", "gsd"]
+
+
+def registry_rows():
+    with open(FACTORS_PATH, newline="", encoding="utf-8") as f:
+        return list(csv.DictReader(f))
+
+
+def write_registry(path, rows):
+    with open(path, "w", newline="", encoding="utf-8") as f:
+        writer = csv.DictWriter(f, FIELDS)
+        writer.writeheader()
+        writer.writerows(rows)
+
+
+def with_version(rows, version, valid_from, **factors):
+    """Copy of ``rows`` as a new version; ``factors`` overrides by ``category`` or ``category_key``."""
+    out = []
+    for row in rows:
+        name = f"{row['category']}_{row['key']}" if row["key"] else row["category"]
+        out.append({**row, "version": version, "valid_from": valid_from,
+                    "factor": factors.get(name, row["factor"])})
+    return out
+
+
+PROFILE = dict(transport_mode="car", daily_distance=10.0, flight_domestic=0, flight_international=0,
+               monthly_kwh=100.0, diet_type="vegan", meals_per_day=3, clothes_purchased=0, plastic_use=0.0,
+               weekly_waste=0.0)
+
+
+def test_compiles_the_shipped_registry():
+    tables = compile_factors(registry_rows(), as_of="2025-06-01")
+    assert "Indonesia" in tables.regions
+    assert tables.as_dict("Indonesia")["Electricity"] == 0.82
+    assert tables.as_dict("Indonesia")["Transportation"]["car"] == 0.21
+
+
+def test_newest_valid_version_wins():
+    rows = registry_rows()
+    rows += with_version(rows, "2026.1", "2026-01-01", Electricity="0.5")
+    assert compile_factors(rows, as_of="2025-12-31").as_dict("Indonesia")["Electricity"] == 0.82
+    tables = compile_factors(rows, as_of="2026-01-01")
+    assert tables.as_dict("Indonesia")["Electricity"] == 0.5
+    assert tables.versions["Indonesia"] == "2026.1"
+
+
+def test_missing_factor_is_rejected():
+    rows = [row for row in registry_rows() if not (row["category"] == "Diet" and row["key"] == "vegan")]
+    with pytest.raises(ValueError, match="missing: .*Diet/vegan"):
+        compile_factors(rows, as_of="2025-06-01")
+
+
+def test_gsd_below_one_is_rejected():
+    rows = registry_rows()
+    rows[0] = {**rows[0], "gsd": "0.9"}
+    with pytest.raises(ValueError, match="GSD below 1"):
+        compile_factors(rows, as_of="2025-06-01")
+
+
+def test_nothing_valid_yet():
+    with pytest.raises(ValueError, match="No emission factors valid on 2000-01-01"):
+        compile_factors(registry_rows(), as_of="2000-01-01")
+
+
+def test_hot_reload(tmp_path):
+    path = str(tmp_path / "factors.csv")
+    rows = registry_rows()
+    write_registry(path, rows)
+    first = get_factor_tables(path, as_of="2025-06-01")
+    assert get_factor_tables(path, as_of="2025-06-01") is first  # tidak dikompilasi ulang
+
+    write_registry(path, rows + with_version(rows, "2025.2", "2025-03-01", Transportation_car="0.42"))
+    os.utime(path, ns=(0, os.stat(path).st_mtime_ns + 1))  # mtime pasti berubah di filesystem kasar
+    second = get_factor_tables(path, as_of="2025-06-01")
+    assert second is not first
+    assert second.versions["Indonesia"] == "2025.2"
+
+    # Cache per kategori di engine terikat ke tabel, jadi hasil ikut berubah
+    before = calculate_incremental("Indonesia", tables=first, **PROFILE)
+    after = calculate_incremental("Indonesia", tables=second, **PROFILE)
+    assert after["emission_data_tonnes"]["Transportation"] == pytest.approx(
+        2 * before["emission_data_tonnes"]["Transportation"])
+    assert after["emission_data_tonnes"]["Electricity"] == before["emission_data_tonnes"]["Electricity"]
+
+
+def test_broken_reload_keeps_raising_until_fixed(tmp_path):
+    path = str(tmp_path / "factors.csv")
+    rows = registry_rows()
+    write_registry(path, rows[1:])
+    with pytest.raises(ValueError, match="missing"):
+        get_factor_tables(path, as_of="2025-06-01")
+    write_registry(path, rows)
+    os.utime(path, ns=(0, os.stat(path).st_mtime_ns + 1))
+    assert get_factor_tables(path, as_of="2025-06-01").versions["Indonesia"] == "2025.1"
@@ -0,0 +1,124 @@
+"""Percentile sketches (``percentiles.py``): shard compaction and t-digest accuracy.
+
+    python -m pytest -q test_percentiles.py
+"""
+import json
+import os
+import socket
+import subprocess
+import sys
+
+import numpy as np
+import pytest
+
+from carbon_engine import CATEGORIES
+from percentiles import ARCHIVE, PercentileStore, TDigest
+
+
+def result(total):
+    return {"total_tonnes": total, "emission_data_tonnes": {cat: total / len(CATEGORIES) for cat in CATEGORIES}}
+
+
+def shard_files(directory):
+    return sorted(name for name in os.listdir(directory) if name.endswith(".json"))
+
+
+def dead_pid():
+    proc = subprocess.Popen([sys.executable, "-c", "pass"])
+    proc.wait()
+    return proc.pid
+
+
+@pytest.fixture
+def dead_shard(tmp_path):
+    # Shard dari proses yang sudah mati di host yang sama
+    store = PercentileStore(str(tmp_path))
+    for total in range(1, 31):
+        store.add(result(float(total)))
+    store.flush()
+    path = tmp_path / f"{socket.gethostname()}-{dead_pid()}.json"
+    os.replace(store._shard, path)
+    return path
+
+
+def test_dead_shards_are_folded_into_the_archive(tmp_path, dead_shard):
+    store = PercentileStore(str(tmp_path))
+    assert shard_files(tmp_path) == [ARCHIVE]
+    assert store.count() == 30
+    assert store.percentile("total", 15.5) == pytest.approx(50.0, abs=5)
+
+
+def test_archive_grows_instead_of_the_directory(tmp_path, dead_shard):
+    PercentileStore(str(tmp_path))
+    second = tmp_path / f"{socket.gethostname()}-{dead_pid()}.json"
+    second.write_text(dead_shard.with_name(ARCHIVE).read_text())
+    assert PercentileStore(str(tmp_path)).count() == 60
+    assert shard_files(tmp_path) == [ARCHIVE]
+
+
+def test_stale_shards_of_other_hosts_are_folded(tmp_path, dead_shard):
+    other = tmp_path / "old-container-1.json"
+    os.replace(dead_shard, other)
+    assert PercentileStore(str(tmp_path)).count() == 30
+    assert shard_files(tmp_path) == ["old-container-1.json"]
+
+    os.utime(other, (0, 0))
+    assert PercentileStore(str(tmp_path)).count() == 30
+    assert shard_files(tmp_path) == [ARCHIVE]
+
+
+def test_live_shard_folded_as_stale_is_not_counted_twice(tmp_path):
+    store = PercentileStore(str(tmp_path), flush_interval=0.0, refresh_interval=0.0)
+    for total in range(10):
+        store.add(result(float(total)))
+    os.utime(store._shard, (0, 0))
+    other = PercentileStore(str(tmp_path))
+    other._shard = str(tmp_path / "other-host-2.json")
+    assert other.compact() == 1  # proses lain menganggap shard kita basi
+
+    store.add(result(100.0))
+    assert store.count() == 11
+    with open(store._shard) as f:
+        assert sum(json.load(f)["total"]["weights"]) == 1
+
+
+# --- Akurasi t-digest terhadap persentil eksak ---
+@pytest.mark.parametrize("name, values", [
+    ("uniform", np.random.default_rng(1).uniform(0, 20, 50_000)),
+    ("lognormal", np.random.default_rng(2).lognormal(1.5, 0.6, 50_000)),
+    ("with ties", np.concatenate([np.zeros(10_000), np.random.default_rng(3).exponential(2.0, 40_000)])),
+])
+def test_tdigest_cdf_is_close_to_exact(name, values):
+    digest = TDigest()
+    digest.add_many(values[:25_000])
+    for value in values[25_000:]:
+        digest.add(value)
+    assert digest.count == len(values)
+    ordered = np.sort(values)
+    for q in (0.01, 0.1, 0.25, 0.5, 0.75, 0.9, 0.99):
+        x = np.quantile(values, q)
+        exact = (np.searchsorted(ordered, x, "left") + np.searchsorted(ordered, x, "right")) / 2 / len(values)
+        assert digest.cdf(x) == pytest.approx(exact, abs=0.01), (name, q)
+        # Dengan nilai kembar q jatuh di antara massa < x dan <= x
+        estimate = digest.quantile(q)
+        assert np.mean(values < estimate) - 0.01 <= q <= np.mean(values <= estimate) + 0.01, (name, q)
+
+
+def test_tdigest_merge_matches_single_digest():
+    values = np.random.default_rng(4).gamma(2.0, 2.0, 40_000)
+    whole, merged = TDigest(), TDigest()
+    whole.add_many(values)
+    for part in np.array_split(values, 8):
+        shard = TDigest()
+        shard.add_many(part)
+        merged.merge(TDigest.from_dict(json.loads(json.dumps(shard.to_dict()))))
+    assert merged.count == whole.count == len(values)
+    for x in np.quantile(values, [0.05, 0.5, 0.95]):
+        assert merged.cdf(x) == pytest.approx(whole.cdf(x), abs=0.01)
+
+
+def test_tdigest_stays_small():
+    digest = TDigest(compression=200)
+    digest.add_many(np.random.default_rng(5).normal(size=200_000))
+    assert len(digest.means) <= 200
+    assert digest.cdf(-100) == 0.0 and digest.cdf(100) == 1.0
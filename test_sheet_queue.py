@@ -0,0 +1,114 @@
+"""SubmissionQueue against the local Sheet.best stub (``sheet_stub.py``).
+
+    python -m pytest -q test_sheet_queue.py
+"""
+import pytest
+
+from sheet_queue import FAILED, QUEUED, SENT, SubmissionQueue
+from sheet_stub import SheetStub
+
+
+def payload(name, timestamp="2025-01-01T00:00:00"):
+    return {"Timestamp": timestamp, "Name": name, "Age": 30, "Total (Tonnes)": 4.2}
+
+
+@pytest.fixture
+def make_queue(tmp_path):
+    queues = []
+
+    def make(stub, **kwargs):
+        kwargs.setdefault("backoff", 0.0)
+        queue = SubmissionQueue(url=stub.url, db_path=str(tmp_path / "submissions.db"), **kwargs)
+        queues.append(queue)
+        return queue
+
+    yield make
+    for queue in queues:
+        queue.stop()
+
+
+def test_duplicate_results_are_sent_once(make_queue):
+    with SheetStub() as stub:
+        queue = make_queue(stub)
+        key = queue.enqueue(payload("Ana"))
+        # Rerun dengan hasil yang sama (timestamp beda) tidak menambah baris
+        assert queue.enqueue(payload("Ana", timestamp="2025-01-01T00:00:05")) == key
+        assert queue.counts() == {QUEUED: 1}
+
+        assert queue.flush() == 1
+        assert queue.status(key) == SENT
+        assert len(stub.rows) == 1
+
+
+def test_due_rows_go_in_one_bulk_request(make_queue):
+    with SheetStub() as stub:
+        queue = make_queue(stub, batch_size=50)
+        keys = [queue.enqueue(payload(f"Person {i}")) for i in range(5)]
+
+        assert queue.flush() == 5
+        assert stub.requests == 1
+        assert [row["Name"] for row in stub.rows] == [f"Person {i}" for i in range(5)]
+        assert {queue.status(k) for k in keys} == {SENT}
+
+
+def test_failed_send_backs_off(make_queue):
+    with SheetStub(fail_first=1) as stub:
+        queue = make_queue(stub, backoff=60.0)
+        key = queue.enqueue(payload("Ana"))
+
+        assert queue.flush() == 0
+        assert queue.status(key) == QUEUED
+        # Belum waktunya retry: tidak ada request kedua
+        assert queue.flush() == 0
+        assert stub.requests == 1
+
+
+def test_retries_until_sent(make_queue):
+    with SheetStub(fail_first=2) as stub:
+        queue = make_queue(stub)
+        key = queue.enqueue(payload("Ana"))
+
+        assert [queue.flush() for _ in range(3)] == [0, 0, 1]
+        assert queue.status(key) == SENT
+        assert stub.requests == 3
+        assert len(stub.rows) == 1
+
+
+def test_gives_up_after_max_attempts(make_queue):
+    with SheetStub(fail_first=100) as stub:
+        queue = make_queue(stub, max_attempts=3)
+        key = queue.enqueue(payload("Ana"))
+
+        for _ in range(3):
+            assert queue.status(key) == QUEUED
+            queue.flush()
+        assert queue.status(key) == FAILED
+        assert queue.flush() == 0
+        assert stub.requests == 3
+        assert stub.rows == []
+
+
+def test_resubmitting_a_failed_row_requeues_it(make_queue):
+    with SheetStub(fail_first=2) as stub:
+        queue = make_queue(stub, max_attempts=2)
+        key = queue.enqueue(payload("Ana"))
+        queue.flush()
+        queue.flush()
+        assert queue.status(key) == FAILED
+
+        assert queue.enqueue(payload("Ana", timestamp="2025-01-02T00:00:00")) == key
+        assert queue.status(key) == QUEUED
+        assert queue.flush() == 1
+        assert queue.status(key) == SENT
+        assert [row["Timestamp"] for row in stub.rows] == ["2025-01-02T00:00:00"]
+
+
+def test_resubmitting_a_sent_row_is_ignored(make_queue):
+    with SheetStub() as stub:
+        queue = make_queue(stub)
+        key = queue.enqueue(payload("Ana"))
+        queue.flush()
+        queue.enqueue(payload("Ana"))
+        assert queue.status(key) == SENT
+        assert queue.flush() == 0
+        assert len(stub.rows) == 1
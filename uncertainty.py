@@ -0,0 +1,72 @@
+"""Monte Carlo uncertainty for one footprint.
+
+Every emission factor has a geometric standard deviation (the ``gsd`` column
+of ``data/emission_factors.csv``) and is drawn from a lognormal whose median
+is the factor itself. ``footprint_intervals`` pushes ``MC_DRAWS`` draws of
+all factors through the engine's kernels in one vectorized pass and reports
+90% intervals for the total and every category, plus the probability of
+each rating (i.e. of landing on the other side of a Low/Medium/High cutoff).
+
+Draws come from a generator seeded with ``MC_SEED``, so the same profile
+always gets the same interval. Factor draws are memoized per region and the
+summary per profile, so reruns cost nothing.
+"""
+import copy
+import os
+from functools import lru_cache
+
+import numpy as np
+
+from carbon_engine import (CATEGORIES, PROFILE_COLUMNS, RATING_CUTOFFS, RATINGS, category_kg,
+                           encode_profiles)
+from factor_registry import get_factor_tables
+
+MC_DRAWS = int(os.environ.get("MC_DRAWS", "100000"))
+MC_SEED = 20250101
+INTERVAL = 0.90
+
+
+@lru_cache(maxsize=4)
+def _factor_draws(tables, country, draws, seed):
+    return tables.sample(country, draws, np.random.default_rng(seed))
+
+
+def _interval(values, lo, hi):
+    low, median, high = np.percentile(values, [lo, 50, hi])
+    return {"low": float(low), "median": float(median), "high": float(high), "mean": float(values.mean())}
+
+
+@lru_cache(maxsize=256)
+def _intervals(items, country, draws, seed, tables):
+    # Satu profil -> skalar; faktor punya sumbu draw, jadi tiap kategori jadi array (draws,)
+    p = {column: values[0] for column, values in encode_profiles({c: [v] for c, v in items}).items()}
+    tonnes = category_kg(p, _factor_draws(tables, country, draws, seed), 0) / 1000
+    total = tonnes.sum(axis=0)
+
+    lo, hi = 50 * (1 - INTERVAL), 50 * (1 + INTERVAL)
+    # Rating dihitung sama seperti calculate_batch (total dibulatkan 2 desimal)
+    rating_codes = np.searchsorted(RATING_CUTOFFS, np.round(total, 2), side="right")
+    probability = np.bincount(rating_codes, minlength=len(RATINGS)) / draws
+    return {
+        "draws": draws,
+        "seed": seed,
+        "level": INTERVAL,
+        "total": _interval(total, lo, hi),
+        "categories": {cat: _interval(tonnes[i], lo, hi) for i, cat in enumerate(CATEGORIES)},
+        "rating_probability": {rating: float(p) for rating, p in zip(RATINGS, probability)},
+    }
+
+
+def footprint_intervals(inputs, country="Indonesia", draws=MC_DRAWS, seed=MC_SEED, tables=None):
+    """Monte Carlo summary (tonnes CO2/year) for one profile.
+
+    Returns ``{"draws", "seed", "level", "total", "categories",
+    "rating_probability"}``; ``total`` and each category are
+    ``{"low", "median", "high", "mean"}`` with ``low``/``high`` bounding the
+    central ``level`` (90%) interval.
+    """
+    tables = tables or get_factor_tables()
+    if country not in tables.region_index:
+        raise ValueError(f"Unknown country: {country!r}")
+    summary = _intervals(tuple((c, inputs[c]) for c in PROFILE_COLUMNS), country, draws, seed, tables)
+    return copy.deepcopy(summary)
@@ -0,0 +1,86 @@
+"""Cold-start helpers for the Streamlit page.
+
+``start_warmup`` runs once per server process (``st.cache_resource``) and, in
+a background thread, selects matplotlib's Agg backend, builds the font cache
+and imports the modules the results section needs, so the first calculation
+does not pay for them. ``record_startup`` logs the import and first-render
+time of the first script run in each process.
+
+Run ``python warmup.py`` to measure a cold start in a fresh interpreter
+(JSON on stdout) and track regressions.
+"""
+import json
+import logging
+import os
+import subprocess
+import sys
+import threading
+import time
+
+import streamlit as st
+
+logger = logging.getLogger(__name__)
+
+STARTUP = {}  # diisi sekali per proses oleh record_startup
+
+
+def _warm():
+    start = time.perf_counter()
+    import matplotlib
+    matplotlib.use("Agg")
+    from matplotlib import font_manager
+    from matplotlib.figure import Figure
+
+    font_manager.fontManager.findfont("DejaVu Sans")  # membangun/memuat font cache
+    import pandas  # noqa: F401
+    import plotly.express  # noqa: F401
+    import fpdf  # noqa: F401
+
+    # Satu render kecil supaya Agg dan layout teks sudah "panas"
+    from charts import _png
+    fig = Figure(figsize=(1, 1))
+    fig.subplots().pie([1, 2], labels=["a", "b"])
+    _png(fig)
+    STARTUP["warmup_s"] = time.perf_counter() - start
+    logger.info("Warmup finished in %.2fs", STARTUP["warmup_s"])
+
+
+@st.cache_resource(show_spinner=False)
+def start_warmup():
+    thread = threading.Thread(target=_warm, name="warmup", daemon=True)
+    thread.start()
+    return thread
+
+
+def record_startup(import_seconds, render_seconds):
+    """Remember and log timings of the first script run in this process."""
+    if "first_render_s" in STARTUP:
+        return
+    STARTUP["import_s"] = import_seconds
+    STARTUP["first_render_s"] = render_seconds
+    logger.info("Cold start: imports %.3fs, first render %.3fs", import_seconds, render_seconds)
+
+
+_MEASURE = """
+import json, os, time
+t0 = time.perf_counter()
+from streamlit.testing.v1 import AppTest
+harness = time.perf_counter() - t0
+at = AppTest.from_file(os.path.abspath({script!r}), default_timeout=120)
+t1 = time.perf_counter(); at.run(); first = time.perf_counter() - t1
+t2 = time.perf_counter(); at.run(); second = time.perf_counter() - t2
+import warmup
+print(json.dumps(dict(warmup.STARTUP, harness_import_s=harness, first_run_s=first, second_run_s=second)))
+"""
+
+
+def measure(script="app2.py"):
+    """Time a cold start of ``script`` in a fresh interpreter."""
+    here = os.path.dirname(os.path.abspath(__file__))
+    out = subprocess.run([sys.executable, "-c", _MEASURE.format(script=os.path.join(here, script))],
+                         cwd=here, capture_output=True, text=True, check=True)
+    return json.loads(out.stdout.strip().splitlines()[-1])
+
+
+if __name__ == "__main__":
+    print(json.dumps(measure(*sys.argv[1:]), indent=2))
@@ -0,0 +1,141 @@
+"""What-if sweeps and sensitivity for one profile.
+
+Instead of moving one slider per rerun, ``sweep`` varies two inputs over a
+dense grid (e.g. every transport mode x 0-100 km) and ``tornado`` swings each
+numeric input between its slider limits. Both build the whole grid as one
+column batch and run it through ``carbon_engine.calculate_batch`` in a single
+vectorized pass, and both are memoized per (profile, country, axes), so
+moving back to a previous view is free.
+"""
+from functools import lru_cache
+
+import numpy as np
+
+from carbon_engine import DIET_TYPES, PROFILE_COLUMNS, TRANSPORT_MODES, calculate_batch
+
+# Batas tiap input numerik, sama dengan slider/number_input di app2.py
+INPUT_RANGES = {
+    "daily_distance": (0.0, 100.0),
+    "flight_domestic": (0, 10),
+    "flight_international": (0, 10),
+    "monthly_kwh": (0.0, 2000.0),
+    "meals_per_day": (1, 5),
+    "clothes_purchased": (0, 100),
+    "plastic_use": (0.0, 10.0),
+    "weekly_waste": (0.0, 50.0),
+}
+CHOICES = {"transport_mode": TRANSPORT_MODES, "diet_type": DIET_TYPES}
+
+INPUT_LABELS = {
+    "transport_mode": "Transport mode",
+    "daily_distance": "Daily distance (km)",
+    "flight_domestic": "Domestic flights / year",
+    "flight_international": "International flights / year",
+    "monthly_kwh": "Electricity (kWh / month)",
+    "diet_type": "Diet type",
+    "meals_per_day": "Meals per day",
+    "clothes_purchased": "Clothes / year",
+    "plastic_use": "Plastic (kg / week)",
+    "weekly_waste": "Waste (kg / week)",
+}
+
+
+def axis_values(column, points=50):
+    """Grid values for one input: every choice, or ``points`` steps over its range."""
+    if column in CHOICES:
+        return tuple(CHOICES[column])
+    lo, hi = INPUT_RANGES[column]
+    values = np.linspace(lo, hi, points)
+    if isinstance(lo, int):
+        values = np.unique(values.round()).astype(int)
+    return tuple(values.tolist())
+
+
+def _profile_key(profile):
+    return tuple((c, profile[c]) for c in PROFILE_COLUMNS)
+
+
+def _base_batch(items, n):
+    return {c: np.full(n, v) for c, v in items}
+
+
+@lru_cache(maxsize=128)
+def _sweep(items, country, x, x_values, y, y_values):
+    nx, ny = len(x_values), len(y_values)
+    batch = _base_batch(items, nx * ny)
+    batch[x] = np.tile(np.asarray(x_values), ny)
+    batch[y] = np.repeat(np.asarray(y_values), nx)
+    totals = calculate_batch(batch, country)["total_tonnes"].to_numpy().reshape(ny, nx)
+    totals.flags.writeable = False  # dibagi lewat cache, jangan diubah pemanggil
+    return totals
+
+
+def sweep(profile, x, y, points=50, country="Indonesia"):
+    """Total tonnes CO2/year over an ``x`` by ``y`` grid around ``profile``.
+
+    Returns ``(x_values, y_values, totals)`` with ``totals[j, i]`` the total
+    for ``y_values[j]`` and ``x_values[i]``.
+    """
+    if x == y:
+        raise ValueError("x and y must be different inputs")
+    x_values, y_values = axis_values(x, points), axis_values(y, points)
+    return x_values, y_values, _sweep(_profile_key(profile), country, x, x_values, y, y_values)
+
+
+@lru_cache(maxsize=128)
+def _tornado(items, country):
+    columns = list(INPUT_RANGES)
+    batch = _base_batch(items, 2 * len(columns) + 1)
+    for i, column in enumerate(columns):
+        lo, hi = INPUT_RANGES[column]
+        batch[column][2 * i + 1] = lo
+        batch[column][2 * i + 2] = hi
+    totals = calculate_batch(batch, country)["total_tonnes"].to_numpy()
+    rows = [{"input": column, "low": INPUT_RANGES[column][0], "high": INPUT_RANGES[column][1],
+             "low_tonnes": float(totals[2 * i + 1]), "high_tonnes": float(totals[2 * i + 2])}
+            for i, column in enumerate(columns)]
+    rows.sort(key=lambda r: abs(r["high_tonnes"] - r["low_tonnes"]), reverse=True)
+    return float(totals[0]), tuple(rows)
+
+
+def tornado(profile, country="Indonesia"):
+    """Total at ``profile`` and, per numeric input, the totals at its lower and upper limit.
+
+    Rows are sorted by swing (largest first), ready for a tornado chart.
+    """
+    base, rows = _tornado(_profile_key(profile), country)
+    return base, [dict(r) for r in rows]
+
+
+# === Grafik (plotly) ===
+def heatmap_figure(profile, x, y, x_values, y_values, totals):
+    import plotly.graph_objects as go
+
+    fig = go.Figure(go.Heatmap(
+        x=list(x_values), y=list(y_values), z=totals, colorscale="RdYlGn_r",
+        colorbar={"title": "Tonnes CO₂"},
+        hovertemplate=f"{INPUT_LABELS[x]}: %{{x}}<br>{INPUT_LABELS[y]}: %{{y}}<br>%{{z:.2f}} t CO₂<extra></extra>"))
+    # Tandai posisi profil saat ini
+    fig.add_trace(go.Scatter(x=[profile[x]], y=[profile[y]], mode="markers", showlegend=False,
+                             marker={"symbol": "x", "size": 12, "color": "black"}, hoverinfo="skip"))
+    fig.update_layout(xaxis_title=INPUT_LABELS[x], yaxis_title=INPUT_LABELS[y],
+                      plot_bgcolor='rgba(0,0,0,0)', paper_bgcolor='rgba(0,0,0,0)', font_color='black')
+    return fig
+
+
+def tornado_figure(base, rows):
+    import plotly.graph_objects as go
+
+    rows = rows[::-1]  # terbesar di atas
+    labels = [INPUT_LABELS[r["input"]] for r in rows]
+    fig = go.Figure()
+    for side, color in (("low", "seagreen"), ("high", "firebrick")):
+        fig.add_trace(go.Bar(
+            y=labels, x=[r[f"{side}_tonnes"] - base for r in rows], base=base, orientation="h",
+            name=f"At {side} limit", marker_color=color,
+            customdata=[r[side] for r in rows],
+            hovertemplate="%{y} = %{customdata}<br>%{x:+.2f} t CO₂<extra></extra>"))
+    fig.add_vline(x=base, line_dash="dash", line_color="black")
+    fig.update_layout(barmode="overlay", xaxis_title="Total tonnes CO₂/year", title="Sensitivity (tornado)",
+                      plot_bgcolor='rgba(0,0,0,0)', paper_bgcolor='rgba(0,0,0,0)', font_color='black')
+    return fig